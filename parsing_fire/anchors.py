@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Template Prefilter Anchors (anchors.py)
+
+Precomputed, version-stamped prefilter anchors for TextFSM and TTP
+templates, stored as JSON next to the template text (the `anchors` column
+of the templates table).
+
+Anchors are literal strings of which at least one must occur in the output
+for the template to extract anything. The engines check them before
+compiling, so templates that cannot match are never compiled; templates
+that pass are compiled and parsed as usual. A record whose format, engine
+version or source hash does not match is ignored and the template is
+compiled as before.
+
+The module only needs the standard library, textfsm and click, so the
+TTP database builder (tfsm2ttp) can load it without the rest of
+parsing_fire.
+
+Compiled regexes cannot be persisted, so TextFSM templates that pass the
+prefilter are compiled once per process and copied for each parse
+(compiled_textfsm). TTP parser objects cannot be reused across inputs, so
+TTP templates are still compiled per parse.
+
+Usage:
+    python anchors.py tfsm_templates.db           # add missing/stale anchors
+    python anchors.py ttp_templates.db --force    # rebuild all of them
+"""
+
+import copy
+import functools
+import hashlib
+import io
+import json
+import re
+import sqlite3
+from importlib import metadata
+from typing import Dict, Iterable, List, Optional
+
+import click
+import textfsm
+
+try:
+    from re import _constants as _sre, _parser as _sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants as _sre
+    import sre_parse as _sre_parse
+
+ANCHORS_FORMAT = 1
+ANCHORS_COLUMN = 'anchors'
+
+# Template text column per engine
+CONTENT_COLUMNS = {'textfsm': 'textfsm_content', 'ttp': 'ttp_content'}
+
+# TextFSM rule that assigns a Value (${NAME} or $NAME)
+_ASSIGNS_VALUE = re.compile(r'\$\{?\w')
+
+_TTP_VARIABLE = re.compile(r'\{\{(.*?)\}\}')
+_TTP_TAG = re.compile(r'^\s*<(/?)(\w+)([^>]*?)(/?)>\s*$')
+_TTP_GROUP_TAGS = ('group', 'g')
+_TTP_OTHER_TAGS = ('input', 'i', 'output', 'o', 'vars', 'variables', 'lookup', 'macro',
+                   'template', 'doc', 'extend', 'answer')
+
+# TTP indicators that let a line match without its literal text
+_TTP_ANCHORLESS = ('_line_', '_headers_')
+
+
+def source_hash(template_content: Optional[str]) -> str:
+    """MD5 of template text (same scheme as the textfsm_hash column)."""
+    return hashlib.md5((template_content or '').encode()).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def engine_version(engine: str) -> str:
+    """Installed version of the textfsm or ttp package."""
+    try:
+        return metadata.version(engine)
+    except metadata.PackageNotFoundError:
+        return 'unknown'
+
+
+# =============================================================================
+# Prefilter anchors
+# =============================================================================
+
+def _literal_runs(items, runs: List[str]):
+    """Collect runs of consecutive literal characters that every match must contain."""
+    current = []
+    for op, arg in items:
+        if op is _sre.LITERAL:
+            current.append(chr(arg))
+            continue
+        if current:
+            runs.append(''.join(current))
+            current = []
+        if op is _sre.SUBPATTERN and not arg[1] & re.IGNORECASE:
+            _literal_runs(arg[-1], runs)
+        elif op in (_sre.MAX_REPEAT, _sre.MIN_REPEAT) and arg[0] >= 1:
+            _literal_runs(arg[2], runs)
+    if current:
+        runs.append(''.join(current))
+
+
+def regex_anchor(regex: str) -> Optional[str]:
+    """Longest literal string every match of regex contains, or None."""
+    try:
+        parsed = _sre_parse.parse(regex)
+    except Exception:
+        return None
+    if parsed.state.flags & re.IGNORECASE:
+        return None
+
+    runs = []
+    _literal_runs(parsed, runs)
+    runs = [run for run in runs if run.strip()]
+    return max(runs, key=len) if runs else None
+
+
+def _collect_anchors(anchors: Iterable[Optional[str]]) -> Optional[List[str]]:
+    """Sorted anchor list, or None if any pattern has no anchor (it could match anything)."""
+    collected = set()
+    for anchor in anchors:
+        if anchor is None:
+            return None
+        collected.add(anchor)
+    return sorted(collected) or None
+
+
+def prefilter(record: Optional[Dict], text: str) -> bool:
+    """False only when the anchor record proves the template cannot extract anything from text."""
+    anchors = record.get('anchors') if record else None
+    return anchors is None or any(anchor in text for anchor in anchors)
+
+
+# =============================================================================
+# Building anchor records
+# =============================================================================
+
+def _stamp(engine: str, template_content: str) -> Dict:
+    return {
+        'format': ANCHORS_FORMAT,
+        'engine': engine,
+        'engine_version': engine_version(engine),
+        'source_hash': source_hash(template_content),
+    }
+
+
+def build_textfsm_anchors(template_content: str) -> Dict:
+    """
+    Anchor record for a TextFSM template.
+
+    Anchors come from the rules that assign a Value: if none of them can
+    match a line, no record can be produced.
+    """
+    fsm = textfsm.TextFSM(io.StringIO(template_content))
+
+    record = _stamp('textfsm', template_content)
+    record['anchors'] = _collect_anchors(
+            regex_anchor(rule.regex)
+            for rules in fsm.states.values()
+            for rule in rules
+            if _ASSIGNS_VALUE.search(rule.match)
+    )
+    return record
+
+
+def _ttp_line_anchor(line: str) -> Optional[str]:
+    """Longest literal word of a TTP template line (TTP turns digits into \\d+ and spaces into \\s+)."""
+    if any(indicator in line for indicator in _TTP_ANCHORLESS):
+        return None
+    pieces = [piece for piece in re.split(r'[\s\d]+', _TTP_VARIABLE.sub(' ', line)) if piece]
+    return max(pieces, key=len) if pieces else None
+
+
+def build_ttp_anchors(template_content: str) -> Dict:
+    """
+    Anchor record for a TTP template.
+
+    Anchors come from the literal text of each template line; templates
+    using tags other than <group> (macros, inputs, lookups, ...) get none.
+    """
+    anchors = []
+    other_tags = 0
+
+    for line in template_content.splitlines():
+        if not line.strip():
+            continue
+
+        tag = _TTP_TAG.match(line)
+        if tag and tag.group(2) in _TTP_GROUP_TAGS + _TTP_OTHER_TAGS:
+            closing, name, _, self_closing = tag.groups()
+            if name not in _TTP_GROUP_TAGS:
+                anchors.append(None)
+                if not self_closing:
+                    other_tags += -1 if closing else 1
+            continue
+        if other_tags:
+            continue
+        anchors.append(_ttp_line_anchor(line))
+
+    record = _stamp('ttp', template_content)
+    record['anchors'] = _collect_anchors(anchors)
+    return record
+
+
+def build_anchors(template_content: str, engine: str) -> Dict:
+    if engine == 'textfsm':
+        return build_textfsm_anchors(template_content)
+    if engine == 'ttp':
+        return build_ttp_anchors(template_content)
+    raise ValueError(f"Unknown template engine: {engine}")
+
+
+def dump_anchors(record: Dict) -> str:
+    return json.dumps(record, separators=(',', ':'))
+
+
+def load_anchors(data: Optional[str], template_content: str, engine: str) -> Optional[Dict]:
+    """Parse a stored anchor record; None if missing, corrupt or stale for this template and engine."""
+    if not data:
+        return None
+    try:
+        record = json.loads(data)
+    except (TypeError, ValueError):
+        return None
+    if (not isinstance(record, dict)
+            or record.get('format') != ANCHORS_FORMAT
+            or record.get('engine') != engine
+            or record.get('engine_version') != engine_version(engine)
+            or record.get('source_hash') != source_hash(template_content)):
+        return None
+    return record
+
+
+# =============================================================================
+# Compiled TextFSM cache
+# =============================================================================
+
+@functools.lru_cache(maxsize=1024)
+def _compile_textfsm(template_content: str) -> textfsm.TextFSM:
+    return textfsm.TextFSM(io.StringIO(template_content))
+
+
+def compiled_textfsm(template_content: str) -> textfsm.TextFSM:
+    """
+    A fresh TextFSM for template_content, compiled once per process.
+
+    Rules are never modified while parsing, so every copy shares the
+    compiled states; only the Values (which hold the current record) are
+    copied, so callers in different threads never share parser state.
+    deepcopy of the whole FSM is avoided because TextFSM recompiles every
+    rule regex when it is copied.
+    """
+    compiled = _compile_textfsm(template_content)
+    fsm = copy.copy(compiled)
+    fsm.values = copy.deepcopy(compiled.values, {id(compiled): fsm})
+    fsm.Reset()
+    return fsm
+
+
+# =============================================================================
+# Database maintenance
+# =============================================================================
+
+def ensure_anchors_column(conn: sqlite3.Connection) -> str:
+    """Add the anchors column if needed; returns the table's engine ('textfsm' or 'ttp')."""
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(templates)')}
+    if ANCHORS_COLUMN not in columns:
+        conn.execute(f'ALTER TABLE templates ADD COLUMN {ANCHORS_COLUMN} TEXT')
+        conn.commit()
+    for engine, column in CONTENT_COLUMNS.items():
+        if column in columns:
+            return engine
+    raise ValueError("templates table has neither textfsm_content nor ttp_content")
+
+
+def refresh_anchors(conn: sqlite3.Connection, commands: Optional[Iterable[str]] = None,
+                      force: bool = False) -> Dict[str, int]:
+    """
+    (Re)build anchor records for the given commands (default: all templates).
+
+    Current records are kept unless force is set. Templates that fail to
+    compile get NULL anchors and are compiled (and fail) at match time
+    as before. Returns {'built', 'current', 'failed'}.
+    """
+    engine = ensure_anchors_column(conn)
+    content_column = CONTENT_COLUMNS[engine]
+    query = f'SELECT cli_command, {content_column}, {ANCHORS_COLUMN} FROM templates'
+
+    if commands is None:
+        rows = conn.execute(query).fetchall()
+    else:
+        commands = list(commands)
+        rows = []
+        for start in range(0, len(commands), 500):
+            chunk = commands[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows.extend(conn.execute(f'{query} WHERE cli_command IN ({placeholders})', chunk))
+
+    stats = {'built': 0, 'current': 0, 'failed': 0}
+    updates = []
+    for command, content, data in rows:
+        if not force and load_anchors(data, content, engine) is not None:
+            stats['current'] += 1
+            continue
+        try:
+            record = dump_anchors(build_anchors(content or '', engine))
+            stats['built'] += 1
+        except Exception:
+            record = None
+            stats['failed'] += 1
+        updates.append((record, command))
+
+    if updates:
+        with conn:
+            conn.executemany(
+                f'UPDATE templates SET {ANCHORS_COLUMN} = ? WHERE cli_command = ?', updates
+            )
+    return stats
+
+
+@click.command()
+@click.argument('database', type=click.Path(exists=True, dir_okay=False))
+@click.option('--force', is_flag=True, help='Rebuild anchors that are already current')
+def main(database, force):
+    """Build prefilter anchors for every template in DATABASE."""
+    try:
+        from db import connect_writer
+    except ImportError:
+        from .db import connect_writer
+
+    conn = connect_writer(database)
+    try:
+        stats = refresh_anchors(conn, force=force)
+    finally:
+        conn.close()
+    click.echo(f"Anchors built: {stats['built']}, current: {stats['current']}, "
+               f"failed: {stats['failed']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+CLI Output Cleaner (cleaning.py)
+
+Prepares raw session output for template matching:
+- terminal noise is removed: ANSI escape sequences, pagination prompts
+  (--More--, <--- More --->, ---- More ----, ...) and backspace erasures
+- preamble lines (terminal length/width, pagination disabled) and the
+  command echo (hostname#show ..., also abbreviated: hostname#sh ...)
+  before the output are skipped; the
+  echoed command is available from clean_output_with_command() and
+  OutputCleaner.command
+- prompt lines (hostname#, hostname>) and trailing blank lines are dropped
+
+clean_output() handles a whole capture with a few precompiled whole-text
+passes (no per-line regex calls for clean output). OutputCleaner does the
+same incrementally for captures read in chunks, holding back only the
+current partial line and any run of blank lines. Both accept str or
+bytes-like input (bytes, bytearray, memoryview; decoded as UTF-8).
+
+Usage:
+    text = clean_output(raw_output)
+
+    cleaner = OutputCleaner()
+    with open("session.log", "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            for line in cleaner.feed(chunk):
+                ...
+    for line in cleaner.close():
+        ...
+"""
+
+import codecs
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+TextLike = Union[str, bytes, bytearray, memoryview]
+
+# ANSI CSI sequences (colors, cursor movement), OSC strings and two-byte escapes
+_ANSI = r'\x1b\[[0-?]*[ -/]*[@-~]|\x1b\][^\x07\x1b\n]*(?:\x07|\x1b\\)|\x1b[@-Z\\-_]'
+
+# Pagination prompts left in captures by devices that were not set to terminal length 0
+_MORE = (r'<-+ ?[Mm]ore ?-+>'
+         r'|-{2,} ?\(?[Mm]ore\b[^\n\-]*\)? ?-{2,}')
+
+_NOISE = re.compile(f'(?:{_ANSI})|(?:{_MORE})[ \\t]*')
+
+# Line containing at least one backspace
+_BACKSPACE_LINE = re.compile(r'[^\n]*\x08[^\n]*')
+
+_PREAMBLE = re.compile(r'terminal\s+(?:length|width)|pagination\s+disabled|screen-length\s+disable',
+                       re.IGNORECASE)
+
+# Commands whose echo is recognized (first word after the prompt)
+ECHO_VERBS = ('show', 'display', 'get')
+
+# Shortest abbreviation accepted for each verb (sh ip int br, dis int)
+_ECHO_ABBREVIATIONS = {'show': 2, 'display': 3, 'get': 3}
+
+
+def _abbreviation_pattern(verb: str, shortest: int) -> str:
+    """Regex matching verb or any of its prefixes of at least `shortest` characters."""
+    optional = verb[shortest:]
+    return verb[:shortest] + ''.join(f'(?:{char}' for char in optional) + ')?' * len(optional)
+
+
+# Command echo: hostname#command or hostname>command, also hostname(config)#...
+# The verb must directly follow the prompt and be a whole word (R1#push x is no echo)
+_COMMAND_ECHO = re.compile(
+    r'[\w\-.]+(?:\([\w\-.]*\))?[#>$)]\s*(?P<command>(?:'
+    + '|'.join(_abbreviation_pattern(verb, _ECHO_ABBREVIATIONS[verb]) + r'\b' for verb in ECHO_VERBS)
+    + r')\s+)',
+    re.IGNORECASE)
+
+# A whole line that is only a prompt (plus its newline), and the cheap
+# end-of-line test used to find candidate prompt lines
+_PROMPT_LINE = re.compile(r'^[^\S\n]*[\w\-.]+[#>$)][^\S\n]*(?:\n|\Z)', re.MULTILINE)
+_PROMPT_END = re.compile(r'[#>$)][^\S\n]*$', re.MULTILINE)
+_PROMPT = re.compile(r'[\w\-.]+[#>$)]')
+
+
+def _as_text(data: TextLike) -> str:
+    if isinstance(data, str):
+        return data
+    return codecs.decode(data, 'utf-8', 'replace')
+
+
+def _apply_backspaces(line: str) -> str:
+    """Replay backspaces within one line (a backspace never crosses the line start)."""
+    chars = []
+    for char in line:
+        if char == '\x08':
+            if chars:
+                chars.pop()
+        else:
+            chars.append(char)
+    return ''.join(chars)
+
+
+def strip_terminal_noise(text: str) -> str:
+    """Remove ANSI escapes and pagination prompts, then replay backspaces."""
+    if '\x1b' in text or 'ore' in text:
+        text = _NOISE.sub('', text)
+    if '\x08' in text:
+        text = _BACKSPACE_LINE.sub(lambda m: _apply_backspaces(m.group(0)), text)
+    return text
+
+
+def _drop_prompt_lines(text: str, start: int) -> str:
+    """text[start:] without prompt-only lines; only lines ending in a prompt character are examined."""
+    pieces = []
+    keep_from = start
+    for candidate in _PROMPT_END.finditer(text, start):
+        line_start = text.rfind('\n', start, candidate.start()) + 1 or start
+        if line_start < keep_from:
+            continue
+        prompt = _PROMPT_LINE.match(text, line_start)
+        if prompt:
+            pieces.append(text[keep_from:line_start])
+            keep_from = prompt.end()
+    if not pieces:
+        return text[start:] if start else text
+    pieces.append(text[keep_from:])
+    return ''.join(pieces)
+
+
+def _output_start(text: str) -> Tuple[int, Optional[str]]:
+    """
+    Offset of the first output line (-1 if none yet) and the echoed command.
+
+    Blank, preamble and command echo lines are skipped.
+    """
+    start = 0
+    while start < len(text):
+        end = text.find('\n', start)
+        if end < 0:
+            end = len(text)
+        stripped = text[start:end].strip()
+        if not stripped or _PREAMBLE.match(stripped):
+            start = end + 1
+            continue
+        echo = _COMMAND_ECHO.match(stripped)
+        if echo:
+            return end + 1, stripped[echo.start('command'):]
+        return start, None
+    return -1, None
+
+
+def echoed_command(line: str) -> Optional[str]:
+    """The command of a command echo line (hostname#show ...), or None."""
+    stripped = line.strip()
+    echo = _COMMAND_ECHO.match(stripped)
+    return stripped[echo.start('command'):] if echo else None
+
+
+def clean_output_with_command(raw_output: TextLike) -> Tuple[str, Optional[str]]:
+    """Clean a complete capture; also returns the echoed command (None without an echo line)."""
+    text = strip_terminal_noise(_as_text(raw_output))
+    start, command = _output_start(text)
+    if start < 0:
+        return '', None
+    body = _drop_prompt_lines(text, start)
+
+    # Drop trailing blank lines (the last line keeps its own trailing spaces)
+    content_end = len(body.rstrip())
+    if not content_end:
+        return '', command
+    line_end = body.find('\n', content_end)
+    return (body[:line_end] if line_end >= 0 else body), command
+
+
+def clean_output(raw_output: TextLike) -> str:
+    """Clean a complete capture (see module docstring)."""
+    return clean_output_with_command(raw_output)[0]
+
+
+class OutputCleaner:
+    """
+    Incremental clean_output: feed() chunks, receive cleaned lines.
+
+    Each chunk's complete lines are cleaned as one block with the same
+    whole-text passes as clean_output. Joining every returned line with
+    newlines gives clean_output() of the concatenated input.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        self._partial = ''
+        self._started = False
+        self._blank_run: List[str] = []
+
+    def _block(self, block: str) -> List[str]:
+        """Clean complete lines (block ends with a newline)."""
+        block = strip_terminal_noise(block)
+        start = 0
+        if not self._started:
+            start, self.command = _output_start(block)
+            if start < 0:
+                return []
+            self._started = True
+
+        lines = _drop_prompt_lines(block, start).split('\n')
+        lines.pop()  # empty piece after the final newline
+
+        # Blank lines are held back until a later non-blank line shows they are not trailing
+        last = len(lines) - 1
+        while last >= 0 and not lines[last].strip():
+            last -= 1
+        if last < 0:
+            self._blank_run.extend(lines)
+            return []
+        out = self._blank_run + lines[:last + 1]
+        self._blank_run = lines[last + 1:]
+        return out
+
+    def feed(self, chunk: TextLike) -> List[str]:
+        """Add a chunk; returns the lines it completed, cleaned."""
+        text = chunk if isinstance(chunk, str) else self._decoder.decode(chunk)
+        block, newline, self._partial = (self._partial + text).rpartition('\n')
+        return self._block(block + newline) if newline else []
+
+    def close(self) -> List[str]:
+        """Flush the final partial line; trailing blank lines are dropped."""
+        tail = self._partial + self._decoder.decode(b'', final=True)
+        self._partial = ''
+        out = self._block(tail + '\n') if tail else []
+        self._blank_run = []
+        return out
+
+
+def iter_clean_lines(chunks: Iterable[TextLike]) -> Iterator[str]:
+    """Cleaned lines of a capture supplied as an iterable of chunks."""
+    cleaner = OutputCleaner()
+    for chunk in chunks:
+        yield from cleaner.feed(chunk)
+    yield from cleaner.close()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Template Database Access (db.py)
+
+Shared SQLite access for the auto-match engines, ValidationEngine and the
+GUI testers.
+
+- Engines read through read-only URI connections (mode=ro), so matching
+  never takes a write lock or modifies the template database.
+- Writers (GUI saves and imports) switch the database to WAL journaling,
+  so edits do not block readers and readers see the last committed state.
+- Every connection gets mmap/page-cache tuning and a larger prepared
+  statement cache, so the engines' repeated template queries are not
+  re-prepared.
+- ConnectionPool bounds how many read-only connections an engine opens
+  and hands them out to threads one at a time.
+
+Usage:
+    pool = ConnectionPool("tfsm_templates.db", size=4)
+    with pool.get_connection() as conn:
+        rows = conn.execute("SELECT * FROM templates").fetchall()
+
+    conn = connect_writer("tfsm_templates.db")    # WAL, sqlite3.Row rows
+"""
+
+import os
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional
+
+# Memory-map up to this much of the database file (bytes)
+MMAP_SIZE = 256 * 1024 * 1024
+
+# Page cache per connection (KiB)
+CACHE_SIZE_KB = 64 * 1024
+
+# Prepared statements kept per connection (sqlite3 default is 128)
+STATEMENT_CACHE = 256
+
+# Seconds a writer waits on a locked database before giving up
+BUSY_TIMEOUT = 30.0
+
+
+def _tune(conn: sqlite3.Connection):
+    conn.row_factory = sqlite3.Row
+    conn.execute(f'PRAGMA mmap_size = {MMAP_SIZE}')
+    conn.execute(f'PRAGMA cache_size = -{CACHE_SIZE_KB}')
+    conn.execute('PRAGMA temp_store = MEMORY')
+
+
+def readonly_uri(db_path: str) -> str:
+    """file: URI that opens db_path read-only."""
+    return Path(db_path).resolve().as_uri() + '?mode=ro'
+
+
+def connect_readonly(db_path: str) -> sqlite3.Connection:
+    """
+    Read-only, tuned connection with sqlite3.Row rows.
+
+    The connection may be handed between threads (the pool guarantees one
+    user at a time). Raises sqlite3.OperationalError if the file is missing.
+    """
+    conn = sqlite3.connect(readonly_uri(db_path), uri=True, check_same_thread=False,
+                           cached_statements=STATEMENT_CACHE)
+    _tune(conn)
+    return conn
+
+
+def enable_wal(conn: sqlite3.Connection) -> bool:
+    """Switch the database to WAL journaling (persistent); False if the filesystem refuses."""
+    mode = conn.execute('PRAGMA journal_mode = WAL').fetchone()[0]
+    if mode.lower() != 'wal':
+        return False
+    conn.execute('PRAGMA synchronous = NORMAL')
+    return True
+
+
+def connect_writer(db_path: str, wal: bool = True) -> sqlite3.Connection:
+    """Tuned read-write connection with sqlite3.Row rows; the database is put in WAL mode."""
+    conn = sqlite3.connect(str(db_path), timeout=BUSY_TIMEOUT, cached_statements=STATEMENT_CACHE)
+    _tune(conn)
+    if wal:
+        try:
+            enable_wal(conn)
+        except sqlite3.OperationalError:
+            # Another connection holds a lock; keep the current journal mode
+            pass
+    return conn
+
+
+class ConnectionPool:
+    """
+    Bounded pool of read-only connections, shared by the threads of one process.
+
+    get_connection() borrows an idle connection (opening one while fewer
+    than `size` exist, otherwise waiting for one to be returned). A
+    connection that raised a database error is closed rather than
+    returned. After a fork the child opens its own connections instead of
+    reusing the parent's, and gets a fresh lock (another thread may have
+    held the parent's at fork time).
+    """
+
+    def __init__(self, db_path: str, size: int = 4, verbose: bool = False):
+        self.db_path = db_path
+        self.size = max(1, size)
+        self.verbose = verbose
+        self._idle: List[sqlite3.Connection] = []
+        self._open = 0
+        self._pid = os.getpid()
+        self._cond = threading.Condition()
+        _pools.add(self)
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            # Connections inherited across fork must not be used (or closed) here
+            self._idle = []
+            self._open = 0
+            self._pid = os.getpid()
+
+    def _acquire(self, timeout: Optional[float]) -> sqlite3.Connection:
+        with self._cond:
+            self._check_fork()
+            while not self._idle and self._open >= self.size:
+                if not self._cond.wait(timeout):
+                    raise TimeoutError(f"No database connection free after {timeout}s")
+            if self._idle:
+                return self._idle.pop()
+            self._open += 1
+
+        try:
+            conn = connect_readonly(self.db_path)
+        except Exception:
+            self._discard(None)
+            raise
+        if self.verbose:
+            print(f"Opened read-only connection {self._open}/{self.size} to {self.db_path}")
+        return conn
+
+    def _release(self, conn: sqlite3.Connection):
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn: Optional[sqlite3.Connection]):
+        if conn is not None:
+            conn.close()
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def get_connection(self, timeout: Optional[float] = None):
+        """Borrow a connection for the duration of the with-block."""
+        conn = self._acquire(timeout)
+        broken = False
+        try:
+            yield conn
+        except sqlite3.Error:
+            broken = True
+            raise
+        finally:
+            if broken:
+                self._discard(conn)
+            else:
+                self._release(conn)
+
+    def close_all(self):
+        """Close idle connections (the pool stays usable and reopens on demand)."""
+        with self._cond:
+            self._check_fork()
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn in idle:
+            conn.close()
+
+
+# Every live pool, so a forked child can reset their locks
+_pools: 'weakref.WeakSet[ConnectionPool]' = weakref.WeakSet()
+
+
+def _reset_pools_after_fork():
+    for pool in list(_pools):
+        pool._cond = threading.Condition()
+        pool._check_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
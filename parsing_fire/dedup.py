@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Deduplication (dedup.py)
+
+Fleet-wide runs see many outputs that are identical once cleaned (show
+version on same-image switches, show inventory on cookie-cutter sites).
+DedupMatcher sits in front of an engine's find_best_template: each output
+is normalized (decoded, line endings unified, cleaned as for validation),
+hashed together with the filter and match options, and matched only the
+first time its key is seen. Later duplicates get the stored result.
+
+- Keys are BLAKE2b digests; only keys and results are kept, not outputs,
+  and at most max_entries results (least recently used are dropped; an
+  output seen again after that is matched again and counted as distinct).
+- Duplicates share the first result's parsed records (treat them as
+  read-only).
+- stats counts inputs and distinct outputs; ratio is inputs per distinct
+  output (1.0 without duplicates) and saved the fraction of matches
+  skipped.
+- Independent of any persistent cache: it only needs the engine call.
+
+Usage:
+    matcher = DedupMatcher(engine, "cisco_ios")
+    for name, (template, parsed, score, all_scores) in matcher.iter_match(outputs.items()):
+        ...
+    print(matcher.stats)    # 1200 inputs, 37 distinct (32.4x, 96.9% skipped)
+
+    python tfsm_fire.py tfsm_templates.db cisco_ios -f r1.txt -f r2.txt ... --dedup
+"""
+
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, Optional, Tuple
+
+try:
+    from cleaning import clean_output
+    from source import CliSource, OutputLike
+except ImportError:
+    from .cleaning import clean_output
+    from .source import CliSource, OutputLike
+
+# Results kept by a DedupMatcher before the least recently used are dropped
+MAX_ENTRIES = 4096
+
+
+def normalize_output(output: OutputLike) -> str:
+    """Output as the text that is hashed and matched: decoded, \\r\\n -> \\n, cleaned."""
+    source = CliSource.coerce(output)
+    try:
+        return clean_output(source.text)
+    finally:
+        if source is not output:
+            source.close()
+
+
+def content_key(text: str, *context: Any) -> str:
+    """Digest of normalized text plus whatever else decides the result (filter, options)."""
+    digest = hashlib.blake2b(digest_size=20)
+    for part in context:
+        digest.update(repr(part).encode())
+        digest.update(b'\0')
+    digest.update(text.encode('utf-8', 'surrogatepass'))
+    return digest.hexdigest()
+
+
+@dataclass
+class DedupStats:
+    """Inputs seen and distinct outputs among them."""
+    inputs: int = 0
+    distinct: int = 0
+
+    @property
+    def duplicates(self) -> int:
+        return self.inputs - self.distinct
+
+    @property
+    def ratio(self) -> float:
+        """Inputs per distinct output (1.0 when nothing was deduplicated)."""
+        return self.inputs / self.distinct if self.distinct else 1.0
+
+    @property
+    def saved(self) -> float:
+        """Fraction of matches skipped."""
+        return self.duplicates / self.inputs if self.inputs else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'inputs': self.inputs, 'distinct': self.distinct, 'duplicates': self.duplicates,
+                'ratio': self.ratio, 'saved': self.saved}
+
+    def __str__(self) -> str:
+        return (f"{self.inputs} inputs, {self.distinct} distinct "
+                f"({self.ratio:.1f}x, {self.saved:.1%} skipped)")
+
+
+class DedupMatcher:
+    """
+    find_best_template once per distinct normalized output.
+
+    engine is a TextFSMAutoEngine or TTPAutoEngine (anything with
+    find_best_template(output, filter_string, **options)); options are
+    passed on every call and are part of the key. Callers that match
+    elsewhere (a process pool) use key/lookup/store directly; engine may
+    then be None.
+    """
+
+    def __init__(self, engine, filter_string: Optional[str] = None,
+                 normalize: Callable[[OutputLike], str] = normalize_output,
+                 max_entries: Optional[int] = MAX_ENTRIES, stats: Optional[DedupStats] = None,
+                 **options):
+        self.engine = engine
+        self.filter_string = filter_string
+        self.normalize = normalize
+        self.max_entries = max_entries
+        self.options = options
+        self.stats = stats if stats is not None else DedupStats()
+        self._results: "OrderedDict[str, Any]" = OrderedDict()
+        self._context = (filter_string, sorted(options.items()))
+
+    def key(self, output: OutputLike) -> Tuple[str, str]:
+        """(key, normalized text) of an output."""
+        text = self.normalize(output)
+        return content_key(text, *self._context), text
+
+    def lookup(self, key: str) -> Optional[Any]:
+        """Stored result for key (marked as recently used), or None."""
+        result = self._results.get(key)
+        if result is not None:
+            self._results.move_to_end(key)
+        return result
+
+    def store(self, key: str, result: Any):
+        """Store result for key, dropping the least recently used beyond max_entries."""
+        self._results[key] = result
+        self._results.move_to_end(key)
+        if self.max_entries is not None:
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def match(self, output: OutputLike) -> Tuple[Tuple, bool]:
+        """(find_best_template result, whether it was a duplicate)."""
+        key, text = self.key(output)
+        self.stats.inputs += 1
+        result = self.lookup(key)
+        if result is not None:
+            return result, True
+        self.stats.distinct += 1
+        result = self.engine.find_best_template(text, self.filter_string, **self.options)
+        self.store(key, result)
+        return result, False
+
+    def iter_match(self, items: Iterable[Tuple[Hashable, OutputLike]]) -> Iterator[Tuple[Hashable, Tuple]]:
+        """Yield (name, result) for (name, output) pairs, in input order."""
+        for name, output in items:
+            yield name, self.match(output)[0]
+
+    def clear(self):
+        """Forget stored results (stats are kept)."""
+        self._results.clear()
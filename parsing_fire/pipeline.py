@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Validation Pipeline (pipeline.py)
+
+Concurrent validation stage for collectors: outputs are cleaned and
+validated on a worker pool while collection continues, instead of one
+ValidationEngine.validate call after another once polling is done.
+
+- Items are (device, command, raw_output) tuples, optionally with a fourth
+  filter_string element. Without one, the filter is derived from the command
+  (filter_for, default "show version" -> "show_version"). The command also
+  routes the output straight to its template (ValidationEngine.validate).
+- At most max_in_flight items are queued or running. submit() blocks when
+  the limit is reached, and run() stops pulling from its input, so a fast
+  producer cannot queue unbounded output in memory.
+- Each ValidationResult carries device, command and timings: queued (submit
+  to start), validate (clean + match) and total (submit to result).
+- Workers are threads sharing one engine (shared_engine), or processes
+  (processes=True) each using its own shared engine, for CPU-bound loads.
+- drain() waits for everything in flight; close() stops accepting work,
+  optionally cancels what has not started, and shuts the workers down.
+
+Usage:
+    with ValidationPipeline("tfsm_templates.db", workers=4) as pipeline:
+        for result in pipeline.run(items):          # iterable or queue.Queue
+            print(result.device, result.command, result.is_valid, result.timings)
+
+    # Push style, from collector threads
+    pipeline = ValidationPipeline(db_path, workers=4, max_in_flight=32)
+    future = pipeline.submit("r1", "show version", output, "cisco_ios_show_version")
+    pipeline.drain()
+    pipeline.close()
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import (FIRST_COMPLETED, Future, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+from typing import Callable, Iterable, Iterator, Optional, Set, Tuple, Union
+
+try:
+    from cleaning import TextLike
+    from tfsm_engine import ValidationResult, shared_engine
+except ImportError:
+    from .cleaning import TextLike
+    from .tfsm_engine import ValidationResult, shared_engine
+
+# Ends the input of run() when it reads from a queue.Queue
+STOP = None
+
+PipelineItem = Union[Tuple[str, str, TextLike], Tuple[str, str, TextLike, Optional[str]]]
+
+
+def command_filter(device: str, command: str) -> str:
+    """Default filter_for: the command with spaces turned into template-name underscores."""
+    return '_'.join(command.split())
+
+
+def _validate(db_path: Optional[str], min_score: float, pool_size: int, device: str, command: str,
+              raw_output: TextLike, filter_string: Optional[str], submitted: float) -> ValidationResult:
+    """Worker body (thread or process): validate one output and time it. Never raises."""
+    started = time.time()
+    try:
+        engine = shared_engine(db_path, min_score=min_score, pool_size=pool_size)
+        result = engine.validate(raw_output, filter_string, command)
+    except Exception as e:
+        result = ValidationResult(is_valid=False, error=str(e))
+    finished = time.time()
+    result.device = device
+    result.command = command
+    result.timings = {
+        'queued': started - submitted,
+        'validate': finished - started,
+        'total': finished - submitted,
+    }
+    return result
+
+
+class ValidationPipeline:
+    """
+    Bounded, concurrent ValidationEngine stage.
+
+    Attributes:
+        db_path: Path to TextFSM templates database (None: default location)
+        workers: Worker threads or processes
+        max_in_flight: Items queued or running at once (default: 4 per worker)
+        processes: Validate in worker processes instead of threads
+    """
+
+    def __init__(
+            self,
+            db_path: Optional[str] = None,
+            workers: int = 4,
+            max_in_flight: Optional[int] = None,
+            min_score: float = 0.01,
+            processes: bool = False,
+            filter_for: Callable[[str, str], Optional[str]] = command_filter,
+    ):
+        self.db_path = db_path
+        self.workers = max(1, workers)
+        self.max_in_flight = max(1, max_in_flight or self.workers * 4)
+        self.min_score = min_score
+        self.processes = processes
+        self.filter_for = filter_for
+
+        # Open the database now so a bad path fails here, not in every result. One
+        # connection per worker thread, so no worker waits on the pool.
+        shared_engine(db_path, min_score=min_score, pool_size=self.workers)
+
+        if processes:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                thread_name_prefix='validation')
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._lock = threading.Lock()
+        self._in_flight: Set[Future] = set()
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # On an exception, do not validate what is still queued
+        self.close(cancel_pending=exc_type is not None)
+
+    @property
+    def in_flight(self) -> int:
+        """Items submitted but not finished."""
+        return len(self._in_flight)
+
+    def submit(
+            self,
+            device: str,
+            command: str,
+            raw_output: TextLike,
+            filter_string: Optional[str] = None,
+            timeout: Optional[float] = None,
+    ) -> Future:
+        """
+        Queue one output; the Future resolves to its ValidationResult.
+
+        Blocks while max_in_flight items are pending. Raises TimeoutError if
+        no slot frees up within timeout, RuntimeError after close().
+        """
+        if self._closed:
+            raise RuntimeError("ValidationPipeline is closed")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"Validation pipeline still full after {timeout}s")
+
+        if filter_string is None:
+            filter_string = self.filter_for(device, command)
+        if self.processes and isinstance(raw_output, memoryview):
+            raw_output = raw_output.tobytes()
+
+        with self._lock:
+            if self._closed:
+                self._slots.release()
+                raise RuntimeError("ValidationPipeline is closed")
+            future = self._executor.submit(_validate, self.db_path, self.min_score, self.workers,
+                                           device, command, raw_output, filter_string, time.time())
+            self._in_flight.add(future)
+
+        future.add_done_callback(self._finish)
+        return future
+
+    def _finish(self, future: Future):
+        with self._lock:
+            self._in_flight.discard(future)
+        self._slots.release()
+
+    def run(self, items: Union[Iterable[PipelineItem], queue.Queue]) -> Iterator[ValidationResult]:
+        """
+        Validate items, yielding results in completion order.
+
+        items is an iterable or a queue.Queue ended by STOP. The next item is
+        only taken once fewer than max_in_flight are pending.
+        """
+        if isinstance(items, queue.Queue):
+            items = iter(items.get, STOP)
+
+        pending: Set[Future] = set()
+        for item in items:
+            while len(pending) >= self.max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from self._collect(done)
+            pending.add(self.submit(*item))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from self._collect(done)
+
+    @staticmethod
+    def _collect(done: Set[Future]) -> Iterator[ValidationResult]:
+        for future in done:
+            if not future.cancelled():
+                yield future.result()
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait for every submitted item to finish; False if timeout expired first."""
+        with self._lock:
+            pending = set(self._in_flight)
+        _, not_done = wait(pending, timeout=timeout)
+        return not not_done
+
+    def close(self, wait: bool = True, cancel_pending: bool = False):
+        """
+        Stop accepting items and shut the workers down.
+
+        With wait, returns once running items finish (and, unless
+        cancel_pending, every queued item too). Cancelled items' futures
+        are cancelled and never produce a result.
+        """
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_pending)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Progressive Matching (progressive.py)
+
+Two-phase template matching for large outputs. The first few hundred
+lines of a capture usually separate good candidates from bad ones, so:
+
+- phase 1 scores every filtered template on a bounded prefix of the output
+  (lines and/or bytes; cut at a line boundary)
+- phase 2 re-runs only the top_k phase-1 templates on the full output and
+  picks the final winner from those
+
+Prefilters still run against the full output, so a template whose anchors
+first appear after the prefix is not ruled out. Outputs no longer than the
+prefix are scanned once, as usual. If no template scores on the prefix,
+phase 2 falls back to the full scan.
+
+A ProgressiveMatch is the configuration and its running statistics: reuse
+one across calls and read stats to tune the prefix size per deployment.
+agreement_rate is how often the phase-1 leader was also the final winner;
+near 1.0 means the prefix alone decides, lower means the prefix (or top_k)
+is too small.
+
+Usage:
+    progressive = ProgressiveMatch(lines=300, top_k=5)
+    template, parsed, score, all_scores = engine.find_best_template(output, "cisco_ios",
+                                                                    progressive=progressive)
+    print(progressive)    # 40 calls (38 two-phase), agreement 94.7%, phase 1 1.92s / phase 2 0.41s
+
+    python tfsm_fire.py tfsm_templates.db cisco_ios --progressive 300 -v < show_tech.txt
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    from source import CliSource
+except ImportError:
+    from .source import CliSource
+
+# Default prefix length (lines) and templates re-run on the full output
+PREFIX_LINES = 300
+TOP_K = 5
+
+MatchResult = Tuple[Optional[str], Optional[List[Dict]], float, List[Tuple[str, float, int]]]
+
+# scan(parse_source, only): the engine's sweep, parsing parse_source and
+# restricted to the template names in only (None: every filtered template)
+ScanFunction = Callable[[CliSource, Optional[Set[str]]], MatchResult]
+
+
+def _nth_line_end(buffer, newline, count: int) -> int:
+    """Offset just past the count-th newline, or -1 if the buffer has fewer lines."""
+    position = -1
+    for _ in range(count):
+        position = buffer.find(newline, position + 1)
+        if position < 0:
+            return -1
+    return position + 1
+
+
+def output_prefix(source: CliSource, lines: Optional[int] = None,
+                  max_bytes: Optional[int] = None) -> Optional[CliSource]:
+    """
+    The first lines / max_bytes of source (whichever is shorter), cut at a
+    line boundary, or None if the output is no longer than that.
+
+    Undecoded byte input is cut on the raw bytes, so the full output is
+    not decoded for phase 1 (max_bytes counts characters for text input).
+    """
+    # memoryviews have no find(); use the text for them
+    decoded = 'text' in source.__dict__ or source.raw is None or isinstance(source.raw, memoryview)
+    data = source.text if decoded else source.raw
+    newline = '\n' if decoded else b'\n'
+
+    end = len(data)
+    if max_bytes is not None and max_bytes < end:
+        end = max(data.rfind(newline, 0, max_bytes) + 1, 0)
+    if lines is not None:
+        line_end = _nth_line_end(data, newline, lines)
+        if 0 <= line_end < end:
+            end = line_end
+    if end >= len(data) or end <= 0:
+        return None
+    return CliSource(data[:end] if decoded else bytes(data[:end]))
+
+
+class ProgressiveMatch:
+    """Prefix size, top_k, and statistics over every call it was used for."""
+
+    def __init__(self, lines: Optional[int] = PREFIX_LINES, max_bytes: Optional[int] = None,
+                 top_k: int = TOP_K):
+        if lines is None and max_bytes is None:
+            raise ValueError("ProgressiveMatch needs lines and/or max_bytes")
+        self.lines = lines
+        self.max_bytes = max_bytes
+        self.top_k = max(1, top_k)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear the statistics."""
+        with self._lock:
+            self.calls = 0              # find_best_template calls
+            self.two_phase = 0          # calls whose output was longer than the prefix
+            self.agreed = 0             # two-phase calls where the phase-1 leader won
+            self.fallbacks = 0          # two-phase calls where nothing scored on the prefix
+            self.finalists = 0          # templates re-run in phase 2, summed
+            self.phase1_seconds = 0.0
+            self.phase2_seconds = 0.0
+
+    @property
+    def agreement_rate(self) -> float:
+        """Fraction of two-phase calls (excluding fallbacks) where the phase-1 leader won."""
+        decided = self.two_phase - self.fallbacks
+        return self.agreed / decided if decided else 1.0
+
+    def run(self, scan: ScanFunction, source: CliSource) -> MatchResult:
+        """
+        Match source in two phases with the engine's scan; returns the
+        phase-2 result (all_scores covers the phase-2 templates only).
+        """
+        prefix = output_prefix(source, self.lines, self.max_bytes)
+        if prefix is None:
+            with self._lock:
+                self.calls += 1
+            return scan(source, None)
+
+        started = time.perf_counter()
+        leader, _, _, ranking = scan(prefix, None)
+        finalists = {name for name, _, _ in ranking[:self.top_k]}
+        phase1_done = time.perf_counter()
+
+        result = scan(source, finalists or None)
+        phase2_done = time.perf_counter()
+
+        with self._lock:
+            self.calls += 1
+            self.two_phase += 1
+            if not finalists:
+                self.fallbacks += 1
+            elif leader == result[0]:
+                self.agreed += 1
+            self.finalists += len(finalists)
+            self.phase1_seconds += phase1_done - started
+            self.phase2_seconds += phase2_done - phase1_done
+        return result
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'prefix_lines': self.lines, 'prefix_bytes': self.max_bytes, 'top_k': self.top_k,
+            'calls': self.calls, 'two_phase': self.two_phase, 'agreed': self.agreed,
+            'fallbacks': self.fallbacks, 'agreement_rate': self.agreement_rate,
+            'finalists': self.finalists,
+            'phase1_seconds': self.phase1_seconds, 'phase2_seconds': self.phase2_seconds,
+        }
+
+    def __str__(self) -> str:
+        return (f"{self.calls} calls ({self.two_phase} two-phase), agreement {self.agreement_rate:.1%}, "
+                f"phase 1 {self.phase1_seconds:.2f}s / phase 2 {self.phase2_seconds:.2f}s")
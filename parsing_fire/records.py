@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Columnar Parse Results (records.py)
+
+ColumnarRecords holds parsed output as a header tuple plus one list per
+column instead of one dict per row, with repeated string values interned
+(a 200k-row MAC table stores each VLAN, type and port name once, and no
+per-row key strings or dict overhead at all).
+
+It is a drop-in for the List[Dict] results: len(), indexing, slicing and
+iteration give read-only row views that behave like the dicts did
+(record['MAC'], record.get(...), .keys()/.values()/.items(), dict(record),
+== against a dict). Rows only hold the keys their record had; TTP records
+from different groups may differ.
+
+Export without building dicts: column(name), iter_tuples(), write_csv(),
+write_ndjson(), and to_arrow() when pyarrow is installed.
+
+Usage:
+    template, records, score, all_scores = engine.find_best_template(output, "cisco_ios",
+                                                                     columnar=True)
+    macs = records.column('DESTINATION_ADDRESS')
+    for row in records:
+        print(row['DESTINATION_PORT'])
+"""
+
+import csv
+import json
+import sys
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, IO, Iterable, Iterator, List, Sequence as SequenceType, Tuple
+
+# Marks a key the record did not have (a row view skips it)
+_MISSING = object()
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+class RowView(Mapping):
+    """Read-only dict-like view of one row of a ColumnarRecords."""
+
+    __slots__ = ('_records', '_index')
+
+    def __init__(self, records: 'ColumnarRecords', index: int):
+        self._records = records
+        self._index = index
+
+    def __getitem__(self, key: str) -> Any:
+        position = self._records._positions.get(key)
+        if position is None:
+            raise KeyError(key)
+        value = self._records._columns[position][self._index]
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        index = self._index
+        for name, column in zip(self._records.header, self._records._columns):
+            if column[index] is not _MISSING:
+                yield name
+
+    def __len__(self) -> int:
+        if not self._records._sparse:
+            return len(self._records.header)
+        return sum(1 for _ in self)
+
+    def values(self) -> List[Any]:
+        index = self._index
+        return [value for value in (column[index] for column in self._records._columns)
+                if value is not _MISSING]
+
+    def items(self) -> List[Tuple[str, Any]]:
+        index = self._index
+        return [(name, column[index]) for name, column in zip(self._records.header, self._records._columns)
+                if column[index] is not _MISSING]
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+
+class ColumnarRecords(Sequence):
+    """
+    Parsed records stored column by column.
+
+    header is the tuple of field names (for TTP, every key seen, in first
+    seen order); columns are lists of equal length.
+    """
+
+    def __init__(self, header: Iterable[str], columns: List[List[Any]], sparse: bool = False):
+        self.header: Tuple[str, ...] = tuple(header)
+        self._columns = columns
+        self._positions = {name: position for position, name in enumerate(self.header)}
+        self._sparse = sparse
+        self._length = len(columns[0]) if columns else 0
+
+    @classmethod
+    def from_rows(cls, header: SequenceType[str], rows: Iterable[SequenceType[Any]]) -> 'ColumnarRecords':
+        """Build from TextFSM-style rows (one value per header field)."""
+        columns: List[List[Any]] = [[] for _ in header]
+        appends = [column.append for column in columns]
+        for row in rows:
+            for append, value in zip(appends, row):
+                append(_intern(value))
+        return cls(header, columns)
+
+    @classmethod
+    def from_dicts(cls, records: Iterable[Dict[str, Any]]) -> 'ColumnarRecords':
+        """Build from a list of dicts; keys a record lacks stay absent from its row view."""
+        positions: Dict[str, int] = {}
+        columns: List[List[Any]] = []
+        sparse = False
+        length = 0
+        for record in records:
+            for name, value in record.items():
+                position = positions.get(name)
+                if position is None:
+                    position = positions[name] = len(columns)
+                    columns.append([_MISSING] * length)
+                    sparse = sparse or length > 0
+                columns[position].append(_intern(value))
+            length += 1
+            for column in columns:
+                if len(column) < length:
+                    column.append(_MISSING)
+                    sparse = True
+        return cls(positions, columns, sparse)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [RowView(self, i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('record index out of range')
+        return RowView(self, index)
+
+    def __iter__(self) -> Iterator[RowView]:
+        for index in range(self._length):
+            yield RowView(self, index)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ColumnarRecords):
+            return self.header == other.header and self.to_dicts() == other.to_dicts()
+        if isinstance(other, list):
+            return len(other) == self._length and all(row == record for row, record in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ColumnarRecords({len(self)} records, header={self.header})"
+
+    def column(self, name: str) -> List[Any]:
+        """All values of one field (None where a TTP record lacked it)."""
+        column = self._columns[self._positions[name]]
+        if not self._sparse:
+            return list(column)
+        return [None if value is _MISSING else value for value in column]
+
+    def iter_tuples(self, missing: Any = None) -> Iterator[Tuple[Any, ...]]:
+        """Rows as tuples in header order (missing fields as `missing`)."""
+        for row in zip(*self._columns):
+            yield tuple(missing if value is _MISSING else value for value in row) if self._sparse else row
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """The List[Dict] form the engines return without columnar=True."""
+        return [dict(row.items()) for row in self]
+
+    def write_csv(self, f: IO[str]):
+        writer = csv.writer(f)
+        writer.writerow(self.header)
+        for row in self.iter_tuples(missing=''):
+            writer.writerow(['; '.join(map(str, value)) if isinstance(value, list) else value
+                             for value in row])
+
+    def write_ndjson(self, f: IO[str]):
+        """One JSON object per record."""
+        for row in self:
+            f.write(json.dumps(dict(row.items()), default=str))
+            f.write('\n')
+
+    def to_arrow(self):
+        """pyarrow.Table of the records (requires pyarrow)."""
+        import pyarrow
+        return pyarrow.table({name: self.column(name) for name in self.header})
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the column lists and their distinct values."""
+        seen = set()
+        total = 0
+        for column in self._columns:
+            total += sys.getsizeof(column)
+            for value in column:
+                if id(value) not in seen:
+                    seen.add(id(value))
+                    total += sys.getsizeof(value)
+        return total
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Command Routing (routing.py)
+
+Resolves a typed CLI command (as echoed after the prompt) to the exact
+template cli_command, so an engine can parse once with that template
+instead of sweeping every template that passes the filter.
+
+Template names are "<platform>_<command words>", e.g.
+cisco_ios_show_ip_interface_brief. The platform is everything before the
+first command verb (show, display, get). Each platform's command words form
+a tree; a typed word follows the branch it equals, or every branch it is a
+prefix of (device-style abbreviation: sh ip int br). The deepest template
+reached wins, so trailing arguments (interface names, VRFs, ...) are
+ignored; a tie between different templates resolves to none.
+
+Usage:
+    index = CommandIndex.from_connection(conn)
+    index.resolve("sh ip int br", "cisco_ios")   # 'cisco_ios_show_ip_interface_brief'
+"""
+
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from cleaning import ECHO_VERBS
+except ImportError:
+    from .cleaning import ECHO_VERBS
+
+
+def command_words(command: str) -> List[str]:
+    """Lower-case words of a typed command, up to any output pipe (| include ...)."""
+    return command.split('|', 1)[0].lower().split()
+
+
+def filter_terms(filter_string: Optional[str]) -> List[str]:
+    """Terms a template name must contain to pass filter_string (as get_filtered_templates)."""
+    if not filter_string:
+        return []
+    return [term for term in filter_string.replace('-', '_').split('_') if term and len(term) > 2]
+
+
+class _Node:
+    __slots__ = ('children', 'template')
+
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        self.template: Optional[str] = None
+
+
+class CommandIndex:
+    """Per-platform command word trees built from template names."""
+
+    def __init__(self, cli_commands: Iterable[str]):
+        self._roots: Dict[str, _Node] = {}
+        for cli_command in cli_commands:
+            self.add(cli_command)
+
+    @classmethod
+    def from_connection(cls, conn: sqlite3.Connection) -> 'CommandIndex':
+        return cls(row[0] for row in conn.execute('SELECT cli_command FROM templates'))
+
+    @property
+    def platforms(self) -> List[str]:
+        return sorted(self._roots)
+
+    def add(self, cli_command: str):
+        """Index one template name; names without a command verb are ignored."""
+        words = cli_command.lower().split('_')
+        for position, word in enumerate(words):
+            if word in ECHO_VERBS and position:
+                break
+        else:
+            return
+
+        node = self._roots.setdefault('_'.join(words[:position]), _Node())
+        for word in words[position:]:
+            node = node.children.setdefault(word, _Node())
+        node.template = cli_command
+
+    def platform_for(self, filter_string: Optional[str]) -> Optional[str]:
+        """Longest indexed platform that filter_string starts with (cisco_ios_show_version -> cisco_ios)."""
+        if not filter_string:
+            return None
+        normalized = filter_string.replace('-', '_').lower()
+        matches = [platform for platform in self._roots
+                   if normalized == platform or normalized.startswith(platform + '_')]
+        return max(matches, key=len) if matches else None
+
+    def _deepest(self, node: _Node, words: List[str], depth: int) -> Tuple[int, Set[str]]:
+        """(depth, templates) of the deepest templates reachable by consuming words."""
+        best = (depth, {node.template}) if node.template else (-1, set())
+        if not words:
+            return best
+
+        word = words[0]
+        child = node.children.get(word)
+        branches = [child] if child else [c for name, c in node.children.items() if name.startswith(word)]
+        for branch in branches:
+            found = self._deepest(branch, words[1:], depth + 1)
+            if found[0] > best[0]:
+                best = found
+            elif found[0] == best[0] and found[0] >= 0:
+                best = (best[0], best[1] | found[1])
+        return best
+
+    def expand(self, command: str, platform: str) -> Optional[str]:
+        """Template for command on platform (abbreviations expanded), or None if unknown or ambiguous."""
+        root = self._roots.get(platform)
+        if root is None:
+            return None
+        _, templates = self._deepest(root, command_words(command), 0)
+        return next(iter(templates)) if len(templates) == 1 else None
+
+    def resolve(self, command: str, filter_string: Optional[str] = None) -> Optional[str]:
+        """
+        The one template command maps to, or None.
+
+        The platform comes from filter_string; without one, every platform
+        is tried and the command must resolve on exactly one. The result
+        must also pass filter_string, so routing never leaves the set of
+        templates the filter would have scanned.
+        """
+        platform = self.platform_for(filter_string)
+        platforms = [platform] if platform else self._roots
+        terms = [term.lower() for term in filter_terms(filter_string)]
+
+        resolved = set()
+        for candidate in platforms:
+            template = self.expand(command, candidate)
+            if template and all(term in template.lower() for term in terms):
+                resolved.add(template)
+        return resolved.pop() if len(resolved) == 1 else None
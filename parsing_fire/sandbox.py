@@ -0,0 +1,295 @@
+"""
+Parse Sandbox (sandbox.py)
+
+Runs TextFSM/TTP parses in a small pool of worker subprocesses so a
+template that backtracks forever or eats memory cannot take the caller
+down with it.
+
+Unlike a SIGALRM timeout this works from any thread (thread pools, Qt
+QThread workers), interrupts C-level regex work (the worker is killed, not
+signalled) and always leaves the caller in a clean state: a worker that
+misses its deadline, dies or hits its memory cap is discarded and a fresh
+one is started on the next call.
+
+Usage:
+    sandbox = ParseSandbox(workers=2, timeout=10, memory_limit_mb=1024)
+    header, rows = sandbox.run(parse_textfsm, template_text, cli_output)
+    results = sandbox.run(parse_ttp, template_text, cli_output, timeout=5)
+
+    # Or share one pool per process
+    sandbox = shared_sandbox()
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+import warnings
+from typing import Any, Callable, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows: no address-space limits
+    resource = None
+
+
+class SandboxTimeout(Exception):
+    """The parse did not finish before its deadline (the worker was killed)."""
+
+
+class SandboxError(Exception):
+    """The worker died or could not run the task (crash, memory cap, pickling)."""
+
+
+# =============================================================================
+# Sandboxed tasks (module-level so they pickle by reference)
+# =============================================================================
+
+def parse_textfsm(template_content: str, cli_content: str) -> Tuple[List[str], List[List]]:
+    """Parse with a TextFSM template; returns (header, rows). Compiled templates are cached per worker."""
+    try:
+        from anchors import compiled_textfsm
+    except ImportError:
+        from .anchors import compiled_textfsm
+
+    template = compiled_textfsm(template_content)
+    rows = template.ParseText(cli_content)
+    return template.header, rows
+
+
+def parse_ttp(template_content: str, cli_content: str) -> List:
+    """Parse with a TTP template; returns the raw parser.result() list."""
+    from ttp import ttp
+
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', category=SyntaxWarning)
+        parser = ttp(data=cli_content, template=template_content)
+        parser.parse()
+        return parser.result()
+
+
+# =============================================================================
+# Worker process
+# =============================================================================
+
+def _sandbox_worker(conn, memory_limit_mb: Optional[int]):
+    """Worker body: apply the memory cap, then run (func, args) tasks until told to stop."""
+    if memory_limit_mb and resource is not None:
+        limit = memory_limit_mb * 1024 * 1024
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ValueError, OSError):
+            pass
+
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+
+        func, args = task
+        try:
+            reply = ('ok', func(*args))
+        except MemoryError:
+            reply = ('error', SandboxError(f"Memory limit exceeded ({memory_limit_mb} MB)"))
+        except Exception as e:
+            reply = ('error', e)
+
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # Unpicklable result or exception: report it as text instead
+            try:
+                conn.send(('error', SandboxError(f"{type(e).__name__}: {str(e)[:200]}")))
+            except Exception:
+                break
+
+    conn.close()
+
+
+class _SandboxWorker:
+    """One worker process and its pipe."""
+
+    def __init__(self, ctx, memory_limit_mb: Optional[int]):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_sandbox_worker, args=(child_conn, memory_limit_mb), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.completed = 0
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+def _default_context():
+    """forkserver where available: forking a threaded process (Qt, thread pools) is unsafe."""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+# =============================================================================
+# Sandbox pool
+# =============================================================================
+
+class ParseSandbox:
+    """
+    Thread-safe pool of parse worker subprocesses.
+
+    run() borrows an idle worker (starting one if fewer than `workers`
+    exist, otherwise waiting for one to free up), hands it the task and
+    waits up to the deadline. Results and exceptions raised by the task
+    come back to the caller as if the call were local.
+    """
+
+    def __init__(self, workers: int = 2, timeout: Optional[float] = 10.0,
+                 memory_limit_mb: Optional[int] = None, max_tasks_per_child: Optional[int] = 500,
+                 context=None):
+        self.num_workers = max(1, workers)
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.max_tasks_per_child = max_tasks_per_child
+        self._ctx = context or _default_context()
+        self._idle: List[_SandboxWorker] = []
+        self._alive = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _acquire(self) -> _SandboxWorker:
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise SandboxError("Sandbox is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._alive < self.num_workers:
+                    self._alive += 1
+                    break
+                self._cond.wait()
+
+        try:
+            return _SandboxWorker(self._ctx, self.memory_limit_mb)
+        except Exception:
+            self._discard(None)
+            raise
+
+    def _release(self, worker: _SandboxWorker):
+        worker.completed += 1
+        if self.max_tasks_per_child and worker.completed >= self.max_tasks_per_child:
+            worker.stop()
+            self._discard(None)
+            return
+        with self._cond:
+            if self._closed:
+                worker.stop()
+                self._alive -= 1
+            else:
+                self._idle.append(worker)
+            self._cond.notify()
+
+    def _discard(self, worker: Optional[_SandboxWorker]):
+        if worker is not None:
+            worker.kill()
+        with self._cond:
+            self._alive -= 1
+            self._cond.notify()
+
+    def run(self, func: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """
+        Call func(*args) in a worker and return its result.
+
+        Raises SandboxTimeout if it runs past timeout (default: the pool's),
+        SandboxError if the worker dies, or whatever func itself raised.
+        """
+        deadline = self.timeout if timeout is None else timeout
+        worker = self._acquire()
+
+        try:
+            worker.conn.send((func, args))
+            if not worker.conn.poll(deadline):
+                self._discard(worker)
+                raise SandboxTimeout(f"Parse timed out after {deadline}s")
+            status, value = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            # Worker died mid-task (RLIMIT_AS abort, segfault, OOM kill, ...)
+            self._discard(worker)
+            raise SandboxError(f"Sandbox worker died: {type(e).__name__}") from None
+        except SandboxTimeout:
+            raise
+        except BaseException:
+            self._discard(worker)
+            raise
+
+        self._release(worker)
+        if status == 'error':
+            raise value
+        return value
+
+    def close(self):
+        """Stop idle workers; busy ones are stopped when their task returns."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._alive -= len(idle)
+            self._cond.notify_all()
+        for worker in idle:
+            worker.stop()
+
+
+# =============================================================================
+# Shared per-process sandbox
+# =============================================================================
+
+_shared: Optional[ParseSandbox] = None
+_shared_pid: Optional[int] = None
+_shared_lock = threading.Lock()
+
+
+def shared_sandbox(**kwargs) -> Optional[ParseSandbox]:
+    """
+    Process-wide sandbox, created on first use (kwargs apply to that first call).
+
+    Returns None inside daemonic processes (multiprocessing.Pool and
+    WorkerScheduler workers), which may not start children; callers then
+    parse in-process and rely on their parent's deadline. After a fork the
+    child gets its own pool rather than sharing the parent's pipes.
+    """
+    global _shared, _shared_pid
+
+    if multiprocessing.current_process().daemon:
+        return None
+
+    with _shared_lock:
+        if _shared is None or _shared_pid != os.getpid():
+            kwargs.setdefault('memory_limit_mb', 1024)
+            _shared = ParseSandbox(**kwargs)
+            _shared_pid = os.getpid()
+        return _shared
+
+
+def _close_shared():
+    if _shared is not None and _shared_pid == os.getpid():
+        _shared.close()
+
+
+atexit.register(_close_shared)
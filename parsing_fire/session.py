@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Session Log Splitter (session.py)
+
+Splits a raw terminal session capture (many commands, prompts and their
+output) into per-command segments and validates them in parallel.
+
+- A segment starts at a command echo line (hostname#show ..., the same
+  pattern the output cleaner strips) and ends at the next line starting
+  with that hostname's prompt (the next command or a bare prompt).
+  Output of commands that are not show/display/get is skipped.
+- Each segment's output is cleaned like any other capture (ANSI escapes,
+  --More-- prompts, backspaces).
+- The log is read line by line; only the segment being collected and the
+  segments in flight on the ValidationPipeline are held in memory, so
+  multi-hundred-MB logs stream through.
+- Results are aggregated per command: how often it ran, how many outputs
+  validated, which templates matched and the records parsed.
+
+Usage:
+    for segment in iter_segments("session.log"):
+        print(segment.line, segment.command, len(segment.output))
+
+    for segment, result in parse_session("session.log", "tfsm_templates.db", "cisco_ios"):
+        print(segment.command, result.template, result.record_count)
+
+    python session.py tfsm_templates.db session.log --filter cisco_ios -w 4
+    python session.py tfsm_templates.db session.log -F cisco_ios --sink records.parquet
+"""
+
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+
+import click
+
+try:
+    from cleaning import clean_output, echoed_command, strip_terminal_noise
+    from pipeline import ValidationPipeline
+    from sinks import check_sink_path, open_sink
+    from tfsm_engine import ValidationResult
+except ImportError:
+    from .cleaning import clean_output, echoed_command, strip_terminal_noise
+    from .pipeline import ValidationPipeline
+    from .sinks import check_sink_path, open_sink
+    from .tfsm_engine import ValidationResult
+
+# Characters that can follow a hostname in a prompt (R1#, R1>, user@host$, R1(config)#)
+_PROMPT_CHARS = '#>$('
+
+SessionSource = Union[str, Path, TextIO, Iterable[str]]
+
+
+@dataclass
+class Segment:
+    """One command and its cleaned output; line is the 1-based line of the echo."""
+    index: int
+    hostname: str
+    command: str
+    output: str
+    line: int
+
+
+def _echo_hostname(echo_line: str) -> str:
+    """hostname of an echo line (the text before the first prompt character)."""
+    for position, char in enumerate(echo_line):
+        if char in _PROMPT_CHARS:
+            return echo_line[:position]
+    return echo_line
+
+
+def _is_prompt(stripped: str, hostname: str) -> bool:
+    return (stripped.startswith(hostname) and len(stripped) > len(hostname)
+            and stripped[len(hostname)] in _PROMPT_CHARS)
+
+
+def _iter_lines(source: SessionSource) -> Iterator[str]:
+    if isinstance(source, (str, Path)):
+        with open(source, 'r', encoding='utf-8', errors='replace') as f:
+            yield from f
+    else:
+        yield from source
+
+
+def iter_segments(source: SessionSource) -> Iterator[Segment]:
+    """
+    Yield the show/display/get segments of a session log, in log order.
+
+    source is a path, an open text file or any iterable of lines. Segments
+    whose output is empty after cleaning are skipped.
+    """
+    index = 0
+    hostname = None
+    command = None
+    line_number = 0
+    lines: List[str] = []
+
+    def flush() -> Optional[Segment]:
+        output = clean_output('\n'.join(lines))
+        if command is None or not output.strip():
+            return None
+        return Segment(index, hostname, command, output, line_number)
+
+    for number, raw_line in enumerate(_iter_lines(source), 1):
+        line = strip_terminal_noise(raw_line.rstrip('\r\n'))
+        stripped = line.strip()
+
+        echo = echoed_command(stripped)
+        if echo or (hostname and _is_prompt(stripped, hostname)):
+            segment = flush()
+            if segment:
+                yield segment
+                index += 1
+            lines = []
+            if echo:
+                hostname = _echo_hostname(stripped)
+                command = echo
+                line_number = number
+            else:
+                # Another command (or a bare prompt): skip until the next echo
+                command = None
+            continue
+
+        if command is not None:
+            lines.append(line)
+
+    segment = flush()
+    if segment:
+        yield segment
+
+
+def parse_session(
+        source: SessionSource,
+        db_path: Optional[str] = None,
+        filter_string: Optional[str] = None,
+        workers: int = 4,
+        max_in_flight: Optional[int] = None,
+        processes: bool = False,
+) -> Iterator[Tuple[Segment, ValidationResult]]:
+    """
+    Validate every segment of a session log on a ValidationPipeline.
+
+    Yields (segment, result) in completion order. Reading the log pauses
+    while max_in_flight segments are being validated. filter_string is
+    usually the platform (cisco_ios): each segment's command then routes
+    straight to its template.
+    """
+    with ValidationPipeline(db_path, workers=workers, max_in_flight=max_in_flight,
+                            processes=processes) as pipeline:
+        pending: Dict[Future, Segment] = {}
+
+        for segment in iter_segments(source):
+            while len(pending) >= pipeline.max_in_flight:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+            future = pipeline.submit(segment.hostname, segment.command, segment.output,
+                                     filter_string or pipeline.filter_for(segment.hostname, segment.command))
+            pending[future] = segment
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+
+
+def aggregate(results: Iterable[Tuple[Segment, ValidationResult]]) -> Dict[str, Dict]:
+    """
+    Per-command summary: runs, valid, records, templates (name -> count), lines.
+    Consumes results as they come and keeps only the counts and line numbers.
+    """
+    summary: Dict[str, Dict] = {}
+    for segment, result in results:
+        entry = summary.setdefault(segment.command, {
+            'runs': 0, 'valid': 0, 'records': 0, 'templates': {}, 'lines': [],
+        })
+        entry['runs'] += 1
+        entry['lines'].append(segment.line)
+        if result.is_valid:
+            entry['valid'] += 1
+            entry['records'] += result.record_count
+            entry['templates'][result.template] = entry['templates'].get(result.template, 0) + 1
+    for entry in summary.values():
+        entry['lines'].sort()
+    return summary
+
+
+# =============================================================================
+# CLI Interface
+# =============================================================================
+
+@click.command()
+@click.argument('database', type=click.Path(exists=True, dir_okay=False))
+@click.argument('log', type=click.Path(exists=True, dir_okay=False))
+@click.option('--filter', '-F', 'filter_string', default=None,
+              help='Template filter, usually the platform (e.g. "cisco_ios")')
+@click.option('--workers', '-w', type=int, default=4, help='Validation workers (default: 4)')
+@click.option('--processes', is_flag=True, help='Validate in worker processes instead of threads')
+@click.option('--json', '-j', 'output_json', is_flag=True, help='Output the per-command summary as JSON')
+@click.option('--ndjson', is_flag=True, help='Stream one JSON result per segment as it completes')
+@click.option('--sink', 'sink_path', default=None, callback=check_sink_path,
+              help='Append every segment\'s records (device = hostname) to .ndjson/.jsonl or '
+                   '.db/.sqlite, or write them to .parquet (an existing file is kept; the run '
+                   'goes to NAME.<n>.parquet)')
+def main(database, log, filter_string, workers, processes, output_json, ndjson, sink_path):
+    """
+    Split a session LOG into commands and match each one's output.
+
+    DATABASE: Path to tfsm_templates.db
+    """
+    start_time = time.time()
+    sink = open_sink(sink_path) if sink_path else None
+
+    def written():
+        # Each result is written out as it arrives; aggregate keeps only counts,
+        # so parsed records are dropped once the sink has them
+        for segment, result in parse_session(log, database, filter_string, workers=workers,
+                                             processes=processes):
+            if sink and result.is_valid:
+                sink.write_result(result)
+            if ndjson:
+                record = asdict(result)
+                record.update({'segment': segment.index, 'line': segment.line})
+                click.echo(json.dumps(record, default=str))
+            yield segment, result
+
+    try:
+        summary = aggregate(written())
+    finally:
+        if sink:
+            sink.close()
+    elapsed = time.time() - start_time
+
+    if ndjson:
+        return
+
+    segments = sum(entry['runs'] for entry in summary.values())
+    if output_json:
+        click.echo(json.dumps({'segments': segments, 'elapsed_seconds': elapsed,
+                               'commands': summary}, indent=2, default=str))
+        return
+
+    for command, entry in summary.items():
+        templates = ', '.join(f"{name} x{count}" for name, count in entry['templates'].items())
+        status = click.style(templates, fg='green') if templates else click.style('no match', fg='red')
+        click.echo(f"{command}: {entry['valid']}/{entry['runs']} valid, {entry['records']} records  {status}")
+    click.echo()
+    valid = sum(entry['valid'] for entry in summary.values())
+    click.echo(f"Matched {valid}/{segments} segments in {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
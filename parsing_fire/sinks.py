@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Result Sinks (sinks.py)
+
+Stream parsed records to storage as results arrive, instead of building
+one JSON document in memory. Every record is written with provenance
+columns: device, command, template, score, timestamp, plus record_index
+(position within its result) and record (the fields, as JSON).
+
+- NdjsonSink: one JSON object per line (provenance + fields inline)
+- SqliteSink: rows appended to a table, one transaction per batch, WAL
+- ParquetSink: row groups written to a new Parquet file (requires pyarrow);
+  Parquet files cannot be appended to, so an existing path is kept and the
+  run goes to the next free part (results.1.parquet, results.2.parquet, ...)
+
+Records are buffered and written batch_size at a time; close() (or
+leaving the with-block) flushes the rest. open_sink() picks the sink
+from the file extension.
+
+Usage:
+    with open_sink("results.parquet") as sink:
+        for result in iter_batch(db, files, "cisco_ios"):
+            sink.write(result['parsed_data'], device=result['file'],
+                       template=result['best_template'], score=result['score'])
+
+    python tfsm_fire.py tfsm_templates.db cisco_ios -f r1.txt -f r2.txt --sink results.db
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, IO, Iterable, List, Optional, Tuple, Union
+
+import click
+
+try:
+    from db import connect_writer
+except ImportError:
+    from .db import connect_writer
+
+PYARROW_AVAILABLE = False
+try:
+    import pyarrow
+    import pyarrow.parquet
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pass
+
+# Records buffered before a write
+BATCH_SIZE = 5000
+
+PROVENANCE_COLUMNS = ('device', 'command', 'template', 'score', 'timestamp')
+
+# (device, command, template, score, timestamp, record_index, record)
+SinkRow = Tuple[Optional[str], Optional[str], Optional[str], Optional[float], str, int, Dict[str, Any]]
+
+
+class ResultSink:
+    """Base sink: buffers rows and hands them to _write_batch."""
+
+    def __init__(self, batch_size: int = BATCH_SIZE):
+        self.batch_size = max(1, batch_size)
+        self.records_written = 0
+        self._buffer: List[SinkRow] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, records: Optional[Iterable[Dict[str, Any]]], device: Optional[str] = None,
+              command: Optional[str] = None, template: Optional[str] = None,
+              score: Optional[float] = None, timestamp: Optional[str] = None):
+        """Append one result's records (dicts, or row views of a ColumnarRecords)."""
+        if not records:
+            return
+        timestamp = timestamp or datetime.now().isoformat()
+        for index, record in enumerate(records):
+            self._buffer.append((device, command, template, score, timestamp, index, dict(record.items())))
+            if len(self._buffer) >= self.batch_size:
+                self.flush()
+
+    def write_result(self, result, timestamp: Optional[str] = None):
+        """Append a ValidationResult's records (its device, command, template and score)."""
+        self.write(result.parsed_data, device=result.device, command=result.command,
+                   template=result.template, score=result.score, timestamp=timestamp)
+
+    def flush(self):
+        if self._buffer:
+            batch, self._buffer = self._buffer, []
+            self._write_batch(batch)
+            self.records_written += len(batch)
+
+    def close(self):
+        self.flush()
+
+    def _write_batch(self, batch: List[SinkRow]):
+        raise NotImplementedError
+
+
+class NdjsonSink(ResultSink):
+    """One JSON object per record: provenance columns, record_index and the fields."""
+
+    def __init__(self, target: Union[str, IO[str]], batch_size: int = BATCH_SIZE):
+        super().__init__(batch_size)
+        self._owns_file = isinstance(target, str)
+        self._file = open(target, 'a', encoding='utf-8') if self._owns_file else target
+
+    def _write_batch(self, batch: List[SinkRow]):
+        lines = []
+        for *provenance, index, record in batch:
+            row = dict(zip(PROVENANCE_COLUMNS, provenance))
+            row['record_index'] = index
+            row['record'] = record
+            lines.append(json.dumps(row, default=str))
+        self._file.write('\n'.join(lines) + '\n')
+        self._file.flush()
+
+    def close(self):
+        super().close()
+        if self._owns_file:
+            self._file.close()
+
+
+class SqliteSink(ResultSink):
+    """
+    Appends to a parse_results table (created if missing); each batch is
+    one transaction. Fields are stored as JSON in the record column.
+    """
+
+    def __init__(self, db_path: str, table: str = 'parse_results', batch_size: int = BATCH_SIZE):
+        super().__init__(batch_size)
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}")
+        self.table = table
+        self._conn = connect_writer(db_path)
+        with self._conn:
+            self._conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    device TEXT,
+                    command TEXT,
+                    template TEXT,
+                    score REAL,
+                    timestamp TEXT,
+                    record_index INTEGER,
+                    record TEXT
+                )
+            """)
+        self._insert = (f"INSERT INTO {table} (device, command, template, score, timestamp, "
+                        f"record_index, record) VALUES (?, ?, ?, ?, ?, ?, ?)")
+
+    def _write_batch(self, batch: List[SinkRow]):
+        with self._conn:
+            self._conn.executemany(self._insert, [
+                (*row[:6], json.dumps(row[6], default=str)) for row in batch
+            ])
+
+    def close(self):
+        super().close()
+        self._conn.close()
+
+
+def _parquet_part(path: str) -> Tuple[str, IO[bytes]]:
+    """(path, file) of path or, if it exists, the first free path.<n>.parquet, created exclusively."""
+    stem, extension = os.path.splitext(path)
+    candidate, part = path, 0
+    while True:
+        try:
+            return candidate, open(candidate, 'xb')
+        except FileExistsError:
+            part += 1
+            candidate = f"{stem}.{part}{extension}"
+
+
+class ParquetSink(ResultSink):
+    """
+    Writes one row group per batch to a new Parquet file (fields as a JSON
+    string column). An existing file at path is never overwritten: the
+    records go to path.<n>.parquet instead (self.path); read the parts back
+    together, e.g. pyarrow.parquet.read_table over the directory or a glob.
+    """
+
+    def __init__(self, path: str, batch_size: int = BATCH_SIZE, compression: str = 'zstd'):
+        if not PYARROW_AVAILABLE:
+            raise ImportError("ParquetSink requires pyarrow (pip install pyarrow)")
+        super().__init__(batch_size)
+        self.schema = pyarrow.schema([
+            ('device', pyarrow.string()),
+            ('command', pyarrow.string()),
+            ('template', pyarrow.string()),
+            ('score', pyarrow.float64()),
+            ('timestamp', pyarrow.string()),
+            ('record_index', pyarrow.int64()),
+            ('record', pyarrow.string()),
+        ])
+        self.path, self._file = _parquet_part(path)
+        try:
+            self._writer = pyarrow.parquet.ParquetWriter(self._file, self.schema, compression=compression)
+        except Exception:
+            self._file.close()
+            raise
+
+    def _write_batch(self, batch: List[SinkRow]):
+        columns = list(zip(*batch))
+        columns[6] = [json.dumps(record, default=str) for record in columns[6]]
+        self._writer.write_table(pyarrow.Table.from_arrays(
+            [pyarrow.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema
+        ))
+
+    def close(self):
+        super().close()
+        self._writer.close()
+        self._file.close()
+
+
+_SINK_TYPES = {
+    '.ndjson': NdjsonSink, '.jsonl': NdjsonSink,
+    '.db': SqliteSink, '.sqlite': SqliteSink, '.sqlite3': SqliteSink,
+    '.parquet': ParquetSink,
+}
+
+SINK_EXTENSIONS = tuple(_SINK_TYPES)
+
+
+def open_sink(path: str, batch_size: int = BATCH_SIZE) -> ResultSink:
+    """Sink for path, chosen by extension (.ndjson/.jsonl, .db/.sqlite/.sqlite3, .parquet)."""
+    for extension, sink_type in _SINK_TYPES.items():
+        if path.lower().endswith(extension):
+            return sink_type(path, batch_size=batch_size)
+    raise ValueError(f"Unknown sink type for {path} (use one of: {', '.join(SINK_EXTENSIONS)})")
+
+
+def check_sink_path(ctx, param, value):
+    """click callback for --sink: reject unknown extensions before any parsing starts."""
+    if value and not any(value.lower().endswith(extension) for extension in SINK_EXTENSIONS):
+        raise click.BadParameter(f"use one of: {', '.join(SINK_EXTENSIONS)}")
+    return value
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+CLI Output Sources (source.py)
+
+One wrapper for CLI output however it arrives: a str, bytes/bytearray, a
+memoryview, or a file (memory-mapped). The engines take any of these.
+
+- Files are mapped with mmap instead of read, so a capture is never copied
+  into a Python bytes object.
+- Substring tests (`anchor in source`, used by the anchor prefilter) and
+  fingerprint() run on the raw bytes, so templates ruled out by their
+  anchors never cause a decode.
+- text (decoded as UTF-8, newlines normalized like a file opened in text
+  mode) is computed once on first use and shared by every candidate
+  template.
+
+Usage:
+    with CliSource.from_path("show_tech.txt") as source:
+        template, parsed, score, all_scores = engine.find_best_template(source, "cisco_ios")
+
+    engine.find_best_template(Path("show_version.txt"), "cisco_ios")
+    engine.find_best_template(sock_bytes, "cisco_ios")
+"""
+
+import hashlib
+import mmap
+import os
+import re
+import stat
+import sys
+from functools import cached_property
+from typing import Optional, Union
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+OutputLike = Union[str, Buffer, os.PathLike, 'CliSource']
+
+_NON_SPACE = re.compile(rb'\S')
+
+
+class CliSource:
+    """
+    CLI output held as text or as a byte buffer, decoded on demand.
+
+    Strings are used as they are. Byte input is decoded once, with invalid
+    UTF-8 replaced and \\r\\n / \\r turned into \\n.
+    """
+
+    def __init__(self, data: Union[str, Buffer]):
+        if isinstance(data, str):
+            self.raw: Optional[Buffer] = None
+            self.__dict__['text'] = data
+        else:
+            self.raw = data
+        self._mmap: Optional[mmap.mmap] = data if isinstance(data, mmap.mmap) else None
+
+    @classmethod
+    def _from_file(cls, f) -> 'CliSource':
+        info = os.fstat(f.fileno())
+        if not stat.S_ISREG(info.st_mode):
+            # Pipes and terminals cannot be mapped
+            return cls(f.read())
+        if info.st_size == 0:
+            return cls(b'')
+        return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @classmethod
+    def from_path(cls, path: Union[str, os.PathLike]) -> 'CliSource':
+        """Memory-map a file read-only (empty files become an empty source)."""
+        with open(path, 'rb') as f:
+            return cls._from_file(f)
+
+    @classmethod
+    def from_arg(cls, path: str) -> 'CliSource':
+        """CLI input argument: a file path, or '-' for stdin (mapped when redirected from a file)."""
+        if path == '-':
+            return cls._from_file(sys.stdin.buffer)
+        return cls.from_path(path)
+
+    @classmethod
+    def coerce(cls, data: OutputLike) -> 'CliSource':
+        """data as a CliSource: sources pass through, paths are mapped, the rest is wrapped."""
+        if isinstance(data, CliSource):
+            return data
+        if isinstance(data, os.PathLike):
+            return cls.from_path(data)
+        return cls(data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Unmap a mapped file; text and lines already decoded stay usable."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+            self.raw = None
+
+    @cached_property
+    def text(self) -> str:
+        text = str(self.raw, 'utf-8', 'replace')
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return text
+
+    def __len__(self) -> int:
+        return len(self.text) if self.raw is None else len(self.raw)
+
+    def __contains__(self, needle: str) -> bool:
+        """Substring test, on the raw bytes while the text is not decoded."""
+        if 'text' in self.__dict__ or self.raw is None:
+            return needle in self.text
+        needle_bytes = needle.encode()
+        if isinstance(self.raw, memoryview):
+            return re.search(re.escape(needle_bytes), self.raw) is not None
+        return self.raw.find(needle_bytes) >= 0
+
+    def is_blank(self) -> bool:
+        if 'text' in self.__dict__ or self.raw is None:
+            return not self.text.strip()
+        return _NON_SPACE.search(self.raw) is None
+
+    def fingerprint(self) -> str:
+        """MD5 of the raw bytes (of the UTF-8 text for str input)."""
+        if self.raw is None:
+            return hashlib.md5(self.text.encode()).hexdigest()
+        return hashlib.md5(self.raw).hexdigest()
+
@@ -14,14 +14,30 @@ Usage:
         print(f"Records: {len(result.parsed_data)}")
     else:
         print("Invalid output - no matching template")
+
+    # The command (or its echo in the output) selects the template directly
+    result = engine.validate(output, "cisco_ios", command="sh ip int br")
+
+    # Collection pipelines: one shared engine per (db_path, options)
+    result = validate_output(output, "cisco_ios_show_version")
+    engine = shared_engine(db_path)      # same instance on every call
+    reload_engines(db_path)              # after the database file is replaced
 """
 
+import functools
+import os
+import threading
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 # Import the actual engine from core
-from tfsm_fire import TextFSMAutoEngine
+try:
+    from cleaning import TextLike, clean_output, clean_output_with_command
+    from tfsm_fire import TextFSMAutoEngine
+except ImportError:
+    from .cleaning import TextLike, clean_output, clean_output_with_command
+    from .tfsm_fire import TextFSMAutoEngine
 
 
 @dataclass
@@ -32,6 +48,11 @@ class ValidationResult:
     parsed_data: Optional[List[Dict]] = None
     score: float = 0.0
     error: Optional[str] = None
+    # Set by ValidationPipeline: where the output came from, and
+    # {'queued', 'validate', 'total'} latencies in seconds
+    device: Optional[str] = None
+    command: Optional[str] = None
+    timings: Optional[Dict[str, float]] = None
 
     @property
     def record_count(self) -> int:
@@ -57,6 +78,7 @@ class ValidationEngine:
             db_path: Optional[str] = None,
             min_score: float = 0.01,
             verbose: bool = False,
+            pool_size: int = 4,
     ):
         """
         Initialize validation engine.
@@ -65,23 +87,10 @@ class ValidationEngine:
             db_path: Path to tfsm_templates.db. If None, uses default location.
             min_score: Minimum score to consider output valid.
             verbose: Enable verbose output.
+            pool_size: Read-only database connections shared by calling threads.
         """
-        # Default database location - check multiple places
         if db_path is None:
-            possible_paths = [
-                Path(__file__).parent.parent / "core" / "tfsm_templates.db",
-                Path.home() / ".vcollector" / "tfsm_templates.db",
-            ]
-            for p in possible_paths:
-                if p.exists():
-                    db_path = str(p)
-                    break
-            else:
-                raise FileNotFoundError(
-                    f"TextFSM template database not found. Searched:\n"
-                    f"  - {possible_paths[0]}\n"
-                    f"  - {possible_paths[1]}\n"
-                )
+            db_path = default_db_path()
 
         self.db_path = db_path
         self.min_score = min_score
@@ -92,115 +101,64 @@ class ValidationEngine:
             raise FileNotFoundError(f"TextFSM template database not found: {db_path}")
 
         # Initialize the actual engine
-        self._engine = TextFSMAutoEngine(db_path, verbose=verbose)
+        self._engine = TextFSMAutoEngine(db_path, verbose=verbose, pool_size=pool_size)
 
-    def _clean_output(self, raw_output: str) -> str:
+    def _clean_output(self, raw_output: TextLike) -> str:
         """
         Clean raw CLI output for TextFSM parsing.
 
         Removes:
+        - Terminal noise (ANSI escapes, --More-- prompts, backspaces)
         - Preamble lines (terminal length, pagination messages)
         - Command echo (hostname#show command)
         - Trailing prompts
 
         Args:
-            raw_output: Raw output from SSH session
+            raw_output: Raw output from SSH session (str or bytes-like)
 
         Returns:
             Cleaned output suitable for TextFSM parsing
         """
-        import re
-
-        lines = raw_output.split('\n')
-        cleaned_lines = []
-        found_output_start = False
-
-        # Common preamble patterns to skip
-        preamble_patterns = [
-            r'^terminal\s+(length|width)',
-            r'^pagination\s+disabled',
-            r'^screen-length\s+disable',
-            r'^\s*$',  # Empty lines at start
-        ]
-
-        # Command echo pattern: hostname#command or hostname>command
-        # Also matches: hostname(config)#, hostname(config-if)#, etc.
-        command_echo_pattern = r'^[\w\-\.]+[\#\>\$\)].*?(show|display|get)\s+'
-
-        # Trailing prompt pattern
-        trailing_prompt_pattern = r'^[\w\-\.]+[\#\>\$\)]\s*$'
-
-        for i, line in enumerate(lines):
-            line_stripped = line.strip()
-
-            # Skip empty lines at the start
-            if not found_output_start and not line_stripped:
-                continue
-
-            # Skip preamble lines
-            if not found_output_start:
-                is_preamble = False
-                for pattern in preamble_patterns:
-                    if re.match(pattern, line_stripped, re.IGNORECASE):
-                        is_preamble = True
-                        break
-
-                if is_preamble:
-                    continue
-
-                # Check for command echo line
-                if re.match(command_echo_pattern, line_stripped, re.IGNORECASE):
-                    found_output_start = True
-                    continue  # Skip the command echo itself
-
-                # If we get here without matching preamble or command echo,
-                # this is probably the start of actual output
-                found_output_start = True
-
-            # Skip trailing prompts
-            if re.match(trailing_prompt_pattern, line_stripped):
-                continue
-
-            cleaned_lines.append(line)
-
-        # Remove trailing empty lines
-        while cleaned_lines and not cleaned_lines[-1].strip():
-            cleaned_lines.pop()
-
-        return '\n'.join(cleaned_lines)
+        return clean_output(raw_output)
 
     def validate(
             self,
-            device_output: str,
+            device_output: TextLike,
             filter_string: Optional[str] = None,
+            command: Optional[str] = None,
     ) -> ValidationResult:
         """
         Validate device output against TextFSM templates.
 
+        The command (given, or echoed in the output as hostname#show ...)
+        routes straight to its template for the filter's platform; the full
+        template scan only runs if it does not resolve or scores poorly.
+
         Args:
-            device_output: Raw CLI output from device.
+            device_output: Raw CLI output from device (str, bytes or memoryview).
             filter_string: Template filter (e.g., "cisco_ios_show_version").
+            command: CLI command that produced the output (abbreviations allowed).
 
         Returns:
             ValidationResult with validation status and parsed data.
         """
-        if not device_output or not device_output.strip():
+        # Clean the output before validation, keeping the echoed command
+        cleaned_output, echoed_command = (clean_output_with_command(device_output)
+                                          if device_output is not None else ('', None))
+        if not cleaned_output.strip():
             return ValidationResult(
                 is_valid=False,
                 error="Empty output"
             )
 
         try:
-            # Clean the output before validation
-            cleaned_output = self._clean_output(device_output)
-
             if self.verbose:
                 print(f"[VALIDATION] Cleaned output ({len(cleaned_output)} chars):")
                 print(cleaned_output[:500] + "..." if len(cleaned_output) > 500 else cleaned_output)
 
             # Use tfsm_fire engine to find best template
-            template, parsed_data, score = self._engine.find_best_template(
-                cleaned_output, filter_string
+            template, parsed_data, score, _ = self._engine.find_best_template(
+                cleaned_output, filter_string, command=command or echoed_command
             )
 
             is_valid = score >= self.min_score and parsed_data is not None
@@ -224,23 +182,126 @@ class ValidationEngine:
             templates = self._engine.get_filtered_templates(conn, filter_string)
             return [t['cli_command'] for t in templates]
 
+    def close(self):
+        """Close idle database connections (the engine reopens them if used again)."""
+        self._engine.connection_manager.close_all()
+
+
+@functools.lru_cache(maxsize=None)
+def default_db_path() -> str:
+    """First existing default template database (looked up once per process)."""
+    possible_paths = [
+        Path(__file__).parent.parent / "core" / "tfsm_templates.db",
+        Path.home() / ".vcollector" / "tfsm_templates.db",
+    ]
+    for p in possible_paths:
+        if p.exists():
+            return str(p)
+    raise FileNotFoundError(
+        f"TextFSM template database not found. Searched:\n"
+        f"  - {possible_paths[0]}\n"
+        f"  - {possible_paths[1]}\n"
+    )
+
+
+# =============================================================================
+# Shared engine registry
+# =============================================================================
+
+# One ValidationEngine per (db_path, min_score, verbose, pool_size) in this process.
+# ValidationEngine keeps no per-call state, so threads share an instance;
+# forked children keep using the parent's engines and their warm compiled
+# template caches (the connection pools open fresh connections after fork).
+_engines: Dict[Tuple, ValidationEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def _engine_key(db_path: Optional[str], min_score: float, verbose: bool, pool_size: int) -> Tuple:
+    return (os.path.abspath(db_path or default_db_path()), min_score, verbose, pool_size)
+
+
+def shared_engine(
+        db_path: Optional[str] = None,
+        min_score: float = 0.01,
+        verbose: bool = False,
+        pool_size: int = 4,
+) -> ValidationEngine:
+    """
+    Process-wide ValidationEngine for these options, created on first use.
+
+    Raises FileNotFoundError (and caches nothing) if the database is missing.
+    """
+    key = _engine_key(db_path, min_score, verbose, pool_size)
+    engine = _engines.get(key)
+    if engine is not None:
+        return engine
+
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = ValidationEngine(key[0], min_score=min_score, verbose=verbose,
+                                      pool_size=pool_size)
+            _engines[key] = engine
+        return engine
+
+
+def close_engines():
+    """Close and forget every shared engine; later calls build new ones."""
+    with _engines_lock:
+        engines = list(_engines.values())
+        _engines.clear()
+    for engine in engines:
+        engine.close()
+
+
+def reload_engines(db_path: Optional[str] = None):
+    """
+    Replace the shared engines for db_path (default: all of them).
+
+    Use after the database file itself was replaced (connections opened
+    on the old file keep reading it); edits made through a writer
+    connection are visible without a reload.
+    """
+    default_db_path.cache_clear()
+    if db_path is None:
+        close_engines()
+        return
+
+    path = os.path.abspath(db_path)
+    with _engines_lock:
+        keys = [key for key in _engines if key[0] == path]
+        engines = [_engines.pop(key) for key in keys]
+    for engine in engines:
+        engine.close()
+
+
+def _reset_registry_after_fork():
+    global _engines_lock
+    _engines_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_registry_after_fork)
+
 
 # Convenience function for simple validation
 def validate_output(
-        output: str,
+        output: TextLike,
         filter_string: str,
         db_path: Optional[str] = None,
 ) -> ValidationResult:
     """
     Validate device output against TextFSM templates.
 
+    Uses the shared engine for db_path, so repeated calls reuse its
+    connections and compiled templates.
+
     Args:
-        output: Raw CLI output from device.
+        output: Raw CLI output from device (str, bytes or memoryview).
         filter_string: Template filter (e.g., "cisco_ios_show_version").
         db_path: Path to template database (optional).
 
     Returns:
         ValidationResult with validation status.
     """
-    engine = ValidationEngine(db_path=db_path)
-    return engine.validate(output, filter_string)
\ No newline at end of file
+    return shared_engine(db_path).validate(output, filter_string)
\ No newline at end of file
@@ -1,53 +1,77 @@
+#!/usr/bin/env python3
+"""
+TextFSM Auto-Match Engine (tfsm_fire.py)
+
+Automatically finds the best TextFSM template for unknown CLI output.
+
+Usage:
+    # Find best template for CLI output
+    engine = TextFSMAutoEngine("tfsm_templates.db")
+    template, parsed, score, all_scores = engine.find_best_template(cli_output, "show version")
+
+    # Route straight to the template for a known command (abbreviations allowed)
+    template, parsed, score, all_scores = engine.find_best_template(cli_output, "cisco_ios",
+                                                                    command="sh ip int br")
+
+    # CLI usage
+    python tfsm_fire.py tfsm_templates.db "show interfaces" < cli_output.txt
+    python tfsm_fire.py tfsm_templates.db "cisco_ios" -f r1.txt -f r2.txt -w 4 --ndjson
+    python tfsm_fire.py tfsm_templates.db "cisco_ios" -f r1.txt -f r2.txt -w 4 --dedup
+    python tfsm_fire.py tfsm_templates.db "cisco_ios" --timeout 2 < cli_output.txt
+    python tfsm_fire.py tfsm_templates.db "cisco_ios" -c "sh ip int br" < cli_output.txt
+    python tfsm_fire.py tfsm_templates.db "cisco_ios" --progressive 300 < show_tech.txt
+"""
+
+import os
+from pathlib import Path
 import sqlite3
-import textfsm
-from typing import Dict, List, Tuple, Optional
-import io
+from typing import Dict, Iterator, List, Set, Tuple, Optional
 import time
 import click
-from multiprocessing import Process, Queue
+import json
 import multiprocessing
+import queue
 import sys
-import threading
-from contextlib import contextmanager
 
-
-class ThreadSafeConnection:
-    """Thread-local storage for SQLite connections"""
-
-    def __init__(self, db_path: str, verbose: bool = False):
-        self.db_path = db_path
-        self.verbose = verbose
-        self._local = threading.local()
-
-    @contextmanager
-    def get_connection(self):
-        """Get a thread-local connection"""
-        if not hasattr(self._local, 'connection'):
-            self._local.connection = sqlite3.connect(self.db_path)
-            self._local.connection.row_factory = sqlite3.Row
-            if self.verbose:
-                click.echo(f"Created new connection in thread {threading.get_ident()}")
-
-        try:
-            yield self._local.connection
-        except Exception as e:
-            if hasattr(self._local, 'connection'):
-                self._local.connection.close()
-                delattr(self._local, 'connection')
-            raise e
-
-    def close_all(self):
-        """Close connection if it exists for current thread"""
-        if hasattr(self._local, 'connection'):
-            self._local.connection.close()
-            delattr(self._local, 'connection')
+try:
+    from anchors import ANCHORS_COLUMN, compiled_textfsm, load_anchors, prefilter
+    from db import ConnectionPool
+    from dedup import DedupMatcher, DedupStats
+    from progressive import TOP_K, ProgressiveMatch
+    from records import ColumnarRecords
+    from routing import CommandIndex
+    from sandbox import ParseSandbox, parse_textfsm, shared_sandbox
+    from sinks import ResultSink, check_sink_path, open_sink
+    from source import CliSource, OutputLike
+except ImportError:
+    from .anchors import ANCHORS_COLUMN, compiled_textfsm, load_anchors, prefilter
+    from .db import ConnectionPool
+    from .dedup import DedupMatcher, DedupStats
+    from .progressive import TOP_K, ProgressiveMatch
+    from .records import ColumnarRecords
+    from .routing import CommandIndex
+    from .sandbox import ParseSandbox, parse_textfsm, shared_sandbox
+    from .sinks import ResultSink, check_sink_path, open_sink
+    from .source import CliSource, OutputLike
+
+
+# A routed template (see find_best_template's command) scoring below this falls back to the scan
+ROUTE_MIN_SCORE = 40.0
 
 
 class TextFSMAutoEngine:
-    def __init__(self, db_path: str, verbose: bool = False):
+    def __init__(self, db_path: str, verbose: bool = False, sandbox: Optional[ParseSandbox] = None,
+                 pool_size: int = 4, route_min_score: float = ROUTE_MIN_SCORE):
+        """
+        With a sandbox, each template parse runs there under its deadline; runaway templates score 0.
+        The database is read through up to pool_size read-only connections shared by all threads.
+        """
         self.db_path = db_path
         self.verbose = verbose
-        self.connection_manager = ThreadSafeConnection(db_path, verbose)
+        self.sandbox = sandbox
+        self.route_min_score = route_min_score
+        self.connection_manager = ConnectionPool(db_path, size=pool_size, verbose=verbose)
+        self._command_index: Optional[CommandIndex] = None
 
     def _calculate_template_score(
             self,
@@ -141,50 +165,165 @@ class TextFSMAutoEngine:
 
         return total_score
 
-    def find_best_template(self, device_output: str, filter_string: Optional[str] = None) -> Tuple[
+    def _parse_template(self, template: sqlite3.Row, source: CliSource,
+                        columnar: bool = False) -> Tuple[List[Dict], float]:
+        """
+        Parse the output with one template; returns (records, score). Raises if the parse fails.
+        With columnar, records is a ColumnarRecords built straight from TextFSM's rows.
+        """
+        if self.sandbox:
+            header, parsed = self.sandbox.run(parse_textfsm, template['textfsm_content'], source.text)
+        else:
+            textfsm_template = compiled_textfsm(template['textfsm_content'])
+            parsed = textfsm_template.ParseText(source.text)
+            header = textfsm_template.header
+        if columnar:
+            parsed_dicts = ColumnarRecords.from_rows(header, parsed)
+        else:
+            parsed_dicts = [dict(zip(header, row)) for row in parsed]
+        return parsed_dicts, self._calculate_template_score(parsed_dicts, template, source.text)
+
+    def command_index(self) -> CommandIndex:
+        """Index of template names by platform and command words (built on first use)."""
+        if self._command_index is None:
+            with self.connection_manager.get_connection() as conn:
+                self._command_index = CommandIndex.from_connection(conn)
+        return self._command_index
+
+    def _route(self, source: CliSource, filter_string: Optional[str], command: str, columnar: bool) -> Optional[Tuple[
+            str, List[Dict], float, List[Tuple[str, float, int]]]]:
+        """Parse with the template command resolves to; None if it does not resolve or scores poorly."""
+        cli_command = self.command_index().resolve(command, filter_string)
+        if cli_command is None:
+            if self.verbose:
+                click.echo(f"Command '{command}' does not resolve to one template; scanning")
+            return None
+
+        with self.connection_manager.get_connection() as conn:
+            template = conn.execute('SELECT * FROM templates WHERE cli_command = ?',
+                                    (cli_command,)).fetchone()
+        if template is None:
+            return None
+
+        try:
+            parsed_dicts, score = self._parse_template(template, source, columnar)
+        except Exception as e:
+            parsed_dicts, score = [], 0.0
+            if self.verbose:
+                click.echo(f" -> Failed to parse: {str(e)}")
+
+        if self.verbose:
+            click.echo(f"Routed '{command}' -> {cli_command}: Score={score:.2f}, Records={len(parsed_dicts)}")
+        if score < self.route_min_score:
+            if self.verbose:
+                click.echo(f"Routed score below {self.route_min_score}; scanning")
+            return None
+        return cli_command, parsed_dicts, score, [(cli_command, score, len(parsed_dicts))]
+
+    def find_best_template(self, device_output: OutputLike, filter_string: Optional[str] = None,
+                           command: Optional[str] = None, columnar: bool = False,
+                           progressive: Optional[ProgressiveMatch] = None) -> Tuple[
         Optional[str], Optional[List[Dict]], float, List[Tuple[str, float, int]]]:
-        """Try filtered templates against the output and return the best match plus all non-zero scores."""
+        """
+        Try filtered templates against the output and return the best match plus all non-zero scores.
+
+        device_output is a str, bytes-like object, file path (os.PathLike,
+        memory-mapped) or CliSource; it is decoded and split into lines once
+        for all templates, and only if some template passes the prefilter.
+
+        With command (the CLI command that produced the output, abbreviations
+        allowed), the template it resolves to is parsed first and returned
+        alone if it scores at least route_min_score; otherwise all filtered
+        templates are scanned as usual.
+
+        With columnar, parsed records come back as a ColumnarRecords (row
+        views instead of dicts; see records.py).
+
+        With progressive, the scan runs in two phases: every template on a
+        prefix of the output, then its top_k on the full output (see
+        progressive.py; the ProgressiveMatch collects the statistics).
+        """
+        source = CliSource.coerce(device_output)
+        try:
+            if command:
+                routed = self._route(source, filter_string, command, columnar)
+                if routed is not None:
+                    return routed
+            if progressive is not None:
+                return progressive.run(
+                    lambda parse_source, only: self._scan(source, filter_string, columnar, parse_source, only),
+                    source
+                )
+            return self._scan(source, filter_string, columnar)
+        finally:
+            if isinstance(device_output, os.PathLike):
+                source.close()
+
+    def _scan(self, source: CliSource, filter_string: Optional[str], columnar: bool = False,
+              parse_source: Optional[CliSource] = None, only: Optional[Set[str]] = None) -> Tuple[
+            Optional[str], Optional[List[Dict]], float, List[Tuple[str, float, int]]]:
+        """
+        Score every filtered template (the auto-match sweep).
+
+        Prefilters test source; templates parse parse_source (default: source).
+        only restricts the sweep to those template names.
+        """
+        if parse_source is None:
+            parse_source = source
+
         best_template = None
         best_parsed_output = None
         best_score = 0
         all_scores = []  # List of (template_name, score, record_count)
 
+        # Rows are fetched up front; the connection goes back to the pool before the sweep
         with self.connection_manager.get_connection() as conn:
             templates = self.get_filtered_templates(conn, filter_string)
-            total_templates = len(templates)
 
-            if self.verbose:
-                click.echo(f"Found {total_templates} matching templates for filter: {filter_string}")
+        total_templates = len(templates)
+        has_anchors = bool(templates) and ANCHORS_COLUMN in templates[0].keys()
 
-            for idx, template in enumerate(templates, 1):
-                if self.verbose:
-                    percentage = (idx / total_templates) * 100
-                    click.echo(f"\nTemplate {idx}/{total_templates} ({percentage:.1f}%): {template['cli_command']}")
+        if self.verbose:
+            click.echo(f"Found {total_templates} matching templates for filter: {filter_string}")
 
-                try:
-                    textfsm_template = textfsm.TextFSM(io.StringIO(template['textfsm_content']))
-                    parsed = textfsm_template.ParseText(device_output)
-                    parsed_dicts = [dict(zip(textfsm_template.header, row)) for row in parsed]
-                    score = self._calculate_template_score(parsed_dicts, template, device_output)
+        if only is not None:
+            templates = [template for template in templates if template['cli_command'] in only]
+            total_templates = len(templates)
 
+        for idx, template in enumerate(templates, 1):
+            if self.verbose:
+                percentage = (idx / total_templates) * 100
+                click.echo(f"\nTemplate {idx}/{total_templates} ({percentage:.1f}%): {template['cli_command']}")
+
+            # Current anchors can rule the template out without compiling it
+            if has_anchors:
+                anchors = load_anchors(template[ANCHORS_COLUMN], template['textfsm_content'], 'textfsm')
+                if not prefilter(anchors, source):
                     if self.verbose:
-                        click.echo(f" -> Score={score:.2f}, Records={len(parsed_dicts)}")
+                        click.echo(" -> Skipped: no prefilter anchor in output")
+                    continue
 
-                    # Track all non-zero scores
-                    if score > 0:
-                        all_scores.append((template['cli_command'], score, len(parsed_dicts)))
+            try:
+                parsed_dicts, score = self._parse_template(template, parse_source, columnar)
+
+                if self.verbose:
+                    click.echo(f" -> Score={score:.2f}, Records={len(parsed_dicts)}")
 
-                    if score > best_score:
-                        best_score = score
-                        best_template = template['cli_command']
-                        best_parsed_output = parsed_dicts
-                        if self.verbose:
-                            click.echo(click.style("  New best match!", fg='green'))
+                # Track all non-zero scores
+                if score > 0:
+                    all_scores.append((template['cli_command'], score, len(parsed_dicts)))
 
-                except Exception as e:
+                if score > best_score:
+                    best_score = score
+                    best_template = template['cli_command']
+                    best_parsed_output = parsed_dicts
                     if self.verbose:
-                        click.echo(f" -> Failed to parse: {str(e)}")
-                    continue
+                        click.echo(click.style("  New best match!", fg='green'))
+
+            except Exception as e:
+                if self.verbose:
+                    click.echo(f" -> Failed to parse: {str(e)}")
+                continue
 
         # Sort all_scores by score descending
         all_scores.sort(key=lambda x: x[1], reverse=True)
@@ -207,31 +346,377 @@ class TextFSMAutoEngine:
             cursor.execute("SELECT * FROM templates")
         return cursor.fetchall()
 
+    def list_templates(self, filter_string: Optional[str] = None) -> List[str]:
+        """List available template names."""
+        with self.connection_manager.get_connection() as conn:
+            templates = self.get_filtered_templates(conn, filter_string)
+            return [t['cli_command'] for t in templates]
+
     def __del__(self):
         """Clean up connections on deletion"""
         self.connection_manager.close_all()
 
 
-# Example usage
-if __name__ == '__main__':
-    multiprocessing.freeze_support()
 
 
-    # Example of using the engine in multiple threads
-    def worker(engine, output, filter_str):
-        result = engine.find_best_template(output, filter_str)
-        print(f"Thread {threading.get_ident()}: Found template: {result[0]}")
+# =============================================================================
+# Batch Processing
+# =============================================================================
+
+# Per-process engine for batch workers (created once by the pool initializer)
+_batch_engine = None
+_batch_filter = None
+_batch_top = 5
+
+
+def _init_batch_worker(db_path: str, filter_string: Optional[str], top: int,
+                       timeout: Optional[float] = None):
+    """Pool initializer: build one engine per worker process."""
+    global _batch_engine, _batch_filter, _batch_top
+    # Pool workers are daemonic and get no sandbox (shared_sandbox returns None)
+    _batch_engine = TextFSMAutoEngine(db_path, sandbox=shared_sandbox(timeout=timeout) if timeout else None)
+    _batch_filter = filter_string
+    _batch_top = top
+
+
+def _build_result(best_template, parsed_data, score, all_scores, top, elapsed) -> Dict:
+    """Build the JSON-serializable result dict shared by single and batch modes."""
+    return {
+        'best_template': best_template,
+        'score': score,
+        'records': len(parsed_data) if parsed_data else 0,
+        'parsed_data': parsed_data,
+        'top_matches': [
+            {'template': t, 'score': s, 'records': r}
+            for t, s, r in all_scores[:top]
+        ],
+        'elapsed_seconds': elapsed
+    }
+
+
+def _error_result(path: str, error, start_time: float) -> Dict:
+    result = _build_result(None, None, 0.0, [], _batch_top, time.time() - start_time)
+    result['error'] = str(error)
+    return {'file': path, **result}
+
+
+def _match_source(path: str, cli_output: CliSource, start_time: float) -> Dict:
+    if cli_output.is_blank():
+        return _error_result(path, "No input provided", start_time)
+    best_template, parsed_data, score, all_scores = _batch_engine.find_best_template(
+        cli_output, _batch_filter
+    )
+    return {'file': path, **_build_result(best_template, parsed_data, score, all_scores,
+                                          _batch_top, time.time() - start_time)}
+
+
+def _match_file(path: str) -> Dict:
+    """Batch worker: match a single input file. Never raises."""
+    start_time = time.time()
+    try:
+        with CliSource.from_path(path) as cli_output:
+            return _match_source(path, cli_output, start_time)
+    except Exception as e:
+        return _error_result(path, e, start_time)
+
+
+def _match_text(path: str, text: str) -> Dict:
+    """Batch worker: match already normalized output read from path. Never raises."""
+    start_time = time.time()
+    try:
+        return _match_source(path, CliSource(text), start_time)
+    except Exception as e:
+        return _error_result(path, e, start_time)
+
+
+def _iter_dedup(files: List[str], matcher: DedupMatcher, pool) -> Iterator[Dict]:
+    """
+    Yield batch results, matching each distinct output once.
+
+    Every file is read, cleaned and hashed once, here; only the normalized
+    text of a new key is matched (on pool when given, so matching overlaps
+    the hashing of later files). Files whose key is in flight wait for it;
+    files whose key is already stored get a copy of its result.
+    """
+    completed: "queue.Queue[Tuple[str, Dict]]" = queue.Queue()   # (key, result)
+    waiting: Dict[str, List[str]] = {}     # key in flight -> files (matched one first)
+
+    def submit(key: str, path: str, function, *args):
+        waiting[key] = [path]
+        matcher.stats.distinct += 1
+        if pool is None:
+            completed.put((key, function(*args)))
+        else:
+            pool.apply_async(function, args, callback=lambda result: completed.put((key, result)),
+                             error_callback=lambda e: completed.put((key, _error_result(path, e, time.time()))))
+
+    def finish(key: str, result: Dict) -> List[Dict]:
+        matcher.store(key, result)
+        return [result] + [{**result, 'file': path, 'duplicate_of': result['file']}
+                           for path in waiting.pop(key)[1:]]
+
+    for path in files:
+        matcher.stats.inputs += 1
+        try:
+            key, text = matcher.key(Path(path))
+            function, args = _match_text, (path, text)
+        except OSError:
+            # Unreadable: keyed by its path and matched on its own so its error is reported
+            key, function, args = path, _match_file, (path,)
+
+        stored = matcher.lookup(key)
+        if stored is not None:
+            yield {**stored, 'file': path, 'duplicate_of': stored['file']}
+        elif key in waiting:
+            waiting[key].append(path)
+        else:
+            submit(key, path, function, *args)
+        while not completed.empty():
+            yield from finish(*completed.get())
+
+    while waiting:
+        yield from finish(*completed.get())
+
+
+def iter_batch(database: str, files: List[str], filter_string: Optional[str] = None,
+               workers: int = 1, top: int = 5, timeout: Optional[float] = None,
+               sink: Optional[ResultSink] = None, dedup: Optional[DedupStats] = None):
+    """
+    Match many input files, yielding one result dict per file as it completes.
+
+    With workers > 1 the files are spread across a process pool (one engine
+    per process) and results arrive in completion order, not input order.
+    timeout sandboxes each template parse, in sequential mode only. With a
+    sink, each result's records are written to it (device = file path)
+    before the result is yielded; the caller closes the sink.
+
+    With a DedupStats, each output is cleaned and hashed once (see dedup.py)
+    and each distinct output is matched once; files with the same output
+    get a copy of its result with duplicate_of set to the matched file.
+    dedup is updated as files are read.
+    """
+    if workers <= 1:
+        _init_batch_worker(database, filter_string, top, timeout)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes=workers, initializer=_init_batch_worker,
+                                    initargs=(database, filter_string, top, None))
+
+    if dedup is not None:
+        results = _iter_dedup(files, DedupMatcher(None, filter_string, stats=dedup), pool)
+    elif pool is None:
+        results = map(_match_file, files)
+    else:
+        results = pool.imap_unordered(_match_file, files)
+
+    try:
+        for entry in results:
+            if sink is not None:
+                sink.write(entry['parsed_data'], device=entry['file'],
+                           template=entry['best_template'], score=entry['score'])
+            yield entry
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+
+def _run_batch(database, filter, files, workers, top, output_json, ndjson, timeout=None, sink=None,
+               dedup=False):
+    """Batch mode for main(): one result per input file."""
+    start_time = time.time()
+    results = []
+    matched = 0
+    stats = DedupStats() if dedup else None
+
+    for result in iter_batch(database, list(files), filter, workers=workers, top=top, timeout=timeout,
+                             sink=sink, dedup=stats):
+        if result['best_template']:
+            matched += 1
+
+        if ndjson:
+            # Stream each result as soon as it completes
+            click.echo(json.dumps(result, default=str))
+        elif output_json:
+            results.append(result)
+        else:
+            if result.get('error'):
+                click.echo(f"{result['file']}: " + click.style(f"ERROR {result['error']}", fg='red'))
+            elif result['best_template']:
+                click.echo(f"{result['file']}: {click.style(result['best_template'], fg='green')} "
+                           f"score={result['score']:.2f}, records={result['records']} "
+                           f"({result['elapsed_seconds']:.2f}s)")
+            else:
+                click.echo(f"{result['file']}: " + click.style("no matching template", fg='red'))
+
+    elapsed = time.time() - start_time
+
+    if output_json and not ndjson:
+        click.echo(json.dumps({
+            'files': len(files),
+            'matched': matched,
+            'elapsed_seconds': elapsed,
+            **({'dedup': stats.as_dict()} if stats else {}),
+            'results': results
+        }, indent=2, default=str))
+    elif not ndjson:
+        click.echo()
+        click.echo(f"Matched {matched}/{len(files)} files")
+        if stats:
+            click.echo(f"Deduplicated: {stats}")
+        rate = len(files) / elapsed if elapsed > 0 else 0.0
+        click.echo(f"Elapsed: {elapsed:.2f}s ({rate:.1f} files/sec)")
+
+
+@click.command()
+@click.argument('database', type=click.Path(exists=True))
+@click.argument('filter', required=False)
+@click.option('--input', '-i', type=click.Path(allow_dash=True, dir_okay=False), default='-',
+              help='Input file (default: stdin); files are memory-mapped')
+@click.option('--file', '-f', 'files', multiple=True, type=click.Path(exists=True, dir_okay=False),
+              help='Batch mode: match each file separately (repeatable)')
+@click.option('--workers', '-w', type=int, default=1,
+              help='Worker processes for batch mode (default: 1)')
+@click.option('--verbose', '-v', is_flag=True, help='Verbose output')
+@click.option('--list', '-l', 'list_templates', is_flag=True,
+              help='List available templates')
+@click.option('--top', '-t', type=int, default=5,
+              help='Show top N matches (default: 5)')
+@click.option('--json', '-j', 'output_json', is_flag=True,
+              help='Output results as JSON')
+@click.option('--ndjson', is_flag=True,
+              help='Batch mode: stream one JSON result per line as files complete')
+@click.option('--timeout', type=float, default=None,
+              help='Per-template parse deadline in seconds; parses run in a sandboxed '
+                   'subprocess and templates that overrun are skipped (not with -w > 1)')
+@click.option('--command', '-c', default=None,
+              help='CLI command that produced the output (abbreviations allowed); its template '
+                   'is tried first and the scan only runs if it scores poorly')
+@click.option('--sink', 'sink_path', default=None, callback=check_sink_path,
+              help='Also append parsed records to this file: .ndjson/.jsonl, .db/.sqlite '
+                   '(SQLite) or .parquet (needs pyarrow; an existing file is kept and the run '
+                   'goes to NAME.<n>.parquet)')
+@click.option('--dedup', is_flag=True,
+              help='Batch mode: clean and hash the files first and match each distinct output once')
+@click.option('--progressive', 'prefix_lines', type=int, default=None,
+              help='Score all templates on the first N lines, then re-run the best --finalists '
+                   'on the full output (single input)')
+@click.option('--finalists', type=int, default=TOP_K,
+              help=f'Templates re-run on the full output with --progressive (default: {TOP_K})')
+def main(database, filter, input, files, workers, verbose, list_templates, top, output_json, ndjson, timeout,
+         command, sink_path, dedup, prefix_lines, finalists):
+    """
+    TextFSM Auto-Match Engine - Find the best TextFSM template for CLI output.
+
+    DATABASE: Path to tfsm_templates.db
+    FILTER: Optional filter string (e.g., "cisco_ios", "show_version")
+
+    Examples:
+
+        # Find best template for piped input
+        cat output.txt | python tfsm_fire.py tfsm_templates.db "show version"
+
+        # Find best template with verbose scoring
+        python tfsm_fire.py tfsm_templates.db "cisco" -v < output.txt
+
+        # Batch match many captures with 4 workers, streaming NDJSON
+        python tfsm_fire.py tfsm_templates.db "cisco_ios" -f r1.txt -f r2.txt -w 4 --ndjson
+
+        # Skip templates whose parse takes longer than 2 seconds
+        python tfsm_fire.py tfsm_templates.db "cisco_ios" --timeout 2 < output.txt
+
+        # Parse with the template for a known command, skipping the scan
+        python tfsm_fire.py tfsm_templates.db "cisco_ios" -c "sh ip int br" < output.txt
+
+        # Append every file's records to a SQLite table (or .ndjson / .parquet)
+        python tfsm_fire.py tfsm_templates.db "cisco_ios" -f r1.txt -f r2.txt --sink results.db
+
+        # Match identical outputs (after cleaning) once across a fleet
+        python tfsm_fire.py tfsm_templates.db "cisco_ios" -f site*/show_version.txt --dedup
+
+        # Large output: rank templates on the first 300 lines, re-run the top 5 on all of it
+        python tfsm_fire.py tfsm_templates.db "cisco_ios" --progressive 300 < show_tech.txt
+
+        # List available templates
+        python tfsm_fire.py tfsm_templates.db --list
+        python tfsm_fire.py tfsm_templates.db --list "cisco_ios"
+    """
+    if list_templates:
+        engine = TextFSMAutoEngine(database, verbose=verbose)
+        templates = engine.list_templates(filter)
+        click.echo(f"Found {len(templates)} templates:")
+        for t in templates:
+            click.echo(f"  {t}")
+        return
+
+    sink = open_sink(sink_path) if sink_path else None
+
+    if files:
+        try:
+            _run_batch(database, filter, files, workers, top, output_json, ndjson, timeout, sink, dedup)
+        finally:
+            if sink:
+                sink.close()
+        return
+
+    engine = TextFSMAutoEngine(database, verbose=verbose,
+                               sandbox=shared_sandbox(timeout=timeout) if timeout else None)
+
+    # Map (or read) input; it is decoded only if a template needs it
+    cli_output = CliSource.from_arg(input)
+
+    if cli_output.is_blank():
+        click.echo("Error: No input provided", err=True)
+        raise SystemExit(1)
+
+    progressive = ProgressiveMatch(lines=prefix_lines, top_k=finalists) if prefix_lines else None
+
+    # Find best template
+    start_time = time.time()
+    best_template, parsed_data, score, all_scores = engine.find_best_template(
+        cli_output, filter, command=command, progressive=progressive
+    )
+    elapsed = time.time() - start_time
+    cli_output.close()
+
+    if sink:
+        sink.write(parsed_data, device=None if input == '-' else input, command=command,
+                   template=best_template, score=score)
+        sink.close()
+
+    if output_json or ndjson:
+        result = _build_result(best_template, parsed_data, score, all_scores, top, elapsed)
+        if progressive:
+            result['progressive'] = progressive.as_dict()
+        click.echo(json.dumps(result, indent=None if ndjson else 2, default=str))
+    else:
+        click.echo()
+        click.echo("=" * 60)
+        click.echo("RESULTS")
+        click.echo("=" * 60)
+
+        if best_template:
+            click.echo(f"Best template: {click.style(best_template, fg='green', bold=True)}")
+            click.echo(f"Score: {score:.2f}")
+            click.echo(f"Records parsed: {len(parsed_data) if parsed_data else 0}")
+        else:
+            click.echo(click.style("No matching template found", fg='red'))
+
+        if all_scores and top > 1:
+            click.echo(f"\nTop {min(top, len(all_scores))} matches:")
+            for i, (template, score, records) in enumerate(all_scores[:top], 1):
+                marker = " <--" if template == best_template else ""
+                click.echo(f"  {i}. {template}: score={score:.2f}, records={records}{marker}")
 
+        click.echo(f"\nElapsed: {elapsed:.2f}s")
+        if progressive:
+            click.echo(f"Progressive: {progressive}")
 
-    engine = TextFSMAutoEngine("./secure_cartography/tfsm_templates.db", verbose=True)
-    threads = []
+        if parsed_data and verbose:
+            click.echo("\nParsed data (first 3 records):")
+            for i, record in enumerate(parsed_data[:3], 1):
+                click.echo(f"  Record {i}: {record}")
 
-    # Create multiple threads
-    for i in range(3):
-        t = threading.Thread(target=worker, args=(engine, "sample output", "show version"))
-        threads.append(t)
-        t.start()
 
-    # Wait for all threads to complete
-    for t in threads:
-        t.join()
\ No newline at end of file
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    main()
@@ -80,6 +80,53 @@ except ImportError:
     except ImportError:
         pass
 
+# Parse sandbox: worker threads parse in a subprocess with a hard deadline
+SANDBOX_AVAILABLE = False
+try:
+    from sandbox import parse_textfsm, shared_sandbox
+
+    SANDBOX_AVAILABLE = True
+except ImportError:
+    try:
+        from .sandbox import parse_textfsm, shared_sandbox
+
+        SANDBOX_AVAILABLE = True
+    except ImportError:
+        pass
+
+# Per-template parse deadline (seconds) for sandboxed parsing
+PARSE_TIMEOUT = 10
+
+# Shared database access: GUI writes go through WAL connections so they never block matching
+try:
+    from db import connect_writer
+except ImportError:
+    from .db import connect_writer
+
+# Prefilter anchors: regenerated whenever a template is saved
+ANCHORS_AVAILABLE = False
+try:
+    from anchors import refresh_anchors
+
+    ANCHORS_AVAILABLE = True
+except ImportError:
+    try:
+        from .anchors import refresh_anchors
+
+        ANCHORS_AVAILABLE = True
+    except ImportError:
+        pass
+
+
+def store_anchors(conn: sqlite3.Connection, commands: List[str]):
+    """Rebuild the prefilter anchors of just-saved templates (best effort)."""
+    if not ANCHORS_AVAILABLE or not commands:
+        return
+    try:
+        refresh_anchors(conn, commands)
+    except Exception:
+        traceback.print_exc()
+
 # =============================================================================
 # NTC TEMPLATES GITHUB DOWNLOAD
 # =============================================================================
@@ -144,7 +191,7 @@ class NTCDownloadWorker(QThread):
                 return
 
             # Connect to database
-            conn = sqlite3.connect(self.db_path)
+            conn = connect_writer(self.db_path)
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS templates (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -160,6 +207,7 @@ class NTCDownloadWorker(QThread):
 
             stats = {'imported': 0, 'updated': 0, 'skipped': 0, 'errors': 0}
             total = len(self.templates_to_download)
+            saved = []
 
             for i, template in enumerate(self.templates_to_download, 1):
                 name = template['name']
@@ -187,6 +235,7 @@ class NTCDownloadWorker(QThread):
                                 WHERE cli_command = ?
                             """, (content, textfsm_hash, "ntc-templates", created, cli_command))
                             stats['updated'] += 1
+                            saved.append(cli_command)
                             status = "U"
                         else:
                             stats['skipped'] += 1
@@ -197,6 +246,7 @@ class NTCDownloadWorker(QThread):
                             VALUES (?, ?, ?, ?, ?, ?)
                         """, (cli_command, "", content, textfsm_hash, "ntc-templates", created))
                         stats['imported'] += 1
+                        saved.append(cli_command)
                         status = "+"
 
                     self.progress.emit(i, total, f"{status} {cli_command}")
@@ -206,6 +256,7 @@ class NTCDownloadWorker(QThread):
                     self.progress.emit(i, total, f"E {cli_command}: {str(e)[:30]}")
 
             conn.commit()
+            store_anchors(conn, saved)
             conn.close()
             self.finished.emit(stats)
 
@@ -857,7 +908,8 @@ class TemplateTestWorker(QThread):
             return
 
         try:
-            engine = TextFSMAutoEngine(self.db_path, verbose=self.verbose)
+            sandbox = shared_sandbox(timeout=PARSE_TIMEOUT) if SANDBOX_AVAILABLE else None
+            engine = TextFSMAutoEngine(self.db_path, verbose=self.verbose, sandbox=sandbox)
 
             # find_best_template returns: (best_template, best_parsed, best_score, all_scores)
             # all_scores is List[Tuple[str, float, int]] - (template_name, score, record_count)
@@ -901,9 +953,13 @@ class ManualTestWorker(QThread):
 
     def run(self):
         try:
-            template = textfsm.TextFSM(io.StringIO(self.template_content))
-            parsed = template.ParseText(self.device_output)
-            headers = template.header
+            if SANDBOX_AVAILABLE:
+                headers, parsed = shared_sandbox(timeout=PARSE_TIMEOUT).run(
+                    parse_textfsm, self.template_content, self.device_output)
+            else:
+                template = textfsm.TextFSM(io.StringIO(self.template_content))
+                parsed = template.ParseText(self.device_output)
+                headers = template.header
             self.results_ready.emit(headers, parsed, "")
         except Exception as e:
             traceback.print_exc()
@@ -1482,7 +1538,7 @@ Start
         )
         if file_path:
             try:
-                conn = sqlite3.connect(file_path)
+                conn = connect_writer(file_path)
                 conn.execute("""
                     CREATE TABLE IF NOT EXISTS templates (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -1527,9 +1583,7 @@ Start
             return None
 
         try:
-            conn = sqlite3.connect(str(db_path))
-            conn.row_factory = sqlite3.Row
-            return conn
+            return connect_writer(str(db_path))
         except Exception as e:
             traceback.print_exc()
             QMessageBox.critical(
@@ -1924,6 +1978,7 @@ usa-leaf-1          Eth5           120        R               GigabitEthernet0/0
                         datetime.now().isoformat()
                     ))
                     conn.commit()
+                    store_anchors(conn, [name])
                     conn.close()
                     self.statusBar().showMessage(f"Template saved: {name}")
                     QMessageBox.information(self, "Success", f"Template '{name}' saved to database")
@@ -2038,6 +2093,7 @@ usa-leaf-1          Eth5           120        R               GigabitEthernet0/0
                         data['created']
                     ))
                     conn.commit()
+                    store_anchors(conn, [data['cli_command']])
                     conn.close()
 
                     self.statusBar().showMessage(f"Added template: {data['cli_command']}")
@@ -2084,6 +2140,7 @@ usa-leaf-1          Eth5           120        R               GigabitEthernet0/0
                             template_id
                         ))
                         conn.commit()
+                        store_anchors(conn, [data['cli_command']])
                         conn.close()
 
                         self.statusBar().showMessage(f"Updated template: {data['cli_command']}")
@@ -2153,6 +2210,7 @@ usa-leaf-1          Eth5           120        R               GigabitEthernet0/0
                     template['created']
                 ))
                 conn.commit()
+                store_anchors(conn, [template['cli_command']])
                 conn.close()
 
                 self.statusBar().showMessage(f"Duplicated template: {template['cli_command']}")
@@ -2210,7 +2268,7 @@ usa-leaf-1          Eth5           120        R               GigabitEthernet0/0
         if not conn:
             return
 
-        imported = 0
+        imported = []
         skipped = 0
 
         try:
@@ -2238,7 +2296,7 @@ usa-leaf-1          Eth5           120        R               GigabitEthernet0/0
                         'ntc-templates',
                         datetime.now().isoformat()
                     ))
-                    imported += 1
+                    imported.append(cli_command)
 
                 except Exception as e:
                     traceback.print_exc()
@@ -2246,12 +2304,13 @@ usa-leaf-1          Eth5           120        R               GigabitEthernet0/0
                     continue
 
             conn.commit()
+            store_anchors(conn, imported)
             conn.close()
 
-            self.statusBar().showMessage(f"Imported {imported} templates, skipped {skipped} duplicates")
+            self.statusBar().showMessage(f"Imported {len(imported)} templates, skipped {skipped} duplicates")
             QMessageBox.information(
                 self, "Import Complete",
-                f"Imported: {imported}\nSkipped (duplicates): {skipped}"
+                f"Imported: {len(imported)}\nSkipped (duplicates): {skipped}"
             )
             self.load_all_templates()
 
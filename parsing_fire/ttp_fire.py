@@ -13,47 +13,33 @@ Usage:
     # CLI usage
     python ttp_fire.py ttp_templates.db "show interfaces" < cli_output.txt
     python ttp_fire.py ttp_templates.db --filter "cisco_ios" < cli_output.txt
+    python ttp_fire.py ttp_templates.db "cisco_ios" --timeout 2 < cli_output.txt
+    python ttp_fire.py ttp_templates.db "cisco_ios" --progressive 300 < show_tech.txt
 """
 
+import os
 import sqlite3
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Set, Tuple, Optional
 import time
 import click
-import threading
-from contextlib import contextmanager
 import warnings
 
-
-class ThreadSafeConnection:
-    """Thread-local storage for SQLite connections"""
-
-    def __init__(self, db_path: str, verbose: bool = False):
-        self.db_path = db_path
-        self.verbose = verbose
-        self._local = threading.local()
-
-    @contextmanager
-    def get_connection(self):
-        """Get a thread-local connection"""
-        if not hasattr(self._local, 'connection'):
-            self._local.connection = sqlite3.connect(self.db_path)
-            self._local.connection.row_factory = sqlite3.Row
-            if self.verbose:
-                click.echo(f"Created new connection in thread {threading.get_ident()}")
-
-        try:
-            yield self._local.connection
-        except Exception as e:
-            if hasattr(self._local, 'connection'):
-                self._local.connection.close()
-                delattr(self._local, 'connection')
-            raise e
-
-    def close_all(self):
-        """Close connection if it exists for current thread"""
-        if hasattr(self._local, 'connection'):
-            self._local.connection.close()
-            delattr(self._local, 'connection')
+try:
+    from anchors import ANCHORS_COLUMN, load_anchors, prefilter
+    from db import ConnectionPool
+    from progressive import TOP_K, ProgressiveMatch
+    from records import ColumnarRecords
+    from sandbox import ParseSandbox, parse_ttp, shared_sandbox
+    from sinks import check_sink_path, open_sink
+    from source import CliSource, OutputLike
+except ImportError:
+    from .anchors import ANCHORS_COLUMN, load_anchors, prefilter
+    from .db import ConnectionPool
+    from .progressive import TOP_K, ProgressiveMatch
+    from .records import ColumnarRecords
+    from .sandbox import ParseSandbox, parse_ttp, shared_sandbox
+    from .sinks import check_sink_path, open_sink
+    from .source import CliSource, OutputLike
 
 
 class TTPAutoEngine:
@@ -61,13 +47,18 @@ class TTPAutoEngine:
     Automatic TTP template matching engine.
 
     Tries multiple TTP templates against CLI output and scores
-    each match to find the best template.
+    each match to find the best template. With a sandbox, each parse runs
+    there under its deadline and runaway templates are skipped. The
+    database is read through up to pool_size read-only connections shared
+    by all threads.
     """
 
-    def __init__(self, db_path: str, verbose: bool = False):
+    def __init__(self, db_path: str, verbose: bool = False, sandbox: Optional[ParseSandbox] = None,
+                 pool_size: int = 4):
         self.db_path = db_path
         self.verbose = verbose
-        self.connection_manager = ThreadSafeConnection(db_path, verbose)
+        self.sandbox = sandbox
+        self.connection_manager = ConnectionPool(db_path, size=pool_size, verbose=verbose)
         self._ttp = None  # Lazy load
 
     def _get_ttp(self):
@@ -79,13 +70,16 @@ class TTPAutoEngine:
 
     def _parse_with_ttp(self, template_content: str, cli_content: str) -> List[Dict]:
         """Parse CLI output with TTP template, return list of dicts."""
-        ttp_class = self._get_ttp()
+        if self.sandbox:
+            results = self.sandbox.run(parse_ttp, template_content, cli_content)
+        else:
+            ttp_class = self._get_ttp()
 
-        with warnings.catch_warnings():
-            warnings.filterwarnings('ignore', category=SyntaxWarning)
-            parser = ttp_class(data=cli_content, template=template_content)
-            parser.parse()
-            results = parser.result()
+            with warnings.catch_warnings():
+                warnings.filterwarnings('ignore', category=SyntaxWarning)
+                parser = ttp_class(data=cli_content, template=template_content)
+                parser.parse()
+                results = parser.result()
 
         # Flatten TTP results into list of dicts
         parsed_dicts = []
@@ -212,62 +206,110 @@ class TTPAutoEngine:
 
     def find_best_template(
             self,
-            device_output: str,
-            filter_string: Optional[str] = None
+            device_output: OutputLike,
+            filter_string: Optional[str] = None,
+            columnar: bool = False,
+            progressive: Optional[ProgressiveMatch] = None
     ) -> Tuple[Optional[str], Optional[List[Dict]], float, List[Tuple[str, float, int]]]:
         """
         Try filtered templates against the output and return the best match.
 
         Args:
-            device_output: Raw CLI output to parse
+            device_output: Raw CLI output to parse (str, bytes-like, file path or CliSource;
+                decoded once, and only if some template passes the prefilter)
             filter_string: Optional filter (e.g., "cisco_ios", "show version")
+            columnar: Return the best match's records as a ColumnarRecords
+            progressive: Score every template on a prefix of the output, then only the
+                top_k on the full output (see progressive.py)
 
         Returns:
             Tuple of (best_template_name, parsed_data, score, all_scores)
             all_scores is List of (template_name, score, record_count)
         """
+        source = CliSource.coerce(device_output)
+        try:
+            if progressive is not None:
+                best_template, parsed_data, score, all_scores = progressive.run(
+                    lambda parse_source, only: self._scan(source, filter_string, parse_source, only),
+                    source
+                )
+            else:
+                best_template, parsed_data, score, all_scores = self._scan(source, filter_string)
+            if columnar and parsed_data is not None:
+                parsed_data = ColumnarRecords.from_dicts(parsed_data)
+            return best_template, parsed_data, score, all_scores
+        finally:
+            if isinstance(device_output, os.PathLike):
+                source.close()
+
+    def _scan(self, source: CliSource, filter_string: Optional[str],
+              parse_source: Optional[CliSource] = None, only: Optional[Set[str]] = None) -> Tuple[
+            Optional[str], Optional[List[Dict]], float, List[Tuple[str, float, int]]]:
+        """
+        Score every filtered template (the auto-match sweep).
+
+        Prefilters test source; templates parse parse_source (default: source).
+        only restricts the sweep to those template names.
+        """
+        if parse_source is None:
+            parse_source = source
         best_template = None
         best_parsed_output = None
         best_score = 0
         all_scores = []
 
+        # Rows are fetched up front; the connection goes back to the pool before the sweep
         with self.connection_manager.get_connection() as conn:
             templates = self._get_filtered_templates(conn, filter_string)
-            total_templates = len(templates)
 
-            if self.verbose:
-                click.echo(f"Found {total_templates} matching templates for filter: {filter_string}")
+        total_templates = len(templates)
+        has_anchors = bool(templates) and ANCHORS_COLUMN in templates[0].keys()
 
-            for idx, template in enumerate(templates, 1):
-                if self.verbose:
-                    percentage = (idx / total_templates) * 100
-                    click.echo(f"\nTemplate {idx}/{total_templates} ({percentage:.1f}%): {template['cli_command']}")
+        if self.verbose:
+            click.echo(f"Found {total_templates} matching templates for filter: {filter_string}")
 
-                try:
-                    parsed_dicts = self._parse_with_ttp(
-                        template['ttp_content'],
-                        device_output
-                    )
-                    score = self._calculate_template_score(parsed_dicts, template, device_output)
+        if only is not None:
+            templates = [template for template in templates if template['cli_command'] in only]
+            total_templates = len(templates)
 
+        for idx, template in enumerate(templates, 1):
+            if self.verbose:
+                percentage = (idx / total_templates) * 100
+                click.echo(f"\nTemplate {idx}/{total_templates} ({percentage:.1f}%): {template['cli_command']}")
+
+            # Current anchors can rule the template out without compiling it
+            if has_anchors:
+                anchors = load_anchors(template[ANCHORS_COLUMN], template['ttp_content'], 'ttp')
+                if not prefilter(anchors, source):
                     if self.verbose:
-                        click.echo(f" -> Score={score:.2f}, Records={len(parsed_dicts)}")
+                        click.echo(" -> Skipped: no prefilter anchor in output")
+                    continue
 
-                    # Track all non-zero scores
-                    if score > 0:
-                        all_scores.append((template['cli_command'], score, len(parsed_dicts)))
+            try:
+                parsed_dicts = self._parse_with_ttp(
+                    template['ttp_content'],
+                    parse_source.text
+                )
+                score = self._calculate_template_score(parsed_dicts, template, parse_source.text)
+
+                if self.verbose:
+                    click.echo(f" -> Score={score:.2f}, Records={len(parsed_dicts)}")
 
-                    if score > best_score:
-                        best_score = score
-                        best_template = template['cli_command']
-                        best_parsed_output = parsed_dicts
-                        if self.verbose:
-                            click.echo(click.style("  New best match!", fg='green'))
+                # Track all non-zero scores
+                if score > 0:
+                    all_scores.append((template['cli_command'], score, len(parsed_dicts)))
 
-                except Exception as e:
+                if score > best_score:
+                    best_score = score
+                    best_template = template['cli_command']
+                    best_parsed_output = parsed_dicts
                     if self.verbose:
-                        click.echo(f" -> Failed to parse: {str(e)[:80]}")
-                    continue
+                        click.echo(click.style("  New best match!", fg='green'))
+
+            except Exception as e:
+                if self.verbose:
+                    click.echo(f" -> Failed to parse: {str(e)[:80]}")
+                continue
 
         # Sort all_scores by score descending
         all_scores.sort(key=lambda x: x[1], reverse=True)
@@ -316,12 +358,21 @@ class TTPAutoEngine:
             templates = self._get_filtered_templates(conn, filter_string)
             return [t['cli_command'] for t in templates]
 
-    def parse(self, device_output: str, command: str) -> List[Dict]:
-        """Parse output using a specific template by name."""
+    def parse(self, device_output: OutputLike, command: str, columnar: bool = False) -> List[Dict]:
+        """
+        Parse output (str, bytes-like, file path or CliSource) using a specific template by name.
+        With columnar, the records come back as a ColumnarRecords.
+        """
         template_content = self.get_template(command)
         if not template_content:
             raise ValueError(f"Template not found: {command}")
-        return self._parse_with_ttp(template_content, device_output)
+        source = CliSource.coerce(device_output)
+        try:
+            records = self._parse_with_ttp(template_content, source.text)
+            return ColumnarRecords.from_dicts(records) if columnar else records
+        finally:
+            if isinstance(device_output, os.PathLike):
+                source.close()
 
     def __del__(self):
         """Clean up connections on deletion"""
@@ -335,8 +386,8 @@ class TTPAutoEngine:
 @click.command()
 @click.argument('database', type=click.Path(exists=True))
 @click.argument('filter', required=False)
-@click.option('--input', '-i', type=click.File('r'), default='-',
-              help='Input file (default: stdin)')
+@click.option('--input', '-i', type=click.Path(allow_dash=True, dir_okay=False), default='-',
+              help='Input file (default: stdin); files are memory-mapped')
 @click.option('--verbose', '-v', is_flag=True, help='Verbose output')
 @click.option('--list', '-l', 'list_templates', is_flag=True,
               help='List available templates')
@@ -344,7 +395,20 @@ class TTPAutoEngine:
               help='Show top N matches (default: 5)')
 @click.option('--json', '-j', 'output_json', is_flag=True,
               help='Output results as JSON')
-def main(database, filter, input, verbose, list_templates, top, output_json):
+@click.option('--timeout', type=float, default=None,
+              help='Per-template parse deadline in seconds; parses run in a sandboxed '
+                   'subprocess and templates that overrun are skipped')
+@click.option('--sink', 'sink_path', default=None, callback=check_sink_path,
+              help='Also append parsed records to this file: .ndjson/.jsonl, .db/.sqlite '
+                   '(SQLite) or .parquet (needs pyarrow; an existing file is kept and the run '
+                   'goes to NAME.<n>.parquet)')
+@click.option('--progressive', 'prefix_lines', type=int, default=None,
+              help='Score all templates on the first N lines, then re-run the best --finalists '
+                   'on the full output')
+@click.option('--finalists', type=int, default=TOP_K,
+              help=f'Templates re-run on the full output with --progressive (default: {TOP_K})')
+def main(database, filter, input, verbose, list_templates, top, output_json, timeout, sink_path,
+         prefix_lines, finalists):
     """
     TTP Auto-Match Engine - Find the best TTP template for CLI output.
 
@@ -359,11 +423,21 @@ def main(database, filter, input, verbose, list_templates, top, output_json):
         # Find best template with verbose scoring
         python ttp_fire.py ttp_templates.db "cisco" -v < output.txt
 
+        # Skip templates whose parse takes longer than 2 seconds
+        python ttp_fire.py ttp_templates.db "cisco" --timeout 2 < output.txt
+
+        # Append the parsed records to a SQLite table (or .ndjson / .parquet)
+        python ttp_fire.py ttp_templates.db "cisco" --sink results.db < output.txt
+
+        # Large output: rank templates on the first 300 lines, re-run the top 5 on all of it
+        python ttp_fire.py ttp_templates.db "cisco" --progressive 300 < show_tech.txt
+
         # List available templates
         python ttp_fire.py ttp_templates.db --list
         python ttp_fire.py ttp_templates.db --list "cisco_ios"
     """
-    engine = TTPAutoEngine(database, verbose=verbose)
+    engine = TTPAutoEngine(database, verbose=verbose,
+                           sandbox=shared_sandbox(timeout=timeout) if timeout else None)
 
     if list_templates:
         templates = engine.list_templates(filter)
@@ -372,19 +446,26 @@ def main(database, filter, input, verbose, list_templates, top, output_json):
             click.echo(f"  {t}")
         return
 
-    # Read input
-    cli_output = input.read()
+    # Map (or read) input; it is decoded only if a template needs it
+    cli_output = CliSource.from_arg(input)
 
-    if not cli_output.strip():
+    if cli_output.is_blank():
         click.echo("Error: No input provided", err=True)
         raise SystemExit(1)
 
     # Find best template
     start_time = time.time()
+    progressive = ProgressiveMatch(lines=prefix_lines, top_k=finalists) if prefix_lines else None
     best_template, parsed_data, score, all_scores = engine.find_best_template(
-        cli_output, filter
+        cli_output, filter, progressive=progressive
     )
     elapsed = time.time() - start_time
+    cli_output.close()
+
+    if sink_path:
+        with open_sink(sink_path) as sink:
+            sink.write(parsed_data, device=None if input == '-' else input,
+                       template=best_template, score=score)
 
     if output_json:
         import json
@@ -399,6 +480,8 @@ def main(database, filter, input, verbose, list_templates, top, output_json):
             ],
             'elapsed_seconds': elapsed
         }
+        if progressive:
+            result['progressive'] = progressive.as_dict()
         click.echo(json.dumps(result, indent=2))
     else:
         click.echo()
@@ -420,6 +503,8 @@ def main(database, filter, input, verbose, list_templates, top, output_json):
                 click.echo(f"  {i}. {template}: score={score:.2f}, records={records}{marker}")
 
         click.echo(f"\nElapsed: {elapsed:.2f}s")
+        if progressive:
+            click.echo(f"Progressive: {progressive}")
 
         if parsed_data and verbose:
             click.echo("\nParsed data (first 3 records):")
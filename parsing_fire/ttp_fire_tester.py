@@ -77,6 +77,58 @@ try:
 except ImportError:
     pass
 
+# Parse sandbox: parses run in a subprocess with a hard deadline
+SANDBOX_AVAILABLE = False
+try:
+    from sandbox import parse_ttp, shared_sandbox
+
+    SANDBOX_AVAILABLE = True
+except ImportError:
+    try:
+        from .sandbox import parse_ttp, shared_sandbox
+
+        SANDBOX_AVAILABLE = True
+    except ImportError:
+        pass
+
+# Per-template parse deadline (seconds) for sandboxed parsing
+PARSE_TIMEOUT = 10
+
+# Shared database access: GUI writes go through WAL connections so they never block matching
+try:
+    from db import connect_writer
+except ImportError:
+    from .db import connect_writer
+
+# Prefilter anchors: regenerated whenever a template is saved
+ANCHORS_AVAILABLE = False
+try:
+    from anchors import refresh_anchors
+
+    ANCHORS_AVAILABLE = True
+except ImportError:
+    try:
+        from .anchors import refresh_anchors
+
+        ANCHORS_AVAILABLE = True
+    except ImportError:
+        pass
+
+
+def store_anchors(conn: sqlite3.Connection, commands: List[str]):
+    """Rebuild the prefilter anchors of just-saved templates (best effort)."""
+    if not ANCHORS_AVAILABLE or not commands:
+        return
+    try:
+        refresh_anchors(conn, commands)
+    except Exception:
+        traceback.print_exc()
+
+
+def get_sandbox():
+    """The shared parse sandbox, or None if it is unavailable."""
+    return shared_sandbox(timeout=PARSE_TIMEOUT) if SANDBOX_AVAILABLE else None
+
 # =============================================================================
 # THEMES
 # =============================================================================
@@ -235,20 +287,25 @@ def apply_theme(widget: QWidget, theme_name: str = 'dark'):
 # TTP PARSING UTILITIES
 # =============================================================================
 
-def parse_with_ttp(template_content: str, cli_content: str) -> tuple:
+def parse_with_ttp(template_content: str, cli_content: str, raw: bool = False) -> tuple:
     """
     Parse CLI output with TTP template.
-    Returns (success, results_list, error_message)
+    Returns (success, results_list, error_message), plus the raw TTP result
+    as a fourth item when raw=True.
     """
     if not TTP_AVAILABLE:
-        return False, [], "TTP library not installed"
+        return (False, [], "TTP library not installed") + ((None,) if raw else ())
 
     try:
-        with warnings.catch_warnings():
-            warnings.filterwarnings('ignore', category=SyntaxWarning)
-            parser = ttp(data=cli_content, template=template_content)
-            parser.parse()
-            results = parser.result()
+        sandbox = get_sandbox()
+        if sandbox:
+            results = sandbox.run(parse_ttp, template_content, cli_content)
+        else:
+            with warnings.catch_warnings():
+                warnings.filterwarnings('ignore', category=SyntaxWarning)
+                parser = ttp(data=cli_content, template=template_content)
+                parser.parse()
+                results = parser.result()
 
         # Flatten results
         parsed_dicts = []
@@ -269,9 +326,9 @@ def parse_with_ttp(template_content: str, cli_content: str) -> tuple:
         if results and len(results) > 0:
             extract_records(results[0])
 
-        return True, parsed_dicts, ""
+        return (True, parsed_dicts, "") + ((results,) if raw else ())
     except Exception as e:
-        return False, [], str(e)
+        return (False, [], str(e)) + ((None,) if raw else ())
 
 
 # =============================================================================
@@ -321,7 +378,7 @@ class TTPTester(QMainWindow):
         # Initialize engine if available
         if TTP_ENGINE_AVAILABLE and Path(self.db_path).exists():
             try:
-                self.engine = TTPAutoEngine(self.db_path)
+                self.engine = TTPAutoEngine(self.db_path, sandbox=get_sandbox())
                 self.statusBar().showMessage(f"Loaded database: {self.db_path}")
             except Exception as e:
                 self.statusBar().showMessage(f"Error loading database: {e}")
@@ -608,7 +665,7 @@ class TTPTester(QMainWindow):
 
         if TTP_ENGINE_AVAILABLE and Path(self.db_path).exists():
             try:
-                self.engine = TTPAutoEngine(self.db_path)
+                self.engine = TTPAutoEngine(self.db_path, sandbox=get_sandbox())
                 self.statusBar().showMessage(f"Loaded database: {self.db_path}")
                 self.load_all_templates()
             except Exception as e:
@@ -620,9 +677,7 @@ class TTPTester(QMainWindow):
     def get_db_connection(self) -> Optional[sqlite3.Connection]:
         """Get a database connection"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            return conn
+            return connect_writer(self.db_path)
         except Exception as e:
             QMessageBox.critical(self, "Database Error", str(e))
             return None
@@ -719,19 +774,13 @@ class TTPTester(QMainWindow):
             QMessageBox.warning(self, "Warning", "Please enter CLI output")
             return
 
-        success, results, error = parse_with_ttp(template, cli_output)
+        success, results, error, raw_results = parse_with_ttp(template, cli_output, raw=True)
 
         if success:
             self.populate_results_table(self.manual_results_table, results)
 
             # Show raw JSON
             try:
-                from ttp import ttp as ttp_lib
-                with warnings.catch_warnings():
-                    warnings.filterwarnings('ignore', category=SyntaxWarning)
-                    parser = ttp_lib(data=cli_output, template=template)
-                    parser.parse()
-                    raw_results = parser.result()
                 self.manual_json_output.setPlainText(json.dumps(raw_results, indent=2))
             except Exception as e:
                 self.manual_json_output.setPlainText(f"Error getting raw results: {e}")
@@ -847,6 +896,7 @@ class TTPTester(QMainWindow):
                         VALUES (?, ?, ?, ?)
                     """, (data['command'], data['template'], 'manual', datetime.now().isoformat()))
                     conn.commit()
+                    store_anchors(conn, [data['command']])
                     conn.close()
 
                     self.statusBar().showMessage(f"Added template: {data['command']}")
@@ -887,6 +937,7 @@ class TTPTester(QMainWindow):
                             WHERE id = ?
                         """, (data['command'], data['template'], template_id))
                         conn.commit()
+                        store_anchors(conn, [data['command']])
                         conn.close()
 
                         self.statusBar().showMessage(f"Updated template: {data['command']}")
@@ -994,7 +1045,7 @@ class TTPTester(QMainWindow):
         if not conn:
             return
 
-        imported = 0
+        imported = []
         skipped = 0
 
         try:
@@ -1016,15 +1067,16 @@ class TTPTester(QMainWindow):
                         INSERT INTO templates (cli_command, ttp_content, source, created_at)
                         VALUES (?, ?, ?, ?)
                     """, (cli_command, content, 'imported', datetime.now().isoformat()))
-                    imported += 1
+                    imported.append(cli_command)
                 except Exception as e:
                     print(f"Error importing {file_path}: {e}")
 
             conn.commit()
+            store_anchors(conn, imported)
             conn.close()
 
-            self.statusBar().showMessage(f"Imported {imported}, skipped {skipped}")
-            QMessageBox.information(self, "Import Complete", f"Imported: {imported}\nSkipped: {skipped}")
+            self.statusBar().showMessage(f"Imported {len(imported)}, skipped {skipped}")
+            QMessageBox.information(self, "Import Complete", f"Imported: {len(imported)}\nSkipped: {skipped}")
             self.load_all_templates()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Import failed: {e}")
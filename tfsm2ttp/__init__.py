@@ -20,10 +20,18 @@ from .core import (
     analyze_column_patterns,
     infer_variable_type,
     substitute_ttp_vars,
+    substitute_ttp_spans,
+    VarSpan,
+    TTPSubstitution,
     generalize_pattern,
     pattern_signature,
 )
 
+from .index import (
+    ValueAutomaton,
+    LineIndex,
+)
+
 from .table import (
     find_source_line,
     generate_table_template,
@@ -45,7 +53,17 @@ from .validation import (
     compare_results,
 )
 
+from .optimize import (
+    OptimizationResult,
+    optimize_ttp_template,
+    tighten_variables,
+)
+
+from .profiling import ConversionProfile
+
 from .converter import (
+    ConversionResult,
+    convert_ttp_template,
     generate_ttp_template,
     safe_generate_ttp_template,
 )
@@ -58,8 +76,14 @@ __all__ = [
     "analyze_column_patterns",
     "infer_variable_type",
     "substitute_ttp_vars",
+    "substitute_ttp_spans",
+    "VarSpan",
+    "TTPSubstitution",
     "generalize_pattern",
     "pattern_signature",
+    # Value indexing
+    "ValueAutomaton",
+    "LineIndex",
     # Table parsing
     "find_source_line",
     "generate_table_template",
@@ -73,7 +97,15 @@ __all__ = [
     # Validation
     "validate_ttp_template",
     "compare_results",
+    # Optimization
+    "OptimizationResult",
+    "optimize_ttp_template",
+    "tighten_variables",
+    # Profiling
+    "ConversionProfile",
     # Main converter
+    "ConversionResult",
+    "convert_ttp_template",
     "generate_ttp_template",
     "safe_generate_ttp_template",
 ]
@@ -5,17 +5,58 @@ Build TTP Templates Database
 Reads the JSON sidecar files from textfsm_to_ttp export and creates
 a ttp_templates.db SQLite database for use with ttp_fire.py.
 
+The converter can also write the database directly (python -m tfsm2ttp
+... --db ttp_templates.db) through TemplateWriter, skipping the export
+directory entirely.
+
+Rebuilds are incremental: each row remembers the export file it came from,
+its size and mtime, and a hash of its content, so only new or edited
+exports are parsed and written, and rows whose export files were removed
+are deleted. Files whose size and mtime are unchanged are not even read.
+
+Each row also gets prefilter anchors (parsing_fire.anchors, loaded on
+first use and optional: without parsing_fire rows are written without
+them) that lets ttp_fire rule templates out without compiling them. Rows
+whose anchors are missing or stale (older databases, a TTP upgrade) are
+refreshed on every build.
+
 Usage:
     python build_ttp_db.py ./ttp_templates
     python build_ttp_db.py ./ttp_templates --output ttp_templates.db
 """
 
 import sqlite3
+import hashlib
 import json
 import os
 import sys
 import argparse
+import functools
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+
+UPSERT_SQL = '''
+    INSERT OR REPLACE INTO templates
+    (cli_command, ttp_content, cli_content, textfsm_rows, ttp_rows, match_ratio, source,
+     anchors)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+IMPORT_SQL = '''
+    INSERT OR REPLACE INTO templates
+    (cli_command, ttp_content, cli_content, textfsm_rows, ttp_rows, match_ratio, source,
+     source_file, content_hash, source_stat, anchors)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Columns added after the original schema: (name, type)
+TRACKING_COLUMNS = (('source_file', 'TEXT'), ('content_hash', 'TEXT'), ('anchors', 'TEXT'),
+                    ('source_stat', 'TEXT'))
+
+# Below this many changed files, parsing in-process beats starting a pool
+PARALLEL_THRESHOLD = 64
 
 
 def create_database(db_path: str) -> sqlite3.Connection:
@@ -41,6 +82,12 @@ def create_database(db_path: str) -> sqlite3.Connection:
         CREATE INDEX IF NOT EXISTS idx_cli_command ON templates(cli_command)
     ''')
 
+    # Upgrade databases built before incremental imports and anchors
+    existing = {row[1] for row in cursor.execute('PRAGMA table_info(templates)')}
+    for name, col_type in TRACKING_COLUMNS:
+        if name not in existing:
+            cursor.execute(f'ALTER TABLE templates ADD COLUMN {name} {col_type}')
+
     conn.commit()
     return conn
 
@@ -73,10 +120,116 @@ def load_ttp_file(ttp_path: str) -> str:
     return '\n'.join(template_lines).strip()
 
 
-def import_templates(conn: sqlite3.Connection, export_dir: str, verbose: bool = False) -> dict:
-    """Import templates from export directory."""
+@functools.lru_cache(maxsize=None)
+def _anchors():
+    """The anchor builder module, or None when parsing_fire is not importable."""
+    try:
+        from parsing_fire import anchors
+    except ImportError:  # tfsm2ttp on its own: rows are written without anchors
+        return None
+    return anchors
+
+
+def refresh_anchors(conn: sqlite3.Connection) -> Optional[int]:
+    """Build missing or stale anchors; number built, or None without the builder."""
+    anchors = _anchors()
+    return anchors.refresh_anchors(conn)['built'] if anchors else None
+
+
+def ttp_anchors(ttp_content: str) -> Optional[str]:
+    """Serialized prefilter anchors for a TTP template, or None."""
+    anchors = _anchors()
+    if anchors is None:
+        return None
+    try:
+        return anchors.dump_anchors(anchors.build_ttp_anchors(ttp_content))
+    except Exception:
+        return None
+
+
+def export_stat(json_path: Path) -> str:
+    """Size and mtime_ns of a JSON sidecar and its .ttp file, as stored in source_stat."""
+    parts = []
+    for path in (json_path, json_path.with_suffix('.ttp')):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            if path is json_path:
+                raise
+            continue
+        parts.append(f"{st.st_size}:{st.st_mtime_ns}")
+    return ' '.join(parts)
+
+
+def export_hash(json_path: Path) -> str:
+    """MD5 over a JSON sidecar and its .ttp file (the .ttp wins on import)."""
+    digest = hashlib.md5(json_path.read_bytes())
+    ttp_path = json_path.with_suffix('.ttp')
+    if ttp_path.exists():
+        digest.update(b'\0')
+        digest.update(ttp_path.read_bytes())
+    return digest.hexdigest()
+
+
+def load_export(job: Tuple[str, str, str]) -> Tuple[str, Optional[tuple], Optional[str]]:
+    """
+    Parse one export into an IMPORT_SQL row.
+    Takes (json_path, content_hash, source_stat); returns (file_name, row, problem) where
+    row is None and problem says why when the export is skipped or broken.
+    """
+    json_path, digest, file_stat = job
+    json_file = Path(json_path)
+    try:
+        data = load_json_file(json_path)
+        command = data.get('command')
+
+        if not command:
+            return json_file.name, None, None
+
+        # Try to load corresponding .ttp file
+        ttp_file = json_file.with_suffix('.ttp')
+        if ttp_file.exists():
+            ttp_content = load_ttp_file(ttp_file)
+        else:
+            # Fall back to ttp_template in JSON
+            ttp_content = data.get('ttp_template', '')
+
+        if not ttp_content:
+            return json_file.name, None, f"Skipped {command}: no TTP content"
+
+        return json_file.name, (
+            command,
+            ttp_content,
+            data.get('cli_content', ''),
+            data.get('textfsm_rows'),
+            data.get('ttp_rows'),
+            data.get('match_ratio'),
+            data.get('source', 'converted'),
+            json_file.name,
+            digest,
+            file_stat,
+            ttp_anchors(ttp_content)
+        ), None
+
+    except Exception as e:
+        return json_file.name, None, f"Error: {e}"
+
+
+def import_templates(conn: sqlite3.Connection, export_dir: str, verbose: bool = False,
+                     workers: int = None, prune: bool = True) -> dict:
+    """
+    Import templates from export directory.
+
+    Exports whose size and mtime match the stored row are skipped without
+    being read; the rest are hashed, and those whose content hash matches
+    only get their stored size and mtime updated. Changed ones are parsed (in parallel when there are many) and written with one
+    executemany in a single transaction. With prune, rows imported from
+    export files that no longer exist are deleted.
+    """
     stats = {
         'imported': 0,
+        'unchanged': 0,
+        'deleted': 0,
         'skipped': 0,
         'errors': 0,
         'error_list': []
@@ -85,67 +238,148 @@ def import_templates(conn: sqlite3.Connection, export_dir: str, verbose: bool =
     export_path = Path(export_dir)
 
     # Find all JSON files (excluding special directories)
-    json_files = [f for f in export_path.glob('*.json')
-                  if not f.name.startswith('_')]
+    json_files = sorted(f for f in export_path.glob('*.json')
+                        if not f.name.startswith('_'))
 
     if verbose:
         print(f"Found {len(json_files)} JSON files in {export_dir}")
 
     cursor = conn.cursor()
-
+    known = {name: (digest, file_stat) for name, digest, file_stat in cursor.execute(
+        'SELECT source_file, content_hash, source_stat FROM templates WHERE source_file IS NOT NULL'
+    )}
+
+    # stat() first; only exports whose size or mtime moved are hashed, and
+    # only those whose hash changed get parsed
+    jobs = []
+    touched = []
     for json_file in json_files:
+        stored_hash, stored_stat = known.get(json_file.name, (None, None))
         try:
-            # Load JSON data
-            data = load_json_file(json_file)
-            command = data.get('command')
-
-            if not command:
-                stats['skipped'] += 1
-                continue
-
-            # Try to load corresponding .ttp file
-            ttp_file = json_file.with_suffix('.ttp')
-            if ttp_file.exists():
-                ttp_content = load_ttp_file(ttp_file)
-            else:
-                # Fall back to ttp_template in JSON
-                ttp_content = data.get('ttp_template', '')
-
-            if not ttp_content:
-                stats['skipped'] += 1
-                if verbose:
-                    print(f"  Skipped {command}: no TTP content")
+            file_stat = export_stat(json_file)
+            if file_stat == stored_stat:
+                stats['unchanged'] += 1
                 continue
-
-            # Insert into database
-            cursor.execute('''
-                INSERT OR REPLACE INTO templates 
-                (cli_command, ttp_content, cli_content, textfsm_rows, ttp_rows, match_ratio, source)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                command,
-                ttp_content,
-                data.get('cli_content', ''),
-                data.get('textfsm_rows'),
-                data.get('ttp_rows'),
-                data.get('match_ratio'),
-                data.get('source', 'converted')
-            ))
-
-            stats['imported'] += 1
-            if verbose:
-                print(f"  Imported: {command}")
-
-        except Exception as e:
+            digest = export_hash(json_file)
+        except OSError as e:
             stats['errors'] += 1
             stats['error_list'].append((json_file.name, str(e)))
+            continue
+        if digest == stored_hash:
+            stats['unchanged'] += 1
+            touched.append((file_stat, json_file.name))
+        else:
+            jobs.append((str(json_file), digest, file_stat))
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers > 1 and len(jobs) >= PARALLEL_THRESHOLD:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            loaded = list(executor.map(load_export, jobs, chunksize=32))
+    else:
+        loaded = [load_export(job) for job in jobs]
+
+    rows = []
+    for name, row, problem in loaded:
+        if row is not None:
+            rows.append(row)
+            if verbose:
+                print(f"  Imported: {row[0]}")
+        elif problem and problem.startswith('Error: '):
+            stats['errors'] += 1
+            stats['error_list'].append((name, problem[len('Error: '):]))
             if verbose:
-                print(f"  Error {json_file.name}: {e}")
+                print(f"  Error {name}: {problem[len('Error: '):]}")
+        else:
+            stats['skipped'] += 1
+            if verbose and problem:
+                print(f"  {problem}")
+
+    # Rows for exports that vanished, or no longer carry a template
+    present = {f.name for f in json_files}
+    stale = [(name,) for name in known if name not in present] if prune else []
+    stale += [(name,) for name, row, problem in loaded
+              if row is None and name in known and not (problem or '').startswith('Error: ')]
+
+    # Bulk-load tuning: the whole import is one transaction, and a crash
+    # mid-import only costs a rerun (the exports are the source of truth)
+    cursor.execute('PRAGMA synchronous = OFF')
+    cursor.execute('PRAGMA temp_store = MEMORY')
+    cursor.execute('PRAGMA cache_size = -65536')
+
+    with conn:
+        if rows:
+            cursor.executemany(IMPORT_SQL, rows)
+        if touched:
+            cursor.executemany('UPDATE templates SET source_stat = ? WHERE source_file = ?', touched)
+        if stale:
+            cursor.executemany('DELETE FROM templates WHERE source_file = ?', stale)
+
+    stats['imported'] = len(rows)
+    stats['deleted'] = len(stale)
+    built = refresh_anchors(conn)
+    if built is not None:
+        stats['anchors'] = built
+    if verbose:
+        for (name,) in stale:
+            print(f"  Deleted: {name} (export removed)")
 
-    conn.commit()
     return stats
 
 
+class TemplateWriter:
+    """
+    Writes converted templates straight into a ttp_templates.db.
+
+    Rows are buffered and upserted with executemany, one transaction per
+    batch_size rows, so a full conversion run costs a few dozen commits
+    instead of a .ttp and .json file per template plus a rebuild.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 200):
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.conn = create_database(db_path)
+        self.pending = []
+        self.written = 0
+
+    def existing_commands(self) -> Set[str]:
+        """Commands already stored in the database."""
+        cursor = self.conn.execute('SELECT cli_command FROM templates')
+        return {row[0] for row in cursor}
+
+    def add(self, result: Dict):
+        """Queue one successful conversion result (as produced by process_single_template)."""
+        ttp_content = result['ttp_template'].strip()
+        self.pending.append((
+            result['command'],
+            ttp_content,
+            result.get('cli_content', ''),
+            result.get('textfsm_rows'),
+            result.get('ttp_rows'),
+            result.get('match_ratio'),
+            result.get('source') or 'converted',
+            ttp_anchors(ttp_content)
+        ))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write queued rows in a single transaction."""
+        if not self.pending:
+            return
+        with self.conn:
+            self.conn.executemany(UPSERT_SQL, self.pending)
+        self.written += len(self.pending)
+        self.pending = []
+
+    def close(self):
+        """Flush, fill in anchors for rows written by older builds, and close."""
+        self.flush()
+        refresh_anchors(self.conn)
+        self.conn.close()
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Build TTP templates database from JSON exports',
@@ -162,6 +396,10 @@ Examples:
                         help='Output database path (default: ttp_templates.db)')
     parser.add_argument('--verbose', '-v', action='store_true',
                         help='Verbose output')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help='Parallel parser processes (default: CPU count)')
+    parser.add_argument('--keep-missing', action='store_true',
+                        help='Keep rows whose export files have been removed')
 
     args = parser.parse_args()
 
@@ -177,7 +415,8 @@ Examples:
     conn = create_database(args.output)
 
     # Import templates
-    stats = import_templates(conn, args.export_dir, args.verbose)
+    stats = import_templates(conn, args.export_dir, args.verbose,
+                             workers=args.workers, prune=not args.keep_missing)
 
     conn.close()
 
@@ -187,7 +426,11 @@ Examples:
     print("SUMMARY")
     print("=" * 50)
     print(f"Templates imported: {stats['imported']}")
+    print(f"Templates unchanged:{stats['unchanged']}")
+    print(f"Templates deleted:  {stats['deleted']}")
     print(f"Templates skipped:  {stats['skipped']}")
+    if 'anchors' in stats:
+        print(f"Anchors refreshed:  {stats['anchors']}")
     print(f"Errors:             {stats['errors']}")
 
     if stats['error_list']:
@@ -0,0 +1,91 @@
+"""
+Checkpoint Journal
+
+Append-only NDJSON journal of conversion outcomes, kept in the export
+directory. Each line records a template's command, id, content hashes,
+outcome and the run settings that produced it. A later run with the same
+settings skips templates whose TextFSM content and CLI sample hash the
+same, so interrupted runs resume and NTC updates only reconvert what
+changed.
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+
+CHECKPOINT_FILENAME = '_checkpoint.ndjson'
+
+
+def content_hash(text: Optional[str]) -> str:
+    """MD5 of template/sample text (same scheme as the textfsm_hash column)."""
+    return hashlib.md5((text or '').encode()).hexdigest()
+
+
+def is_resumable(entry: Dict) -> bool:
+    """Timeouts and worker crashes may be transient, so they are retried."""
+    error = entry.get('error') or ''
+    if entry.get('status') == 'failed_generation':
+        return not (error.startswith('Timeout') or error.startswith('Worker exception'))
+    return entry.get('status') is not None
+
+
+class CheckpointJournal:
+    """
+    Journal of completed templates, keyed by command.
+
+    Loading tolerates a torn final line from a crash; later lines win. The
+    file is compacted to one line per command whenever it is reopened.
+    """
+
+    def __init__(self, path: str, settings: Dict, fresh: bool = False):
+        self.path = path
+        self.settings = settings
+        self.entries: Dict[str, Dict] = {}
+
+        if not fresh and os.path.exists(path):
+            self._load()
+            self._compact()
+            self._fh = open(path, 'a')
+        else:
+            self._fh = open(path, 'w')
+
+    def _load(self):
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and entry.get('command'):
+                    self.entries[entry['command']] = entry
+
+    def _compact(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry, default=str) + '\n')
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, command: str, textfsm_hash: str, cli_hash: str) -> Optional[Dict]:
+        """Return the recorded outcome if it is still valid for this content, else None."""
+        entry = self.entries.get(command)
+        if (entry is None
+                or entry.get('textfsm_hash') != textfsm_hash
+                or entry.get('cli_hash') != cli_hash
+                or entry.get('settings') != self.settings
+                or not is_resumable(entry)):
+            return None
+        return entry
+
+    def append(self, summary: Dict, textfsm_hash: str, cli_hash: str):
+        """Record one outcome and flush it to disk."""
+        entry = dict(summary, textfsm_hash=textfsm_hash, cli_hash=cli_hash, settings=self.settings)
+        self._fh.write(json.dumps(entry, default=str) + '\n')
+        self._fh.flush()
+        if entry.get('command'):
+            self.entries[entry['command']] = entry
+
+    def close(self):
+        if not self._fh.closed:
+            self._fh.close()
@@ -16,9 +16,14 @@ from .core import (
     filter_quality_rows,
     rows_to_dicts,
 )
-from .converter import generate_ttp_template, safe_generate_ttp_template
+from .converter import generate_ttp_template, convert_ttp_template
 from .validation import validate_ttp_template, compare_results
+from .optimize import optimize_ttp_template
+from .profiling import ConversionProfile
 from .multisection import parse_textfsm_filldown_values
+from .scheduler import WorkerScheduler, DONE, TIMEOUT
+from .build_ttp_db import TemplateWriter
+from .checkpoint import CheckpointJournal, CHECKPOINT_FILENAME, content_hash
 
 
 # =============================================================================
@@ -31,7 +36,10 @@ def process_single_template(args: Tuple) -> Dict:
     Takes a tuple to work with ProcessPoolExecutor.
     Returns a dict with results.
     """
-    id_, cli_command, cli_content, textfsm_content, source, validate, min_cols = args
+    (id_, cli_command, cli_content, textfsm_content, source, validate, min_cols, optimize,
+     memory_limit_mb) = args
+    start = time.perf_counter()
+    timings = {}  # Phase seconds, for --profile; every returned result carries them
 
     result = {
         'id': id_,
@@ -43,46 +51,70 @@ def process_single_template(args: Tuple) -> Dict:
         'textfsm_rows': 0,
         'ttp_rows': 0,
         'match_ratio': None,
+        'category': None,
+        'optimization': None,
         # For JSON export
         'textfsm_parsed': [],
         'ttp_parsed': [],
         'cli_content': cli_content,
-        'textfsm_template': textfsm_content
+        'textfsm_template': textfsm_content,
+        'timings': timings
     }
 
     # Validate inputs
     if not cli_content or not cli_content.strip():
         result['status'] = 'failed_generation'
         result['error'] = "Empty CLI content"
+        timings['total'] = time.perf_counter() - start
         return result
 
     if not textfsm_content or not textfsm_content.strip():
         result['status'] = 'failed_generation'
         result['error'] = "Empty TextFSM template"
+        timings['total'] = time.perf_counter() - start
         return result
 
-    # Try to generate TTP template
-    success, ttp_template, error = safe_generate_ttp_template(textfsm_content, cli_content, min_cols)
+    # Try to generate TTP template (keeps the TextFSM parse for validation)
+    conversion = convert_ttp_template(textfsm_content, cli_content, min_cols)
+    ttp_template, error = conversion.ttp_template, conversion.error
+    timings.update(conversion.timings)
 
-    if not success:
+    if not conversion.success:
         if "No quality rows" in error or "No quality data" in error:
             result['status'] = 'no_patterns'
             result['error'] = error
         else:
             result['status'] = 'failed_generation'
             result['error'] = error
+        timings['total'] = time.perf_counter() - start
         return result
 
     result['ttp_template'] = ttp_template
+    result['category'] = conversion.category
 
     # Validate TTP if requested
     if validate:
-        val_success, ttp_results, val_error = validate_ttp_template(ttp_template, cli_content)
+        phase_start = time.perf_counter()
+        val_success, ttp_results, val_error = validate_ttp_template(ttp_template, cli_content,
+                                                                    memory_limit_mb=memory_limit_mb)
+        timings['validation'] = time.perf_counter() - phase_start
 
         if val_success:
             try:
-                headers, fsm_rows = parse_with_textfsm(textfsm_content, cli_content)
-                quality_rows = filter_quality_rows(headers, fsm_rows, min_cols=min_cols)
+                quality_rows = conversion.quality_rows
+
+                # Swap in a faster variant that keeps row parity on the sample
+                if optimize:
+                    phase_start = time.perf_counter()
+                    optimized = optimize_ttp_template(ttp_template, textfsm_content, cli_content,
+                                                      quality_rows, ttp_results=ttp_results)
+                    timings['optimize'] = time.perf_counter() - phase_start
+                    result['optimization'] = optimized.variant
+                    if optimized.variant != 'original':
+                        result['ttp_template'] = optimized.ttp_template
+                        result['parse_speedup'] = optimized.speedup
+                        ttp_results = optimized.ttp_results
+
                 comparison = compare_results(quality_rows, ttp_results)
 
                 result['textfsm_rows'] = comparison['textfsm_count']
@@ -108,6 +140,7 @@ def process_single_template(args: Tuple) -> Dict:
     else:
         result['status'] = 'success'
 
+    timings['total'] = time.perf_counter() - start
     return result
 
 
@@ -424,13 +457,304 @@ def export_json_results(filepath: str, result: Dict):
         json.dump(export_data, f, indent=2, default=str)
 
 
+# =============================================================================
+# RESULT RECORDING
+# =============================================================================
+
+# Result fields kept after a result has been exported (the rest is dropped)
+SUMMARY_FIELDS = ('id', 'command', 'source', 'status', 'error', 'category',
+                  'textfsm_rows', 'ttp_rows', 'match_ratio', 'optimization', 'exported')
+
+
+class ResultRecorder:
+    """
+    Consumes conversion results as they complete.
+
+    Each result is counted, exported and (in verbose mode) printed straight
+    away, then reduced to SUMMARY_FIELDS so the parent process never holds
+    the CLI samples, templates or parsed data of the whole run.
+    """
+
+    def __init__(self, export_dir: str = None, min_ratio: float = 0.0, verbose: bool = False,
+                 db_writer: TemplateWriter = None, profile: ConversionProfile = None):
+        self.export_dir = export_dir
+        self.min_ratio = min_ratio
+        self.verbose = verbose
+        self.db_writer = db_writer
+        self.profile = profile
+
+        self.stats = {
+            'success': 0,
+            'failed_generation': 0,
+            'failed_validation': 0,
+            'no_patterns': 0,
+            'timeouts': 0,
+            'errors': []
+        }
+        self.match_ratios = []
+        self.over_matched = []  # Templates where TTP found more than TextFSM
+        self.summaries = []
+        self.resumed = 0  # Unchanged templates taken from the checkpoint journal
+        self.optimized = 0  # Templates replaced by a faster variant
+        self.speedups = []
+        self.exported_count = 0
+        self.export_errors = 0  # Count of failed exports
+
+    @property
+    def total(self) -> int:
+        stats = self.stats
+        return (stats['success'] + stats['failed_generation'] + stats['failed_validation'] +
+                stats['no_patterns'] + stats['timeouts'])
+
+    def record(self, result: Dict, resumed: bool = False) -> Dict:
+        """
+        Count, export and print one result; returns its summary.
+        resumed=True counts a checkpointed summary without exporting or printing it.
+        """
+        status = result.get('status', 'failed_generation')
+        if resumed:
+            self.resumed += 1
+        else:
+            result['exported'] = False
+        export_start = time.perf_counter()
+
+        if status == 'success':
+            self._record_success(result)
+        elif status == 'no_patterns':
+            self.stats['no_patterns'] += 1
+        elif status == 'failed_validation':
+            self.stats['failed_validation'] += 1
+            if result.get('error'):
+                self.stats['errors'].append((result['id'], result.get('command', '?'), result['error']))
+            self._export_failed_validation(result)
+        else:
+            # Check if it was a timeout
+            error_msg = result.get('error', '')
+            if 'Timeout' in error_msg:
+                self.stats['timeouts'] += 1
+            else:
+                self.stats['failed_generation'] += 1
+            if error_msg:
+                self.stats['errors'].append((result['id'], result.get('command', '?'), error_msg))
+
+        if self.profile and not resumed:
+            if result.get('timings') is not None and (self.export_dir or self.db_writer):
+                result['timings']['export'] = time.perf_counter() - export_start
+            self.profile.add(result)
+
+        if result.get('optimization') not in (None, 'original'):
+            self.optimized += 1
+            if result.get('parse_speedup'):
+                self.speedups.append(result['parse_speedup'])
+
+        if self.verbose and not resumed:
+            self._print_result(result, status)
+
+        summary = {k: result.get(k) for k in SUMMARY_FIELDS}
+        self.summaries.append(summary)
+        return summary
+
+    def _record_success(self, result: Dict):
+        export_dir = self.export_dir
+        self.stats['success'] += 1
+
+        if result.get('match_ratio') is not None:
+            self.match_ratios.append(result['match_ratio'])
+
+            # Track over-matched templates (TTP found more than TextFSM)
+            if result['match_ratio'] > 1.0:
+                self.over_matched.append({
+                    'command': result.get('command', '?'),
+                    'ratio': result['match_ratio'],
+                    'textfsm_rows': result.get('textfsm_rows', 0),
+                    'ttp_rows': result.get('ttp_rows', 0)
+                })
+
+                # Export over-matched to separate folder for review
+                if export_dir and result.get('ttp_template') and result.get('command'):
+                    try:
+                        om_dir = os.path.join(export_dir, '_over_matched')
+                        os.makedirs(om_dir, exist_ok=True)
+                        cmd = result['command']
+                        safe_cmd = sanitize_filename(cmd)
+                        json_filepath = os.path.join(om_dir, f"{safe_cmd}.json")
+                        export_json_results(json_filepath, result)
+                    except Exception:
+                        pass
+
+        # Write straight into the TTP database if requested
+        if self.db_writer and result.get('ttp_template') and result.get('command'):
+            if (result.get('match_ratio', 0) or 0) >= self.min_ratio:
+                self.db_writer.add(result)
+
+        # Export successful template if export_dir specified
+        if export_dir and result.get('ttp_template') and result.get('command'):
+            ratio = result.get('match_ratio', 0) or 0
+            if ratio >= self.min_ratio:
+                try:
+                    cmd = result['command']
+                    safe_cmd = sanitize_filename(cmd)
+                    filename = f"{safe_cmd}.ttp"
+                    filepath = os.path.join(export_dir, filename)
+
+                    header = f'''# TTP Template auto-generated from TextFSM
+# Original command: {cmd}
+# Source: {result.get('source', 'unknown')}
+# TextFSM rows: {result.get('textfsm_rows', 'N/A')}
+# TTP rows: {result.get('ttp_rows', 'N/A')}
+# Match ratio: {result.get('match_ratio', 0):.2f}
+
+'''
+                    with open(filepath, 'w') as f:
+                        f.write(header + result['ttp_template'])
+
+                    # Export JSON sidecar with parsed results
+                    json_filepath = os.path.join(export_dir, f"{safe_cmd}.json")
+                    export_json_results(json_filepath, result)
+
+                    result['exported'] = True
+                    self.exported_count += 1
+                except Exception as e:
+                    self.export_errors += 1
+                    if self.verbose:
+                        print(f"  Export error for {result.get('command')}: {e}")
+
+    def _export_failed_validation(self, result: Dict):
+        # Export failed validations for review if export_dir specified
+        export_dir = self.export_dir
+        if export_dir and result.get('ttp_template') and result.get('command'):
+            try:
+                failed_dir = os.path.join(export_dir, '_failed_validation')
+                os.makedirs(failed_dir, exist_ok=True)
+
+                cmd = result['command']
+                safe_cmd = sanitize_filename(cmd)
+
+                # Export the template
+                filepath = os.path.join(failed_dir, f"{safe_cmd}.ttp")
+                header = f'''# TTP Template - FAILED VALIDATION
+# Original command: {cmd}
+# Source: {result.get('source', 'unknown')}
+# Error: {result.get('error', 'unknown')}
+
+'''
+                with open(filepath, 'w') as f:
+                    f.write(header + result['ttp_template'])
+
+                # Export JSON for review
+                json_filepath = os.path.join(failed_dir, f"{safe_cmd}.json")
+                export_json_results(json_filepath, result)
+            except Exception:
+                pass  # Don't fail on export errors
+
+    def _print_result(self, result: Dict, status: str):
+        print(f"\n{'=' * 80}")
+        print(f"Template ID: {result['id']}")
+        print(f"Command: {result.get('command', 'N/A')}")
+        print(f"Source: {result.get('source', 'N/A')}")
+        print("-" * 40)
+
+        if result.get('ttp_template'):
+            print("Generated TTP Template:")
+            print(result['ttp_template'])
+
+        if status == 'success':
+            print(f"\n✓ Success")
+            if result.get('textfsm_rows'):
+                print(f"  TextFSM rows: {result['textfsm_rows']}")
+                print(f"  TTP rows: {result['ttp_rows']}")
+                if result.get('match_ratio') is not None:
+                    print(f"  Match ratio: {result['match_ratio']:.2f}")
+            if result.get('optimization') not in (None, 'original'):
+                print(f"  Optimized: {result['optimization']} ({result.get('parse_speedup', 1.0):.2f}x faster)")
+        elif status == 'no_patterns':
+            print(f"NO PATTERNS: {result.get('error', 'Unknown')}")
+        else:
+            print(f"✗ {status.upper()}: {result.get('error', 'Unknown error')}")
+
+    def print_summary(self):
+        """Print the end-of-run summary and write the over-matched list."""
+        stats = self.stats
+        export_dir = self.export_dir
+
+        print("\n" + "=" * 80)
+        print("SUMMARY")
+        print("=" * 80)
+        total = self.total
+        print(f"Total processed: {total}")
+        if self.resumed:
+            print(f"  Unchanged (checkpoint): {self.resumed}")
+        print(f"  Successful:         {stats['success']}")
+        print(f"  Failed generation:  {stats['failed_generation']}")
+        print(f"  Failed validation:  {stats['failed_validation']}")
+        print(f"  No quality patterns:{stats['no_patterns']}")
+        if stats['timeouts'] > 0:
+            print(f"  Timeouts:           {stats['timeouts']}")
+
+        if export_dir:
+            print(f"\nExported templates: {self.exported_count}")
+            if self.export_errors > 0:
+                print(f"Export errors: {self.export_errors}")
+
+        if self.db_writer:
+            print(f"\nDatabase templates written: {self.db_writer.written} ({self.db_writer.db_path})")
+
+        if total > 0:
+            success_rate = (stats['success'] / total) * 100
+            print(f"\nSuccess rate: {success_rate:.1f}%")
+
+        match_ratios = self.match_ratios
+        if match_ratios:
+            avg_ratio = sum(match_ratios) / len(match_ratios)
+            min_r = min(match_ratios)
+            max_r = max(match_ratios)
+            print(f"TTP/TextFSM row ratio: avg={avg_ratio:.2f}, min={min_r:.2f}, max={max_r:.2f}")
+
+        if self.optimized:
+            line = f"Optimized templates: {self.optimized}"
+            if self.speedups:
+                line += f" (avg parse speedup {sum(self.speedups) / len(self.speedups):.2f}x)"
+            print(line)
+
+        if stats['errors'] and self.verbose:
+            print(f"\nFirst {min(5, len(stats['errors']))} errors:")
+            for id_, cmd, err in stats['errors'][:5]:
+                err_short = err[:80] + "..." if len(err) > 80 else err
+                print(f"  ID {id_} ({cmd}): {err_short}")
+
+        # Report over-matched templates (potential over-matching issues)
+        over_matched = self.over_matched
+        if over_matched:
+            print(f"\n⚠ OVER-MATCHED TEMPLATES ({len(over_matched)} templates where TTP > TextFSM):")
+            # Sort by ratio descending (command breaks ties; completion order varies)
+            over_matched.sort(key=lambda x: (-x['ratio'], x['command']))
+            for item in over_matched[:15]:  # Show top 15
+                print(
+                    f"  {item['command']}: ratio={item['ratio']:.2f} (TextFSM={item['textfsm_rows']}, TTP={item['ttp_rows']})")
+            if len(over_matched) > 15:
+                print(f"  ... and {len(over_matched) - 15} more")
+
+            # Export over-matched list if export_dir specified
+            if export_dir:
+                try:
+                    import json
+                    overmatched_path = os.path.join(export_dir, '_over_matched.json')
+                    with open(overmatched_path, 'w') as f:
+                        json.dump(over_matched, f, indent=2)
+                    print(f"  Full list exported to: {overmatched_path}")
+                except Exception:
+                    pass
+
+
 # =============================================================================
 # DATABASE TESTING
 # =============================================================================
 
 def test_from_database(db_path: str, limit: int = 5, validate: bool = True, verbose: bool = False, workers: int = 1,
                        min_cols: int = 3, export_dir: str = None, min_ratio: float = 0.0,
-                       vendors: List[str] = None, timeout: int = 30, batch_size: int = 50):
+                       vendors: List[str] = None, timeout: int = 30, batch_size: int = 50,
+                       resume: bool = True, db_output: str = None, optimize: bool = False,
+                       profile_path: str = None, memory_limit_mb: int = None):
     """Test the converter against templates from the database.
 
     Args:
@@ -443,8 +767,14 @@ def test_from_database(db_path: str, limit: int = 5, validate: bool = True, verb
         export_dir: Directory to export successful TTP templates
         min_ratio: Minimum TTP/TextFSM ratio for export
         vendors: List of vendor names to filter (e.g., ['cisco', 'arista'])
-        timeout: Timeout in seconds per template (default: 30)
-        batch_size: Process templates in batches of this size (default: 50)
+        timeout: Timeout in seconds per template, from when a worker starts it (default: 30)
+        batch_size: Recycle each worker process after this many templates (default: 50)
+        resume: Skip templates recorded unchanged in export_dir's checkpoint journal
+        db_output: Write successful TTP templates directly into this ttp_templates.db
+        optimize: Benchmark faster template variants after validation and keep the fastest
+        profile_path: Write a per-template phase timing report (JSON) here and summarize it
+        memory_limit_mb: Validate each template in a sandbox subprocess capped at this many MB
+            (sequential runs; parallel workers validate in-process under the worker timeout)
     """
     import sqlite3
 
@@ -527,66 +857,86 @@ def test_from_database(db_path: str, limit: int = 5, validate: bool = True, verb
         print(f"Using {workers} workers")
     print("=" * 80)
 
-    # Prepare work items
-    work_items = [
-        (id_, cli_command, cli_content, textfsm_content, source, validate, min_cols)
-        for id_, cli_command, cli_content, textfsm_content, source in rows
-    ]
-
-    stats = {
-        'success': 0,
-        'failed_generation': 0,
-        'failed_validation': 0,
-        'no_patterns': 0,
-        'timeouts': 0,
-        'errors': []
-    }
-    match_ratios = []
-    results = []
-    over_matched = []  # Templates where TTP found more than TextFSM
-    export_errors = 0  # Count of failed exports
+    db_writer = None
+    db_commands = set()
+    if db_output:
+        db_writer = TemplateWriter(db_output)
+        db_commands = db_writer.existing_commands()
+        print(f"Writing successful templates to database: {db_output}")
 
-    if workers > 1:
-        # Parallel processing with proper timeout and process termination
-        from multiprocessing import Pool, TimeoutError as MPTimeoutError
-
-        # Process in batches to avoid resource exhaustion
-        actual_batch_size = min(batch_size, len(work_items))
-
-        completed = 0
-        for batch_start in range(0, len(work_items), actual_batch_size):
-            batch = work_items[batch_start:batch_start + actual_batch_size]
+    profile = ConversionProfile() if profile_path else None
+    recorder = ResultRecorder(export_dir=export_dir, min_ratio=min_ratio, verbose=verbose,
+                              db_writer=db_writer, profile=profile)
 
-            with Pool(processes=workers) as pool:
-                async_results = []
-                for item in batch:
-                    ar = pool.apply_async(process_single_template, (item,))
-                    async_results.append((item[0], ar))  # (template_id, async_result)
+    # Checkpoint journal: outcomes of unchanged templates are reused, not reconverted
+    journal = None
+    if export_dir:
+        from . import __version__
+        journal = CheckpointJournal(
+            os.path.join(export_dir, CHECKPOINT_FILENAME),
+            settings={'validate': validate, 'min_cols': min_cols, 'min_ratio': min_ratio,
+                      'optimize': optimize,
+                      'converter_version': __version__},
+            fresh=not resume
+        )
 
-                for template_id, ar in async_results:
-                    completed += 1
-                    if not verbose:
-                        print(f"\rProcessing: {completed}/{len(work_items)}", end="", flush=True)
+    # Prepare work items
+    work_items = []
+    hashes = {}
+    for id_, cli_command, cli_content, textfsm_content, source in rows:
+        hashes[id_] = (content_hash(textfsm_content), content_hash(cli_content))
+        if journal:
+            entry = journal.lookup(cli_command, *hashes[id_])
+            exported_file = os.path.join(export_dir, f"{sanitize_filename(cli_command)}.ttp")
+            # A skipped template's output must still be where the last run put it
+            in_db = cli_command in db_commands
+            if entry and db_writer and entry['status'] == 'success' and not in_db:
+                if (entry.get('match_ratio') or 0) >= min_ratio:
+                    entry = None
+            if entry and (not entry.get('exported') or os.path.exists(exported_file)):
+                recorder.record(entry, resumed=True)
+                continue
+        work_items.append((id_, cli_command, cli_content, textfsm_content, source, validate, min_cols,
+                           optimize, memory_limit_mb))
+
+    if recorder.resumed:
+        print(f"Skipping {recorder.resumed} unchanged templates (checkpoint: {journal.path})")
+
+    def finish(result: Dict):
+        summary = recorder.record(result)
+        if journal and result.get('id') in hashes:
+            journal.append(summary, *hashes[result['id']])
 
-                    try:
-                        result = ar.get(timeout=timeout)
-                        results.append(result)
-                    except MPTimeoutError:
-                        results.append({
-                            'id': template_id,
-                            'status': 'failed_generation',
-                            'error': f"Timeout (>{timeout}s)"
-                        })
-                    except Exception as e:
-                        results.append({
-                            'id': template_id,
-                            'status': 'failed_generation',
-                            'error': f"Worker exception: {str(e)[:80]}"
-                        })
-
-                # Force terminate any hung workers before next batch
-                pool.terminate()
-                pool.join()
+    if workers > 1:
+        # Long-lived workers: a hung template only costs its own worker, which
+        # is killed at its deadline and replaced while the others keep going.
+        # Results are recorded (and exported) in completion order.
+        with WorkerScheduler(process_single_template, workers=workers, timeout=timeout,
+                             max_tasks_per_child=batch_size) as scheduler:
+            completed = 0
+            for item, task_status, value in scheduler.imap_unordered(work_items):
+                completed += 1
+                if not verbose:
+                    print(f"\rProcessing: {completed}/{len(work_items)}", end="", flush=True)
+
+                if task_status == DONE:
+                    finish(value)
+                elif task_status == TIMEOUT:
+                    finish({
+                        'id': item[0],
+                        'command': item[1],
+                        'status': 'failed_generation',
+                        'error': f"Timeout (>{timeout}s)",
+                        'timings': {'total': float(timeout)}  # At least; the worker was killed
+                    })
+                else:
+                    finish({
+                        'id': item[0],
+                        'command': item[1],
+                        'status': 'failed_generation',
+                        'error': f"Worker exception: {str(value)[:80]}",
+                        'timings': {}  # Unknown; the worker raised outside the conversion
+                    })
 
         if not verbose:
             print()
@@ -595,198 +945,29 @@ def test_from_database(db_path: str, limit: int = 5, validate: bool = True, verb
         for i, item in enumerate(work_items):
             if not verbose:
                 print(f"\rProcessing: {i + 1}/{len(work_items)}", end="", flush=True)
-            result = process_single_template(item)
-            results.append(result)
+            finish(process_single_template(item))
 
         if not verbose:
             print()
 
-    # Process results
-    exported_count = 0
-    for result in results:
-        status = result.get('status', 'failed_generation')
-
-        if status == 'success':
-            stats['success'] += 1
-            if result.get('match_ratio') is not None:
-                match_ratios.append(result['match_ratio'])
-
-                # Track over-matched templates (TTP found more than TextFSM)
-                if result['match_ratio'] > 1.0:
-                    over_matched.append({
-                        'command': result.get('command', '?'),
-                        'ratio': result['match_ratio'],
-                        'textfsm_rows': result.get('textfsm_rows', 0),
-                        'ttp_rows': result.get('ttp_rows', 0)
-                    })
-
-                    # Export over-matched to separate folder for review
-                    if export_dir and result.get('ttp_template') and result.get('command'):
-                        try:
-                            om_dir = os.path.join(export_dir, '_over_matched')
-                            os.makedirs(om_dir, exist_ok=True)
-                            cmd = result['command']
-                            safe_cmd = sanitize_filename(cmd)
-                            json_filepath = os.path.join(om_dir, f"{safe_cmd}.json")
-                            export_json_results(json_filepath, result)
-                        except Exception:
-                            pass
-
-            # Export successful template if export_dir specified
-            if export_dir and result.get('ttp_template') and result.get('command'):
-                ratio = result.get('match_ratio', 0) or 0
-                if ratio >= min_ratio:
-                    try:
-                        cmd = result['command']
-                        safe_cmd = sanitize_filename(cmd)
-                        filename = f"{safe_cmd}.ttp"
-                        filepath = os.path.join(export_dir, filename)
-
-                        header = f'''# TTP Template auto-generated from TextFSM
-# Original command: {cmd}
-# Source: {result.get('source', 'unknown')}
-# TextFSM rows: {result.get('textfsm_rows', 'N/A')}
-# TTP rows: {result.get('ttp_rows', 'N/A')}
-# Match ratio: {result.get('match_ratio', 0):.2f}
-
-'''
-                        with open(filepath, 'w') as f:
-                            f.write(header + result['ttp_template'])
-
-                        # Export JSON sidecar with parsed results
-                        json_filepath = os.path.join(export_dir, f"{safe_cmd}.json")
-                        export_json_results(json_filepath, result)
-
-                        exported_count += 1
-                    except Exception as e:
-                        export_errors += 1
-                        if verbose:
-                            print(f"  Export error for {result.get('command')}: {e}")
-
-        elif status == 'no_patterns':
-            stats['no_patterns'] += 1
-        elif status == 'failed_validation':
-            stats['failed_validation'] += 1
-            if result.get('error'):
-                stats['errors'].append((result['id'], result.get('command', '?'), result['error']))
-
-            # Export failed validations for review if export_dir specified
-            if export_dir and result.get('ttp_template') and result.get('command'):
-                try:
-                    failed_dir = os.path.join(export_dir, '_failed_validation')
-                    os.makedirs(failed_dir, exist_ok=True)
+    if journal:
+        journal.close()
+    if db_writer:
+        db_writer.close()
 
-                    cmd = result['command']
-                    safe_cmd = sanitize_filename(cmd)
+    recorder.print_summary()
 
-                    # Export the template
-                    filepath = os.path.join(failed_dir, f"{safe_cmd}.ttp")
-                    header = f'''# TTP Template - FAILED VALIDATION
-# Original command: {cmd}
-# Source: {result.get('source', 'unknown')}
-# Error: {result.get('error', 'unknown')}
-
-'''
-                    with open(filepath, 'w') as f:
-                        f.write(header + result['ttp_template'])
-
-                    # Export JSON for review
-                    json_filepath = os.path.join(failed_dir, f"{safe_cmd}.json")
-                    export_json_results(json_filepath, result)
-                except Exception:
-                    pass  # Don't fail on export errors
-        else:
-            # Check if it was a timeout
-            error_msg = result.get('error', '')
-            if 'Timeout' in error_msg:
-                stats['timeouts'] += 1
-            else:
-                stats['failed_generation'] += 1
-            if error_msg:
-                stats['errors'].append((result['id'], result.get('command', '?'), error_msg))
-
-        # Verbose output
-        if verbose:
-            print(f"\n{'=' * 80}")
-            print(f"Template ID: {result['id']}")
-            print(f"Command: {result.get('command', 'N/A')}")
-            print(f"Source: {result.get('source', 'N/A')}")
-            print("-" * 40)
-
-            if result.get('ttp_template'):
-                print("Generated TTP Template:")
-                print(result['ttp_template'])
-
-            if status == 'success':
-                print(f"\n✓ Success")
-                if result.get('textfsm_rows'):
-                    print(f"  TextFSM rows: {result['textfsm_rows']}")
-                    print(f"  TTP rows: {result['ttp_rows']}")
-                    if result.get('match_ratio') is not None:
-                        print(f"  Match ratio: {result['match_ratio']:.2f}")
-            elif status == 'no_patterns':
-                print(f"NO PATTERNS: {result.get('error', 'Unknown')}")
-            else:
-                print(f"✗ {status.upper()}: {result.get('error', 'Unknown error')}")
-
-    # Print summary
-    print("\n" + "=" * 80)
-    print("SUMMARY")
-    print("=" * 80)
-    total = stats['success'] + stats['failed_generation'] + stats['failed_validation'] + stats['no_patterns'] + stats[
-        'timeouts']
-    print(f"Total processed: {total}")
-    print(f"  Successful:         {stats['success']}")
-    print(f"  Failed generation:  {stats['failed_generation']}")
-    print(f"  Failed validation:  {stats['failed_validation']}")
-    print(f"  No quality patterns:{stats['no_patterns']}")
-    if stats['timeouts'] > 0:
-        print(f"  Timeouts:           {stats['timeouts']}")
-
-    if export_dir:
-        print(f"\nExported templates: {exported_count}")
-        if export_errors > 0:
-            print(f"Export errors: {export_errors}")
-
-    if total > 0:
-        success_rate = (stats['success'] / total) * 100
-        print(f"\nSuccess rate: {success_rate:.1f}%")
-
-    if match_ratios:
-        avg_ratio = sum(match_ratios) / len(match_ratios)
-        min_r = min(match_ratios)
-        max_r = max(match_ratios)
-        print(f"TTP/TextFSM row ratio: avg={avg_ratio:.2f}, min={min_r:.2f}, max={max_r:.2f}")
-
-    if stats['errors'] and verbose:
-        print(f"\nFirst {min(5, len(stats['errors']))} errors:")
-        for id_, cmd, err in stats['errors'][:5]:
-            err_short = err[:80] + "..." if len(err) > 80 else err
-            print(f"  ID {id_} ({cmd}): {err_short}")
-
-    # Report over-matched templates (potential over-matching issues)
-    if over_matched:
-        print(f"\n⚠ OVER-MATCHED TEMPLATES ({len(over_matched)} templates where TTP > TextFSM):")
-        # Sort by ratio descending
-        over_matched.sort(key=lambda x: x['ratio'], reverse=True)
-        for item in over_matched[:15]:  # Show top 15
-            print(
-                f"  {item['command']}: ratio={item['ratio']:.2f} (TextFSM={item['textfsm_rows']}, TTP={item['ttp_rows']})")
-        if len(over_matched) > 15:
-            print(f"  ... and {len(over_matched) - 15} more")
-
-        # Export over-matched list if export_dir specified
-        if export_dir:
-            try:
-                import json
-                overmatched_path = os.path.join(export_dir, '_over_matched.json')
-                with open(overmatched_path, 'w') as f:
-                    json.dump(over_matched, f, indent=2)
-                print(f"  Full list exported to: {overmatched_path}")
-            except Exception:
-                pass
+    if profile:
+        report = profile.report()
+        profile.print_summary(report)
+        try:
+            profile.write_json(profile_path, report)
+            print(f"\nProfile written to: {profile_path}")
+        except OSError as e:
+            print(f"\nERROR: Could not write profile: {e}")
 
     # Timing
+    total = recorder.total
     elapsed = time.time() - start_time
     print(f"\nElapsed time: {elapsed:.2f}s ({total / elapsed:.1f} templates/sec)" if elapsed > 0 else "")
 
@@ -822,10 +1003,23 @@ Examples:
   # Export successful templates to directory:
   python -m tfsm2ttp tfsm_template.db -n 1000 -w 8 --export ./ttp_templates
 
+  # Write successful templates straight into ttp_templates.db (no export dir needed):
+  python -m tfsm2ttp tfsm_template.db -n 1000 -w 8 --db ttp_templates.db
+
+  # Re-running with the same --export resumes: unchanged templates are skipped.
+  # Start over instead:
+  python -m tfsm2ttp tfsm_template.db -n 1000 -w 8 --export ./ttp_templates --fresh
+
+  # Keep the fastest parity-preserving variant of each template:
+  python -m tfsm2ttp tfsm_template.db -n 1000 -w 8 --export ./ttp_templates --optimize
+
+  # Find where conversion time goes (per phase, per strategy, slowest templates):
+  python -m tfsm2ttp tfsm_template.db -n 1000 -w 8 --profile profile.json
+
   # Verbose output for debugging:
   python -m tfsm2ttp tfsm_template.db -n 10 -v
 
-  # Adjust timeout and batch size for problematic templates:
+  # Adjust timeout and worker recycling for problematic templates:
   python -m tfsm2ttp tfsm_template.db -n 500 -w 8 --timeout 60 --batch-size 25
 
 Your system has {multiprocessing.cpu_count()} CPU cores available.
@@ -843,12 +1037,25 @@ parsing for single-record, multi-line data (like "show version").
     parser.add_argument('-q', '--quiet', action='store_true', help='Minimal output (summary only, overrides -v)')
     parser.add_argument('--min-cols', type=int, default=3, help='Minimum columns for quality row (default: 3)')
     parser.add_argument('--export', metavar='DIR', help='Export successful TTP templates to directory')
+    parser.add_argument('--db', metavar='PATH', dest='db_output',
+                        help='Write successful TTP templates directly into a ttp_templates.db')
     parser.add_argument('--min-ratio', type=float, default=0.0,
                         help='Minimum TTP/TextFSM row ratio for export (default: 0.0, recommended: 0.5)')
     parser.add_argument('--timeout', type=int, default=30,
-                        help='Timeout in seconds per template (default: 30)')
+                        help='Timeout in seconds per template; a hung worker is killed and replaced (default: 30)')
     parser.add_argument('--batch-size', type=int, default=50,
-                        help='Process templates in batches of this size (default: 50)')
+                        help='Recycle each worker process after this many templates (default: 50)')
+    parser.add_argument('--optimize', action='store_true',
+                        help='After validation, keep the fastest template variant (tightened regexes, '
+                             'pruned groups) that preserves row parity')
+    parser.add_argument('--profile', metavar='FILE', dest='profile_path',
+                        help='Time each conversion phase per template; write a JSON report to FILE '
+                             'and print a summary (slowest templates, histograms)')
+    parser.add_argument('--memory-limit', type=int, metavar='MB', dest='memory_limit_mb',
+                        help='Sequential runs: validate each template in a sandboxed subprocess '
+                             'capped at MB (needs parsing_fire; default: validate in-process)')
+    parser.add_argument('--fresh', action='store_true',
+                        help='Ignore the export checkpoint journal and reconvert every template')
     parser.add_argument('--vendor', nargs='+', metavar='VENDOR',
                         help='Filter by vendor(s): cisco, arista, juniper, etc. (matches cli_command prefix)')
     parser.add_argument('--table', action='store_true', help='Run table example only')
@@ -882,7 +1089,12 @@ parsing for single-record, multi-line data (like "show version").
             min_ratio=args.min_ratio,
             vendors=args.vendor,
             timeout=args.timeout,
-            batch_size=args.batch_size
+            batch_size=args.batch_size,
+            resume=not args.fresh,
+            db_output=args.db_output,
+            optimize=args.optimize,
+            profile_path=args.profile_path,
+            memory_limit_mb=args.memory_limit_mb
         )
     elif args.table:
         run_example()
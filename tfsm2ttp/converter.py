@@ -7,17 +7,54 @@ Routes to the appropriate parser based on data characteristics:
 3. Paragraph (single record, multi-line) -> paragraph.py
 """
 
-from typing import Tuple
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
 
-from .core import parse_with_textfsm, rows_to_dicts
+from .core import parse_with_textfsm, rows_to_dicts, filter_quality_rows
 from .table import generate_table_template
 from .paragraph import generate_paragraph_template
 from .multisection import parse_textfsm_filldown_values, generate_multisection_template
+from .index import LineIndex
+
+
+@dataclass
+class ConversionResult:
+    """
+    Outcome of a conversion plus the TextFSM artifacts produced on the way,
+    so validation can compare against them without parsing the sample again.
+
+    category is the strategy that produced the template: 'multisection',
+    'table' or 'paragraph' (None if generation failed). timings holds
+    seconds per phase: textfsm_parse, detect, and one entry per strategy
+    attempted.
+    """
+    success: bool
+    ttp_template: str = ""
+    error: str = ""
+    category: Optional[str] = None
+    headers: List[str] = field(default_factory=list)
+    rows: List[List[str]] = field(default_factory=list)
+    quality_rows: List[Dict[str, str]] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+@contextmanager
+def _phase(timings: Optional[Dict[str, float]], name: str):
+    """Add the block's wall time to timings[name] (no-op when timings is None)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
 
 
 def generate_ttp_template(template_content: str, cli_content: str, min_cols: int = 3) -> str:
     """
     Main function: Generate TTP template from TextFSM template + CLI output.
+    Returns the template, or an error string starting with '#'.
 
     Strategy (in order):
     1. Multi-section (Category 3): Repeating blocks like show interfaces, show cdp detail
@@ -27,82 +64,134 @@ def generate_ttp_template(template_content: str, cli_content: str, min_cols: int
     3. Paragraph (Category 2): Single record across multiple lines like show version
        - 1-2 rows with many values spread across lines
     """
-    # Parse with TextFSM
     headers, rows = parse_with_textfsm(template_content, cli_content)
+    output, _ = _generate_from_parsed(headers, rows, template_content, cli_content, min_cols)
+    return output
 
+
+def _generate_from_parsed(headers: List[str], rows: List[List[str]], template_content: str,
+                          cli_content: str, min_cols: int = 3,
+                          timings: Optional[Dict[str, float]] = None) -> Tuple[str, Optional[str]]:
+    """
+    Generate TTP template from an existing TextFSM parse.
+    Returns (template_or_error, category) - category is None on failure.
+    Phase times are added to timings if given.
+    """
     if not headers:
-        return "# ERROR: No headers found in TextFSM template"
+        return "# ERROR: No headers found in TextFSM template", None
 
     if not rows:
-        return "# ERROR: TextFSM produced no parsed rows"
+        return "# ERROR: TextFSM produced no parsed rows", None
+
+    with _phase(timings, 'detect'):
+        # One pass over the CLI text locates every captured value for all strategies
+        row_dicts = rows_to_dicts(headers, rows)
+        line_index = LineIndex(cli_content.splitlines(),
+                               (v for row in row_dicts for v in row.values()))
 
-    # Category 3: Try multi-section first (if TextFSM has Filldown values)
-    filldown_vars, regular_vars = parse_textfsm_filldown_values(template_content)
+        # Category 3: Try multi-section first (if TextFSM has Filldown values)
+        filldown_vars, regular_vars = parse_textfsm_filldown_values(template_content)
 
     if filldown_vars:
-        ms_success, ms_result = generate_multisection_template(
-            headers, rows, cli_content, template_content, min_cols
-        )
+        with _phase(timings, 'multisection'):
+            ms_success, ms_result = generate_multisection_template(
+                headers, rows, cli_content, template_content, min_cols, line_index=line_index
+            )
         if ms_success:
-            return ms_result
-
-    # Category 1: Try table parsing
-    row_dicts = rows_to_dicts(headers, rows)
-    num_rows = len(row_dicts)
-
-    # Collect all unique values
-    all_values = {}
-    for row in row_dicts:
-        all_values.update(row)
-    total_values = len(all_values)
-
-    # If few rows with many values spread across lines, skip to paragraph
-    if num_rows <= 2 and total_values >= 4:
-        cli_lines = cli_content.splitlines()
-        lines_with_values = set()
-        for val in all_values.values():
-            for idx, line in enumerate(cli_lines):
-                if val in line:
+            return ms_result, 'multisection'
+
+    with _phase(timings, 'detect'):
+        # Category 1: Try table parsing
+        num_rows = len(row_dicts)
+
+        # Collect all unique values
+        all_values = {}
+        for row in row_dicts:
+            all_values.update(row)
+        total_values = len(all_values)
+
+        # If few rows with many values spread across lines, skip to paragraph
+        skip_table = False
+        if num_rows <= 2 and total_values >= 4:
+            lines_with_values = set()
+            for val in all_values.values():
+                idx = line_index.first_line(val)
+                if idx is not None:
                     lines_with_values.add(idx)
-                    break
+            skip_table = len(lines_with_values) >= total_values * 0.5
 
-        if len(lines_with_values) >= total_values * 0.5:
-            # Skip table, go straight to paragraph
+    if skip_table:
+        # Skip table, go straight to paragraph
+        with _phase(timings, 'paragraph'):
             para_success, para_result = generate_paragraph_template(
-                headers, rows, cli_content, min_values=max(3, min_cols)
+                headers, rows, cli_content, min_values=max(3, min_cols), line_index=line_index
             )
-            if para_success:
-                return para_result
+        if para_success:
+            return para_result, 'paragraph'
 
     # Try table parsing
-    success, result = generate_table_template(headers, rows, cli_content, min_cols)
+    with _phase(timings, 'table'):
+        success, result = generate_table_template(headers, rows, cli_content, min_cols,
+                                                  line_index=line_index)
 
     if success:
-        return result
+        return result, 'table'
 
     # Category 2: Table failed - try paragraph parsing as fallback
-    para_success, para_result = generate_paragraph_template(
-        headers, rows, cli_content, min_values=max(3, min_cols)
-    )
+    with _phase(timings, 'paragraph'):
+        para_success, para_result = generate_paragraph_template(
+            headers, rows, cli_content, min_values=max(3, min_cols), line_index=line_index
+        )
 
     if para_success:
-        return para_result
+        return para_result, 'paragraph'
 
     # All failed - return the table error
-    return result
+    return result, None
 
 
-def safe_generate_ttp_template(template_content: str, cli_content: str, min_cols: int = 3) -> Tuple[bool, str, str]:
+def convert_ttp_template(template_content: str, cli_content: str, min_cols: int = 3) -> ConversionResult:
     """
-    Safe wrapper around generate_ttp_template.
-    Returns (success, ttp_template_or_empty, error_message_or_empty)
+    Safe conversion that keeps the intermediate TextFSM artifacts.
+    Never raises - failures are reported via success/error.
     """
+    timings = {}
+    try:
+        with _phase(timings, 'textfsm_parse'):
+            headers, rows = parse_with_textfsm(template_content, cli_content)
+    except ValueError as e:
+        return ConversionResult(success=False, error=str(e), timings=timings)
+    except Exception as e:
+        return ConversionResult(success=False, error=f"Unexpected error: {type(e).__name__}: {str(e)[:100]}",
+                                timings=timings)
+
+    conversion = ConversionResult(success=False, headers=headers or [], rows=rows or [], timings=timings)
+
     try:
-        result = generate_ttp_template(template_content, cli_content, min_cols)
-        if result.startswith("# ERROR:") or result.startswith("# No quality"):
-            return False, "", result
-        return True, result, ""
+        output, category = _generate_from_parsed(headers, rows, template_content, cli_content, min_cols,
+                                                 timings=timings)
+        conversion.quality_rows = filter_quality_rows(headers, rows, min_cols=min_cols)
     except ValueError as e:
-        return False, "", str(e)
+        conversion.error = str(e)
+        return conversion
     except Exception as e:
-        return False, "", f"Unexpected error: {type(e).__name__}: {str(e)[:100]}"
+        conversion.error = f"Unexpected error: {type(e).__name__}: {str(e)[:100]}"
+        return conversion
+
+    if output.startswith("# ERROR:") or output.startswith("# No quality"):
+        conversion.error = output
+    else:
+        conversion.success = True
+        conversion.ttp_template = output
+        conversion.category = category
+
+    return conversion
+
+
+def safe_generate_ttp_template(template_content: str, cli_content: str, min_cols: int = 3) -> Tuple[bool, str, str]:
+    """
+    Safe wrapper around generate_ttp_template.
+    Returns (success, ttp_template_or_empty, error_message_or_empty)
+    """
+    conversion = convert_ttp_template(template_content, cli_content, min_cols)
+    return conversion.success, conversion.ttp_template, conversion.error
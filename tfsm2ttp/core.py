@@ -8,8 +8,13 @@ import textfsm
 import re
 from io import StringIO
 from collections import defaultdict
+from dataclasses import dataclass, field
 from typing import List, Dict, Tuple, Optional
 
+from .index import ValueAutomaton
+
+_MULTI_SPACE = re.compile(r' {2,}')
+
 
 def parse_with_textfsm(template_content: str, cli_content: str) -> Tuple[List[str], List[List[str]]]:
     """Parse CLI output with TextFSM template, return headers and rows."""
@@ -151,52 +156,131 @@ def infer_variable_type(var_name: str, sample_value: str,
     return '{{' + var_name + '}}'
 
 
-def substitute_ttp_vars(line: str, row_values: Dict[str, str],
-                        column_analysis: Dict[str, Dict] = None) -> str:
+@dataclass
+class VarSpan:
+    """One captured value located in a source line."""
+    var_name: str
+    value: str
+    start: int
+    end: int
+    ttp_var: str = ''
+
+
+@dataclass
+class TTPSubstitution:
     """
-    Replace captured values with TTP {{VAR_NAME}} syntax.
-    Process longest values first to avoid partial substitution issues.
-    Adds type-based regex constraints.
+    Result of substituting captured values into a CLI line.
+
+    spans are ordered left to right by position in the source line, so the
+    pattern signature and whitespace generalization can be derived from them
+    without re-parsing the rendered TTP line.
+    """
+    source: str
+    spans: List[VarSpan] = field(default_factory=list)
+
+    def _segments(self) -> List[Tuple[str, Optional[VarSpan]]]:
+        """Alternating (literal_text, None) / ('', span) pieces of the line."""
+        segments = []
+        pos = 0
+        for span in self.spans:
+            segments.append((self.source[pos:span.start], None))
+            segments.append(('', span))
+            pos = span.end
+        segments.append((self.source[pos:], None))
+        return segments
+
+    @property
+    def line(self) -> str:
+        """The TTP template line."""
+        return ''.join(text if span is None else span.ttp_var
+                       for text, span in self._segments())
+
+    @property
+    def signature(self) -> str:
+        """Same value as pattern_signature(self.line)."""
+        return ','.join(span.var_name for span in self.spans)
+
+    def generalized(self) -> str:
+        """Same value as generalize_pattern(self.line)."""
+        parts = []
+        for i, (text, span) in enumerate(self._segments()):
+            if span is not None:
+                parts.append(span.ttp_var)
+            elif i == 0:
+                stripped = text.lstrip()
+                parts.append(text[:len(text) - len(stripped)] + _MULTI_SPACE.sub(' ', stripped))
+            else:
+                # Runs of spaces never straddle a variable, so collapsing per literal is exact
+                parts.append(_MULTI_SPACE.sub(' ', text))
+        return ''.join(parts)
+
+
+def substitute_ttp_spans(line: str, row_values: Dict[str, str],
+                         column_analysis: Dict[str, Dict] = None,
+                         matches: Optional[List[Tuple[int, int, str]]] = None) -> TTPSubstitution:
+    """
+    Locate captured values in a CLI line and build TTP variables for them.
+
+    All occurrences are found in one automaton scan (or taken from matches,
+    e.g. LineIndex.matches_in_line). Longest values claim their leftmost free
+    occurrence first, so shorter values never land inside longer ones.
 
     Args:
         line: Source CLI line
         row_values: {var_name: value} for this row
         column_analysis: {col_name: {'has_spaces': bool}} from analyze_column_patterns
+        matches: Optional precomputed (start, end, value) occurrences in line
     """
-    ttp_line = line
     column_analysis = column_analysis or {}
 
-    # Sort by value length descending to avoid partial matches
-    sorted_items = sorted(row_values.items(), key=lambda x: len(x[1]), reverse=True)
+    items = [(k, v) for k, v in row_values.items() if v and v.strip()]
+    if not items:
+        return TTPSubstitution(line)
 
-    # Determine which variable is last on the line (rightmost position)
-    var_positions = {}
-    for var_name, value in row_values.items():
-        pos = line.find(value)
-        if pos >= 0:
-            var_positions[var_name] = pos + len(value)  # End position
+    if matches is None:
+        matches = ValueAutomaton(v for _, v in items).iter_matches(line)
 
-    last_var = max(var_positions, key=var_positions.get) if var_positions else None
+    starts = defaultdict(list)
+    for start, end, value in matches:
+        starts[value].append(start)
 
-    for var_name, value in sorted_items:
-        if not value or not value.strip():
-            continue
+    # Longest value first (stable for equal lengths); claim leftmost free occurrence
+    claimed = bytearray(len(line))
+    spans = []
+    for var_name, value in sorted(items, key=lambda x: len(x[1]), reverse=True):
+        for start in sorted(starts.get(value, ())):
+            end = start + len(value)
+            if not any(claimed[start:end]):
+                claimed[start:end] = b'\x01' * len(value)
+                spans.append(VarSpan(var_name, value, start, end))
+                break
 
-        pos = ttp_line.find(value)
-        if pos == -1:
-            continue
+    spans.sort(key=lambda sp: sp.start)
+
+    for span in spans:
+        col_info = column_analysis.get(span.var_name, {})
+        span.ttp_var = infer_variable_type(span.var_name, span.value,
+                                           column_has_spaces=col_info.get('has_spaces', False),
+                                           is_last_field=span is spans[-1])
+
+    return TTPSubstitution(line, spans)
 
-        # Get column info
-        col_info = column_analysis.get(var_name, {})
-        has_spaces = col_info.get('has_spaces', False)
-        is_last = (var_name == last_var)
 
-        new_var = infer_variable_type(var_name, value,
-                                      column_has_spaces=has_spaces,
-                                      is_last_field=is_last)
-        ttp_line = ttp_line.replace(value, new_var, 1)
+def substitute_ttp_vars(line: str, row_values: Dict[str, str],
+                        column_analysis: Dict[str, Dict] = None,
+                        matches: Optional[List[Tuple[int, int, str]]] = None) -> str:
+    """
+    Replace captured values with TTP {{VAR_NAME}} syntax.
+    Longest values are placed first to avoid partial substitution issues.
+    Adds type-based regex constraints.
 
-    return ttp_line
+    Args:
+        line: Source CLI line
+        row_values: {var_name: value} for this row
+        column_analysis: {col_name: {'has_spaces': bool}} from analyze_column_patterns
+        matches: Optional precomputed (start, end, value) occurrences in line
+    """
+    return substitute_ttp_spans(line, row_values, column_analysis, matches).line
 
 
 def generalize_pattern(ttp_line: str) -> str:
@@ -205,7 +289,7 @@ def generalize_pattern(ttp_line: str) -> str:
     """
     stripped = ttp_line.lstrip()
     leading = ttp_line[:len(ttp_line) - len(stripped)]
-    normalized = re.sub(r' {2,}', ' ', stripped)
+    normalized = _MULTI_SPACE.sub(' ', stripped)
     return leading + normalized
 
 
@@ -0,0 +1,180 @@
+"""
+Value Index
+
+Locates TextFSM-captured values in the CLI output without rescanning every
+line for every value. All values are compiled into one Aho-Corasick automaton
+and the CLI text is walked once; the result is an inverted index of
+value -> line numbers that the strategy parsers query instead of doing
+nested substring searches.
+"""
+
+from collections import Counter, deque
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+class ValueAutomaton:
+    """
+    Aho-Corasick automaton over a set of literal values.
+
+    Finds every occurrence of every value (including overlapping ones and
+    values nested inside longer values) in a single left-to-right scan.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[str, ...]] = [()]
+        self.patterns: Set[str] = set()
+
+        for pattern in patterns:
+            if pattern and pattern not in self.patterns:
+                self.patterns.add(pattern)
+                self._insert(pattern)
+
+        self._build_failure_links()
+
+    def _insert(self, pattern: str):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] = self._out[state] + (pattern,)
+
+    def _build_failure_links(self):
+        goto, fail, out = self._goto, self._fail, self._out
+        # Depth-1 states fail back to the root; deeper ones are filled in BFS order
+        queue = deque(goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0) if state else 0
+                # Inherit matches that end here via the failure chain
+                out[nxt] = out[nxt] + out[fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """Yield (start, end, value) for every occurrence of every value in text."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                end = i + 1
+                for value in out[state]:
+                    yield end - len(value), end, value
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+
+def _at_word_boundary(line: str, pos: int) -> bool:
+    """Equivalent of a regex \\b assertion at pos."""
+    before = pos > 0 and _is_word_char(line[pos - 1])
+    after = pos < len(line) and _is_word_char(line[pos])
+    return before != after
+
+
+class LineIndex:
+    """
+    Inverted index of value -> sorted line numbers where the value appears,
+    built in one automaton pass over the CLI lines.
+
+    Tracks both plain substring occurrences and whole-word occurrences
+    (what re.search(r'\\b' + re.escape(value) + r'\\b', line) would find),
+    and keeps each line's raw match spans for substitute_ttp_spans.
+    """
+
+    def __init__(self, cli_lines: List[str], values: Iterable[str]):
+        self.cli_lines = cli_lines
+        self._lines: Dict[str, List[int]] = {}
+        self._word_lines: Dict[str, List[int]] = {}
+        self._matches: Dict[int, List[Tuple[int, int, str]]] = {}
+
+        automaton = ValueAutomaton(v for v in values if v and v.strip())
+
+        if automaton.patterns:
+            for idx, line in enumerate(cli_lines):
+                matches = list(automaton.iter_matches(line))
+                if not matches:
+                    continue
+                self._matches[idx] = matches
+
+                seen = set()
+                seen_word = set()
+                for start, end, value in matches:
+                    if value not in seen:
+                        seen.add(value)
+                        self._lines.setdefault(value, []).append(idx)
+                    if (value not in seen_word and _at_word_boundary(line, start)
+                            and _at_word_boundary(line, end)):
+                        seen_word.add(value)
+                        self._word_lines.setdefault(value, []).append(idx)
+
+        self._line_sets: Dict[str, Set[int]] = {v: set(idxs) for v, idxs in self._lines.items()}
+        self._word_sets: Dict[str, Set[int]] = {v: set(idxs) for v, idxs in self._word_lines.items()}
+
+    def lines_for(self, value: str) -> List[int]:
+        """Line numbers containing value, in ascending order."""
+        return self._lines.get(value, [])
+
+    def first_line(self, value: str) -> Optional[int]:
+        """First line number containing value, or None."""
+        lines = self._lines.get(value)
+        return lines[0] if lines else None
+
+    def word_lines(self, value: str) -> List[int]:
+        """Line numbers where value appears as a whole word, in ascending order."""
+        return self._word_lines.get(value, [])
+
+    def matches_in_line(self, idx: int) -> List[Tuple[int, int, str]]:
+        """Every (start, end, value) occurrence recorded for line idx."""
+        return self._matches.get(idx, [])
+
+    def in_line(self, value: str, idx: int) -> bool:
+        """True if value appears in line idx."""
+        return idx in self._line_sets.get(value, ())
+
+    def word_in_line(self, value: str, idx: int) -> bool:
+        """True if value appears as a whole word in line idx."""
+        return idx in self._word_sets.get(value, ())
+
+    def first_line_with_all(self, values: List[str]) -> Optional[int]:
+        """Lowest line number containing every value, or None."""
+        if not values:
+            return None
+
+        sets = sorted((self._line_sets.get(v, set()) for v in values), key=len)
+        if not sets[0]:
+            return None
+
+        candidates = sets[0].intersection(*sets[1:])
+        return min(candidates) if candidates else None
+
+    def best_partial_line(self, values: List[str]) -> Tuple[int, Optional[int]]:
+        """
+        Line containing the most values (earliest line wins ties).
+        Returns (match_count, line_number) - (0, None) if no value appears.
+        """
+        counts = Counter()
+        for v in values:
+            counts.update(self._lines.get(v, ()))
+
+        if not counts:
+            return 0, None
+
+        line_num = min(counts, key=lambda idx: (-counts[idx], idx))
+        return counts[line_num], line_num
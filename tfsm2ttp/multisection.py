@@ -5,15 +5,16 @@ Handles repeating blocks with section headers (Filldown patterns).
 Examples: show interfaces, show cdp detail, show ospf neighbor detail
 """
 
-import re
-from typing import List, Dict, Tuple
+from collections import Counter
+from typing import List, Dict, Tuple, Optional
 
 from .core import (
     rows_to_dicts,
     analyze_column_patterns,
     substitute_ttp_vars,
-    generalize_pattern,
+    substitute_ttp_spans,
 )
+from .index import LineIndex
 
 
 def parse_textfsm_filldown_values(textfsm_template: str) -> Tuple[List[str], List[str]]:
@@ -48,11 +49,14 @@ def parse_textfsm_filldown_values(textfsm_template: str) -> Tuple[List[str], Lis
 
 def generate_multisection_template(headers: List[str], rows: List[List[str]],
                                    cli_content: str, textfsm_template: str,
-                                   min_cols: int = 3) -> Tuple[bool, str]:
+                                   min_cols: int = 3,
+                                   line_index: Optional[LineIndex] = None) -> Tuple[bool, str]:
     """
     Generate TTP template for multi-section data (repeating blocks).
     Uses nested groups: outer for section header, inner for data rows.
     Returns (success, template_or_error)
+
+    line_index: optional LineIndex over cli_content shared by the caller.
     """
     # Parse TextFSM to identify filldown values
     filldown_vars, regular_vars = parse_textfsm_filldown_values(textfsm_template)
@@ -86,19 +90,28 @@ def generate_multisection_template(headers: List[str], rows: List[List[str]],
     if len(regular_values) < min_cols:
         return False, f"# Insufficient regular values (need {min_cols}, got {len(regular_values)})"
 
-    cli_lines = cli_content.splitlines()
+    if line_index is None:
+        line_index = LineIndex(cli_content.splitlines(),
+                               list(filldown_values.values()) + list(regular_values.values()))
+    cli_lines = line_index.cli_lines
 
-    # Find the header line - contains filldown values but few/no regular values
+    # Find the header line - contains filldown values but few/no regular values.
+    # Only lines holding a (multi-char) filldown value can qualify.
     header_line = None
-    for idx, line in enumerate(cli_lines):
-        filldown_in_line = sum(1 for v in filldown_values.values() if v and len(v) > 1 and v in line)
-        regular_in_line = sum(1 for v in regular_values.values() if v and len(v) > 1 and v in line)
+    header_candidates = sorted({idx for v in filldown_values.values() if v and len(v) > 1
+                                for idx in line_index.lines_for(v)})
+    for idx in header_candidates:
+        filldown_in_line = sum(1 for v in filldown_values.values()
+                               if v and len(v) > 1 and line_index.in_line(v, idx))
+        regular_in_line = sum(1 for v in regular_values.values()
+                              if v and len(v) > 1 and line_index.in_line(v, idx))
 
         # Header line: has filldown values, minimal regular values
         if filldown_in_line >= 1 and regular_in_line <= 1:
-            header_vars_in_line = {k: v for k, v in filldown_values.items() if v and v in line}
+            header_vars_in_line = {k: v for k, v in filldown_values.items()
+                                   if v and line_index.in_line(v, idx)}
             if header_vars_in_line:
-                header_line = (idx, line, header_vars_in_line)
+                header_line = (idx, cli_lines[idx], header_vars_in_line)
                 break
 
     if not header_line:
@@ -106,25 +119,27 @@ def generate_multisection_template(headers: List[str], rows: List[List[str]],
 
     header_idx = header_line[0]
 
-    # Find the data line - contains regular values, NOT the header line
+    # Find the data line - contains regular values, NOT the header line.
+    # Only count values > 1 char as substrings; single-char values need a
+    # word boundary match to avoid false hits.
+    def value_lines(v: str) -> List[int]:
+        if not v:
+            return []
+        return line_index.lines_for(v) if len(v) > 1 else line_index.word_lines(v)
+
+    hits_per_line = Counter()
+    for v in regular_values.values():
+        hits_per_line.update(value_lines(v))
+
     data_line = None
-    for idx, line in enumerate(cli_lines):
-        if idx == header_idx:
-            continue
-
-        # Count regular values in this line (only count values > 1 char to avoid false matches)
-        values_in_line = {}
-        for k, v in regular_values.items():
-            if v and len(v) > 1 and v in line:
-                values_in_line[k] = v
-            elif v and len(v) == 1:
-                # For single-char values, require word boundary match
-                if re.search(r'\b' + re.escape(v) + r'\b', line):
-                    values_in_line[k] = v
-
-        if len(values_in_line) >= min_cols:
-            data_line = (idx, line, values_in_line)
-            break
+    data_candidates = [idx for idx, hits in hits_per_line.items()
+                       if hits >= min_cols and idx != header_idx]
+    if data_candidates:
+        idx = min(data_candidates)
+        values_in_line = {k: v for k, v in regular_values.items()
+                          if v and (line_index.in_line(v, idx) if len(v) > 1
+                                    else line_index.word_in_line(v, idx))}
+        data_line = (idx, cli_lines[idx], values_in_line)
 
     if not data_line:
         return False, "# Could not identify data row line"
@@ -135,13 +150,14 @@ def generate_multisection_template(headers: List[str], rows: List[List[str]],
     # Generate header template
     header_source = header_line[1]
     header_vars = header_line[2]
-    header_ttp = substitute_ttp_vars(header_source, header_vars, column_analysis)
+    header_ttp = substitute_ttp_vars(header_source, header_vars, column_analysis,
+                                     line_index.matches_in_line(header_line[0]))
 
     # Generate data row template
     data_source = data_line[1]
     data_vars = data_line[2]
-    data_ttp = substitute_ttp_vars(data_source, data_vars, column_analysis)
-    data_ttp = generalize_pattern(data_ttp)
+    data_ttp = substitute_ttp_spans(data_source, data_vars, column_analysis,
+                                    line_index.matches_in_line(data_line[0])).generalized()
 
     # Generate group names
     header_group = '_'.join(sorted(filldown_vars)[:3]).lower()
@@ -0,0 +1,242 @@
+"""
+Template Optimizer
+
+Optional post-generation stage: rewrites a generated TTP template into
+cheaper variants, benchmarks each one's parse time, and keeps the fastest
+variant whose row count on the sample is at least as close to TextFSM's
+as the original (the compare_results parity check).
+
+Variants:
+- tightened: ORPHRASE, re(".*\\w.*") and bare (WORD) variables take the
+  original TextFSM Value regex when it matches every captured value
+- pruned: table groups whose removal does not hurt row parity are dropped
+  (patterns that only re-match lines another group already captures)
+- tightened+pruned
+
+TTP already anchors every template line at a newline (and literal text
+narrows the match further), so no separate anchoring variant is generated.
+"""
+
+import io
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import textfsm
+
+from .validation import compare_results, parse_ttp_with_deadline
+
+_TTP_VAR = re.compile(r'\{\{\s*(\w+)\s*((?:\|[^}]*)?)\}\}')
+_CAPTURE_GROUP = re.compile(r'(?<!\\)\((?!\?)')
+_FLAT_GROUP = re.compile(r'<group name="[^"]*">\n(?:(?!</?group).*\n)*</group>')
+
+# Variable filters considered loose enough to be worth tightening
+_LOOSE_FILTERS = ('', '| ORPHRASE', r'| re(".*\\w.*")')
+
+# Groups beyond this are not pruned (each attempt costs one parse)
+MAX_PRUNE_GROUPS = 12
+
+
+@dataclass
+class OptimizationResult:
+    """
+    The chosen template plus what it was measured against.
+
+    variant is 'original', 'tightened', 'pruned' or 'tightened+pruned';
+    timings maps every variant that passed the parity check to its
+    best-of-N parse time in seconds.
+    """
+    ttp_template: str
+    variant: str = 'original'
+    ttp_results: List = field(default_factory=list)
+    ttp_rows: int = 0
+    parse_seconds: float = 0.0
+    original_seconds: float = 0.0
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def speedup(self) -> float:
+        return self.original_seconds / self.parse_seconds if self.parse_seconds > 0 else 1.0
+
+
+def textfsm_value_regexes(textfsm_template: str) -> Dict[str, str]:
+    """Map each TextFSM Value name to its regex (without the outer capture group)."""
+    fsm = textfsm.TextFSM(io.StringIO(textfsm_template))
+    return {value.name: value.regex[1:-1] for value in fsm.values}
+
+
+def ttp_safe_regex(regex: str) -> Optional[str]:
+    """
+    Adapt a TextFSM Value regex for use inside a TTP re() filter, or None.
+
+    Capture groups become non-capturing (TTP wraps the variable in its own
+    named group). Regexes TTP's template syntax cannot carry (|, braces,
+    quotes) or that are no tighter than ORPHRASE (.*, .+) are rejected.
+    """
+    if any(c in regex for c in '|{}"') or '.*' in regex or '.+' in regex:
+        return None
+    regex = _CAPTURE_GROUP.sub('(?:', regex)
+    try:
+        re.compile(regex)
+    except re.error:
+        return None
+    return regex
+
+
+def tighten_variables(ttp_template: str, value_regexes: Dict[str, str],
+                      quality_rows: List[Dict[str, str]]) -> str:
+    """Replace loose variable filters with the TextFSM regex where it matches every sample value."""
+    column_values: Dict[str, List[str]] = {}
+    for row in quality_rows:
+        for name, value in row.items():
+            column_values.setdefault(name, []).append(value)
+
+    def tighten(match):
+        name, filters = match.group(1), match.group(2).strip()
+        if filters not in _LOOSE_FILTERS or name not in value_regexes:
+            return match.group(0)
+        regex = ttp_safe_regex(value_regexes[name])
+        values = column_values.get(name)
+        if regex is None or not values:
+            return match.group(0)
+        compiled = re.compile(regex)
+        if not all(compiled.fullmatch(v) for v in values):
+            return match.group(0)
+        return '{{' + name + ' | re("' + regex.replace('\\', '\\\\') + '")}}'
+
+    return _TTP_VAR.sub(tighten, ttp_template)
+
+
+def split_flat_groups(ttp_template: str) -> Optional[List[str]]:
+    """Split a template made only of un-nested top-level groups (table output); None otherwise."""
+    groups = _FLAT_GROUP.findall(ttp_template + '\n')
+    if not groups or '\n'.join(groups) != ttp_template.strip():
+        return None
+    return groups
+
+
+def prune_groups(ttp_template: str, acceptable: Callable[[str], bool]) -> str:
+    """
+    Greedily drop groups while acceptable(candidate) holds.
+    Templates with nesting, a single group or more than MAX_PRUNE_GROUPS are returned as-is.
+    """
+    groups = split_flat_groups(ttp_template)
+    if not groups or len(groups) < 2 or len(groups) > MAX_PRUNE_GROUPS:
+        return ttp_template
+
+    kept = list(groups)
+    for group in groups:
+        if len(kept) == 1:
+            break
+        candidate = [g for g in kept if g is not group]
+        if acceptable('\n'.join(candidate)):
+            kept = candidate
+
+    return '\n'.join(kept)
+
+
+def benchmark_ttp_template(ttp_template: str, cli_content: str, repeat: int = 3,
+                           timeout: int = 10) -> float:
+    """Best-of-repeat wall time (seconds) to parse cli_content with ttp_template."""
+    best = float('inf')
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        parse_ttp_with_deadline(ttp_template, cli_content, timeout)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _benchmark_input(cli_content: str, target_size: int) -> str:
+    """The sample repeated up to target_size chars, so per-line matching outweighs template setup."""
+    text = cli_content if cli_content.endswith('\n') else cli_content + '\n'
+    return text * max(1, min(50, target_size // max(1, len(text))))
+
+
+def optimize_ttp_template(ttp_template: str, textfsm_template: str, cli_content: str,
+                          quality_rows: List[Dict[str, str]], ttp_results: Optional[List] = None,
+                          repeat: int = 3, min_gain: float = 0.05, target_size: int = 32768,
+                          timeout: int = 10) -> OptimizationResult:
+    """
+    Return the fastest parity-preserving variant of ttp_template.
+
+    A variant replaces the original only if it is at least min_gain (as a
+    fraction) faster, so benchmark noise does not churn templates. Timing
+    runs on the sample repeated up to target_size characters; parity is
+    checked on the sample itself. Pass the original's validated ttp_results
+    to skip re-parsing it.
+    """
+    textfsm_count = len(quality_rows)
+
+    def evaluate(template: str) -> Optional[Tuple[int, List]]:
+        try:
+            results = parse_ttp_with_deadline(template, cli_content, timeout)
+        except Exception:
+            return None
+        ttp_results = results[0] if results else []
+        return compare_results(quality_rows, ttp_results)['ttp_count'], ttp_results
+
+    if ttp_results is not None:
+        original = compare_results(quality_rows, ttp_results)['ttp_count'], ttp_results
+    else:
+        original = evaluate(ttp_template)
+    if original is None:
+        return OptimizationResult(ttp_template=ttp_template)
+
+    original_distance = abs(original[0] - textfsm_count)
+
+    def acceptable(template: str) -> bool:
+        outcome = evaluate(template)
+        return (outcome is not None and outcome[0] > 0
+                and abs(outcome[0] - textfsm_count) <= original_distance)
+
+    try:
+        value_regexes = textfsm_value_regexes(textfsm_template)
+    except Exception:
+        value_regexes = {}
+
+    tightened = tighten_variables(ttp_template, value_regexes, quality_rows)
+    candidates = {'original': ttp_template}
+    if tightened != ttp_template and acceptable(tightened):
+        candidates['tightened'] = tightened
+    pruned = prune_groups(ttp_template, acceptable)
+    if pruned != ttp_template:
+        candidates['pruned'] = pruned
+    if 'tightened' in candidates and 'pruned' in candidates:
+        both = prune_groups(tightened, acceptable)
+        if both != tightened:
+            candidates['tightened+pruned'] = both
+
+    if len(candidates) == 1:
+        return OptimizationResult(ttp_template=ttp_template, ttp_results=original[1],
+                                  ttp_rows=original[0])
+
+    bench_input = _benchmark_input(cli_content, target_size)
+    timings = {}
+    for name, template in candidates.items():
+        try:
+            timings[name] = benchmark_ttp_template(template, bench_input, repeat, timeout)
+        except Exception:
+            continue
+
+    if 'original' not in timings:
+        return OptimizationResult(ttp_template=ttp_template, ttp_results=original[1],
+                                  ttp_rows=original[0], timings=timings)
+
+    best = min(timings, key=timings.get)
+    if timings[best] > timings['original'] * (1 - min_gain):
+        best = 'original'
+
+    outcome = original if best == 'original' else evaluate(candidates[best])
+    if outcome is None:
+        best, outcome = 'original', original
+    count, ttp_results = outcome
+    return OptimizationResult(
+        ttp_template=candidates[best],
+        variant=best,
+        ttp_results=ttp_results,
+        ttp_rows=count,
+        parse_seconds=timings[best],
+        original_seconds=timings['original'],
+        timings=timings
+    )
@@ -7,37 +7,43 @@ Examples: show version, show ntp status, show system
 
 import re
 from collections import defaultdict
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 
 from .core import (
     rows_to_dicts,
     analyze_column_patterns,
     substitute_ttp_vars,
 )
+from .index import LineIndex
 
 
-def map_values_to_lines(cli_lines: List[str], values: Dict[str, str]) -> Dict[str, List[int]]:
+def map_values_to_lines(cli_lines: List[str], values: Dict[str, str],
+                        line_index: Optional[LineIndex] = None) -> Dict[str, List[int]]:
     """
     Map each variable to the line number(s) where its value appears.
     Returns {var_name: [line_indices]}
     """
-    value_to_lines = defaultdict(list)
+    if line_index is None:
+        line_index = LineIndex(cli_lines, values.values())
+
+    value_to_lines = {}
 
     for var_name, value in values.items():
         if not value or not value.strip():
             continue
 
-        for idx, line in enumerate(cli_lines):
-            if value in line:
-                value_to_lines[var_name].append(idx)
+        line_indices = line_index.lines_for(value)
+        if line_indices:
+            value_to_lines[var_name] = list(line_indices)
 
-    return dict(value_to_lines)
+    return value_to_lines
 
 
 def build_paragraph_line_templates(cli_lines: List[str],
                                    value_to_lines: Dict[str, List[int]],
                                    all_values: Dict[str, str],
-                                   column_analysis: Dict[str, Dict] = None) -> Dict[int, str]:
+                                   column_analysis: Dict[str, Dict] = None,
+                                   line_index: Optional[LineIndex] = None) -> Dict[int, str]:
     """
     Build TTP template for each line that contains captured values.
     Returns {line_index: ttp_template_line}
@@ -56,7 +62,8 @@ def build_paragraph_line_templates(cli_lines: List[str],
     line_templates = {}
     for line_idx, values_in_line in sorted(line_to_values.items()):
         source_line = cli_lines[line_idx]
-        ttp_line = substitute_ttp_vars(source_line, values_in_line, column_analysis)
+        matches = line_index.matches_in_line(line_idx) if line_index else None
+        ttp_line = substitute_ttp_vars(source_line, values_in_line, column_analysis, matches)
         # Clean up excessive spaces but preserve structure
         ttp_line = re.sub(r' {3,}', '  ', ttp_line)
         line_templates[line_idx] = ttp_line
@@ -65,10 +72,13 @@ def build_paragraph_line_templates(cli_lines: List[str],
 
 
 def generate_paragraph_template(headers: List[str], rows: List[List[str]],
-                                cli_content: str, min_values: int = 4) -> Tuple[bool, str]:
+                                cli_content: str, min_values: int = 4,
+                                line_index: Optional[LineIndex] = None) -> Tuple[bool, str]:
     """
     Generate TTP template for paragraph-oriented data (single record, multi-line).
     Returns (success, template_or_error)
+
+    line_index: optional LineIndex over cli_content shared by the caller.
     """
     row_dicts = rows_to_dicts(headers, rows)
 
@@ -86,17 +96,19 @@ def generate_paragraph_template(headers: List[str], rows: List[List[str]],
     # Analyze column patterns (for paragraph, use row_dicts)
     column_analysis = analyze_column_patterns(row_dicts)
 
-    cli_lines = cli_content.splitlines()
+    if line_index is None:
+        line_index = LineIndex(cli_content.splitlines(), all_values.values())
+    cli_lines = line_index.cli_lines
 
     # Map each value to its source line(s)
-    value_to_lines = map_values_to_lines(cli_lines, all_values)
+    value_to_lines = map_values_to_lines(cli_lines, all_values, line_index)
 
     if not value_to_lines:
         return False, "# ERROR: Could not map any values to source lines"
 
     # Build line-by-line template
     line_templates = build_paragraph_line_templates(cli_lines, value_to_lines,
-                                                    all_values, column_analysis)
+                                                    all_values, column_analysis, line_index)
 
     if not line_templates:
         return False, "# ERROR: Could not generate line templates"
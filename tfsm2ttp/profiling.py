@@ -0,0 +1,167 @@
+"""
+Conversion Profiling
+
+Collects per-template phase timings from conversion results and turns them
+into a report: per-phase totals and percentiles, time by strategy, a
+histogram of per-template times and the slowest templates. The report is
+written as JSON and summarized on the console.
+
+Phases: textfsm_parse, detect (value index + strategy detection), one entry
+per strategy attempted (multisection, table, paragraph), validation,
+optimize, export. total is the worker's wall time for the template.
+"""
+
+import json
+from typing import Dict, List, Optional
+
+PHASES = ('textfsm_parse', 'detect', 'multisection', 'table', 'paragraph',
+          'validation', 'optimize', 'export')
+
+# Histogram bucket upper bounds in seconds (the last bucket is open-ended)
+HISTOGRAM_BOUNDS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds < 1.0:
+        return f"{seconds * 1000:.1f}ms"
+    return f"{seconds:.2f}s"
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def histogram(values: List[float], bounds=HISTOGRAM_BOUNDS) -> List[Dict]:
+    """Bucket values into [{'label', 'upper', 'count'}] using bounds as upper edges."""
+    buckets = [{'label': f"<{_format_seconds(bound)}", 'upper': bound, 'count': 0} for bound in bounds]
+    buckets.append({'label': f">={_format_seconds(bounds[-1])}", 'upper': None, 'count': 0})
+
+    for value in values:
+        for bucket in buckets:
+            if bucket['upper'] is None or value < bucket['upper']:
+                bucket['count'] += 1
+                break
+
+    return buckets
+
+
+class ConversionProfile:
+    """
+    Accumulates one small record per profiled template.
+
+    Feed it result dicts from process_single_template (anything without a
+    'timings' entry, such as checkpoint-resumed summaries, is ignored).
+    """
+
+    def __init__(self, top: int = 15):
+        self.top = top
+        self.records: List[Dict] = []
+
+    def add(self, result: Dict):
+        timings = result.get('timings')
+        if not timings:
+            return
+        self.records.append({
+            'id': result.get('id'),
+            'command': result.get('command'),
+            'category': result.get('category'),
+            'status': result.get('status'),
+            'total': timings.get('total', sum(v for k, v in timings.items() if k != 'total')),
+            'phases': {k: v for k, v in timings.items() if k != 'total'},
+        })
+
+    def _phase_stats(self) -> Dict[str, Dict]:
+        stats = {}
+        phases = list(PHASES) + sorted({p for r in self.records for p in r['phases']} - set(PHASES))
+        for phase in phases:
+            values = sorted(r['phases'][phase] for r in self.records if phase in r['phases'])
+            if not values:
+                continue
+            total = sum(values)
+            stats[phase] = {
+                'count': len(values),
+                'total': total,
+                'mean': total / len(values),
+                'p50': _percentile(values, 50),
+                'p95': _percentile(values, 95),
+                'max': values[-1],
+            }
+        return stats
+
+    def _category_stats(self) -> Dict[str, Dict]:
+        stats = {}
+        for record in self.records:
+            entry = stats.setdefault(record['category'] or 'none', {'count': 0, 'total': 0.0})
+            entry['count'] += 1
+            entry['total'] += record['total']
+        for entry in stats.values():
+            entry['mean'] = entry['total'] / entry['count']
+        return stats
+
+    def report(self) -> Dict:
+        """The full report as a JSON-serializable dict."""
+        totals = sorted(r['total'] for r in self.records)
+        slowest = sorted(self.records, key=lambda r: -r['total'])[:self.top]
+        return {
+            'templates': len(self.records),
+            'total_seconds': sum(totals),
+            'template_seconds': {
+                'mean': sum(totals) / len(totals) if totals else 0.0,
+                'p50': _percentile(totals, 50),
+                'p95': _percentile(totals, 95),
+                'max': totals[-1] if totals else 0.0,
+            },
+            'phases': self._phase_stats(),
+            'categories': self._category_stats(),
+            'histogram': histogram(totals),
+            'phase_histograms': {
+                phase: histogram([r['phases'][phase] for r in self.records if phase in r['phases']])
+                for phase in PHASES
+                if any(phase in r['phases'] for r in self.records)
+            },
+            'slowest': slowest,
+        }
+
+    def write_json(self, path: str, report: Optional[Dict] = None):
+        with open(path, 'w') as f:
+            json.dump(report or self.report(), f, indent=2, default=str)
+
+    def print_summary(self, report: Optional[Dict] = None):
+        """Console summary: phase table, time by strategy, histogram, slowest templates."""
+        report = report or self.report()
+        if not report['templates']:
+            return
+
+        print("\n" + "=" * 80)
+        print(f"PROFILE ({report['templates']} templates, "
+              f"{report['total_seconds']:.2f}s total worker time)")
+        print("=" * 80)
+
+        print(f"{'Phase':<15}{'total':>10}{'share':>8}{'mean':>10}{'p50':>10}{'p95':>10}{'max':>10}")
+        grand_total = report['total_seconds'] or 1.0
+        for phase, s in report['phases'].items():
+            print(f"{phase:<15}{s['total']:>9.2f}s{s['total'] / grand_total:>8.1%}"
+                  f"{_format_seconds(s['mean']):>10}{_format_seconds(s['p50']):>10}"
+                  f"{_format_seconds(s['p95']):>10}{_format_seconds(s['max']):>10}")
+
+        print("\nBy strategy:")
+        for category, s in sorted(report['categories'].items(), key=lambda x: -x[1]['total']):
+            print(f"  {category:<14}{s['count']:>6} templates  {s['total']:>8.2f}s  "
+                  f"(mean {_format_seconds(s['mean'])})")
+
+        print("\nPer-template time:")
+        peak = max(b['count'] for b in report['histogram']) or 1
+        for bucket in report['histogram']:
+            bar = '#' * int(round(40 * bucket['count'] / peak))
+            print(f"  {bucket['label']:>9} | {bar} {bucket['count']}")
+
+        print(f"\nSlowest {len(report['slowest'])} templates:")
+        for i, record in enumerate(report['slowest'], 1):
+            phases = sorted(record['phases'].items(), key=lambda x: -x[1])[:3]
+            breakdown = ', '.join(f"{p} {_format_seconds(v)}" for p, v in phases)
+            print(f"  {i:>2}. {record['command']}: {_format_seconds(record['total'])} "
+                  f"[{record['category'] or 'none'}] ({breakdown})")
@@ -0,0 +1,188 @@
+"""
+Worker Scheduler
+
+Runs a function over many work items in long-lived worker processes.
+
+Each worker handles one task at a time, so a task's deadline is measured
+from the moment it is handed to an idle worker. A task that overruns its
+deadline gets its worker killed; every other worker keeps running. Workers
+are recycled after a fixed number of tasks (like multiprocessing.Pool's
+maxtasksperchild) to cap memory growth from TextFSM/TTP regex caches.
+Killed, dead and recycled workers are respawned when the next task is
+handed to them, never while the queue is empty.
+"""
+
+import multiprocessing
+import time
+from collections import deque
+from multiprocessing.connection import wait
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+# Task outcome status values yielded by WorkerScheduler.imap_unordered
+DONE = 'done'
+TIMEOUT = 'timeout'
+ERROR = 'error'
+
+
+def _worker_loop(func: Callable, conn):
+    """Worker process body: run tasks from conn until told to stop."""
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+
+        task_id, item = task
+        try:
+            conn.send((task_id, DONE, func(item)))
+        except Exception as e:
+            try:
+                conn.send((task_id, ERROR, f"{type(e).__name__}: {str(e)[:80]}"))
+            except Exception:
+                break
+
+    conn.close()
+
+
+class _Worker:
+    """One worker process and its private task/result pipe."""
+
+    def __init__(self, ctx, func: Callable):
+        self._ctx = ctx
+        self._func = func
+        self.task: Optional[Tuple[int, Any]] = None
+        self.deadline: Optional[float] = None
+        self._spawn()
+
+    def _spawn(self):
+        self.conn, child_conn = self._ctx.Pipe()
+        self.process = self._ctx.Process(target=_worker_loop, args=(self._func, child_conn), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.completed = 0
+
+    def submit(self, task_id: int, item: Any, timeout: Optional[float],
+               max_tasks: Optional[int] = None):
+        """Hand a task over, first respawning a dead worker or recycling a worn one."""
+        if not self.process.is_alive():
+            # Killed after a timeout, or died while idle (OOM kill, ...)
+            self.kill()
+            self._spawn()
+        elif max_tasks and self.completed >= max_tasks:
+            self.stop()
+            self._spawn()
+
+        try:
+            self.conn.send((task_id, item))
+        except (OSError, ValueError):
+            # Died between the check and the send
+            self.kill()
+            self._spawn()
+            self.conn.send((task_id, item))
+        self.task = (task_id, item)
+        self.deadline = time.monotonic() + timeout if timeout else None
+
+    def finish(self):
+        self.task = None
+        self.deadline = None
+        self.completed += 1
+
+    def stop(self):
+        """Ask the worker to exit; kill it if it does not."""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class WorkerScheduler:
+    """
+    Pool of long-lived worker processes with per-task wall-clock deadlines.
+
+    Usage:
+        with WorkerScheduler(process_single_template, workers=8, timeout=30) as scheduler:
+            for item, status, value in scheduler.imap_unordered(work_items):
+                ...
+
+    status is DONE (value is func's return), TIMEOUT (value is None; the
+    worker was killed) or ERROR (value is an error message).
+    """
+
+    def __init__(self, func: Callable, workers: int = 1, timeout: Optional[float] = None,
+                 max_tasks_per_child: Optional[int] = None):
+        self.func = func
+        self.num_workers = max(1, workers)
+        self.timeout = timeout
+        self.max_tasks_per_child = max_tasks_per_child
+        self._ctx = multiprocessing.get_context()
+        self._workers: List[_Worker] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Stop all workers."""
+        for worker in self._workers:
+            if worker.task is not None:
+                worker.kill()
+            else:
+                worker.stop()
+        self._workers = []
+
+    def imap_unordered(self, items: Iterable) -> Iterator[Tuple[Any, str, Any]]:
+        """Yield (item, status, value) for every item, in completion order."""
+        pending = deque(enumerate(items))
+
+        while len(self._workers) < min(self.num_workers, len(pending)):
+            self._workers.append(_Worker(self._ctx, self.func))
+
+        while True:
+            # Hand work to idle workers
+            for worker in self._workers:
+                if worker.task is None and pending:
+                    task_id, item = pending.popleft()
+                    worker.submit(task_id, item, self.timeout, self.max_tasks_per_child)
+
+            busy = [w for w in self._workers if w.task is not None]
+            if not busy:
+                return
+
+            deadlines = [w.deadline for w in busy if w.deadline is not None]
+            wait_for = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            ready = wait([w.conn for w in busy], timeout=wait_for)
+
+            for worker in busy:
+                if worker.conn in ready:
+                    task_id, item = worker.task
+                    try:
+                        _, status, value = worker.conn.recv()
+                    except (EOFError, OSError):
+                        # Worker died mid-task (segfault, OOM kill, ...)
+                        worker.finish()
+                        worker.kill()
+                        yield item, ERROR, "Worker process died"
+                        continue
+
+                    worker.finish()
+                    yield item, status, value
+
+                elif worker.deadline is not None and time.monotonic() >= worker.deadline:
+                    task_id, item = worker.task
+                    worker.finish()
+                    worker.kill()
+                    yield item, TIMEOUT, None
@@ -10,43 +10,47 @@ from typing import List, Dict, Tuple, Optional
 from .core import (
     filter_quality_rows,
     analyze_column_patterns,
-    substitute_ttp_vars,
-    generalize_pattern,
-    pattern_signature,
+    substitute_ttp_spans,
 )
+from .index import LineIndex
 
 
-def find_source_line(cli_lines: List[str], row_values: Dict[str, str]) -> Optional[Tuple[int, str]]:
+def find_source_line(cli_lines: List[str], row_values: Dict[str, str],
+                     line_index: Optional[LineIndex] = None) -> Optional[Tuple[int, str]]:
     """
     Find the CLI line that contains all values from this row.
     Returns (line_number, line_content) or None.
+
+    Pass a LineIndex built over all rows to avoid rescanning cli_lines per row.
     """
     values = [v for v in row_values.values() if v and v.strip()]
     if not values:
         return None
 
-    for idx, line in enumerate(cli_lines):
-        if all(val in line for val in values):
-            return (idx, line)
+    if line_index is None:
+        line_index = LineIndex(cli_lines, values)
+
+    idx = line_index.first_line_with_all(values)
+    if idx is not None:
+        return (idx, cli_lines[idx])
 
     # Fallback: find line with most matches
-    best_match = (0, None, "")
-    for idx, line in enumerate(cli_lines):
-        match_count = sum(1 for val in values if val in line)
-        if match_count > best_match[0]:
-            best_match = (match_count, idx, line)
+    match_count, idx = line_index.best_partial_line(values)
 
-    if best_match[1] is not None and best_match[0] >= 2:
-        return (best_match[1], best_match[2])
+    if idx is not None and match_count >= 2:
+        return (idx, cli_lines[idx])
 
     return None
 
 
 def generate_table_template(headers: List[str], rows: List[List[str]],
-                            cli_content: str, min_cols: int = 3) -> Tuple[bool, str]:
+                            cli_content: str, min_cols: int = 3,
+                            line_index: Optional[LineIndex] = None) -> Tuple[bool, str]:
     """
     Generate TTP template for table-oriented data.
     Returns (success, template_or_error)
+
+    line_index: optional LineIndex over cli_content shared by the caller.
     """
     quality_rows = filter_quality_rows(headers, rows, min_cols)
 
@@ -56,13 +60,16 @@ def generate_table_template(headers: List[str], rows: List[List[str]],
     # Analyze all values per column to detect multi-word patterns
     column_analysis = analyze_column_patterns(quality_rows)
 
-    cli_lines = cli_content.splitlines()
+    if line_index is None:
+        line_index = LineIndex(cli_content.splitlines(),
+                               (v for row in quality_rows for v in row.values()))
+    cli_lines = line_index.cli_lines
     ttp_patterns = {}
     used_lines = set()
 
     for row in quality_rows:
         try:
-            result = find_source_line(cli_lines, row)
+            result = find_source_line(cli_lines, row, line_index)
             if result is None:
                 continue
 
@@ -72,10 +79,11 @@ def generate_table_template(headers: List[str], rows: List[List[str]],
                 continue
             used_lines.add(line_num)
 
-            ttp_line = substitute_ttp_vars(source_line, row, column_analysis)
-            ttp_line = generalize_pattern(ttp_line)
+            substitution = substitute_ttp_spans(source_line, row, column_analysis,
+                                                line_index.matches_in_line(line_num))
+            ttp_line = substitution.generalized()
 
-            sig = pattern_signature(ttp_line)
+            sig = substitution.signature
             if sig and sig not in ttp_patterns:
                 ttp_patterns[sig] = (ttp_line, row)
         except Exception:
@@ -5,45 +5,105 @@ Validates generated TTP templates by parsing CLI content and comparing
 results against TextFSM output.
 """
 
-from typing import List, Dict, Tuple
+import functools
+from typing import List, Dict, Optional, Tuple
 
 
-def validate_ttp_template(ttp_template: str, cli_content: str, timeout: int = 10) -> Tuple[bool, List[Dict], str]:
-    """Validate with timeout protection."""
+@functools.lru_cache(maxsize=None)
+def _sandbox_module():
+    """parsing_fire.sandbox, or None when parsing_fire is not importable (tfsm2ttp on its own)."""
     try:
-        from ttp import ttp
+        from parsing_fire import sandbox
     except ImportError:
-        return False, [], "TTP library not installed"
+        return None
+    return sandbox
+
+
+def _on_main_thread() -> bool:
+    import signal
+    import threading
+
+    return hasattr(signal, 'SIGALRM') and threading.current_thread() is threading.main_thread()
+
 
+def _parse_ttp_in_process(ttp_template: str, cli_content: str, timeout: int) -> List:
+    """sandbox.parse_ttp in this process, under a SIGALRM deadline when on the main thread (Unix)."""
     import signal
 
+    parse_ttp = _sandbox_module().parse_ttp
+    if not _on_main_thread():
+        # Daemonic worker off its main thread: only the parent's deadline applies
+        return parse_ttp(ttp_template, cli_content)
+
     def timeout_handler(signum, frame):
         raise TimeoutError("TTP parsing timed out")
 
+    old_handler = signal.signal(signal.SIGALRM, timeout_handler)
+    signal.alarm(timeout)
     try:
-        import warnings
-        # Set alarm (Unix only)
-        old_handler = signal.signal(signal.SIGALRM, timeout_handler)
-        signal.alarm(timeout)
-
-        with warnings.catch_warnings():
-            warnings.filterwarnings('ignore', category=SyntaxWarning)
-            parser = ttp(data=cli_content, template=ttp_template)
-            parser.parse()
-            results = parser.result()
-
-        signal.alarm(0)  # Cancel alarm
+        return parse_ttp(ttp_template, cli_content)
+    finally:
+        signal.alarm(0)
         signal.signal(signal.SIGALRM, old_handler)
 
+
+def parse_ttp_with_deadline(ttp_template: str, cli_content: str, timeout: int = 10,
+                            memory_limit_mb: Optional[int] = None, sandbox=None) -> List:
+    """
+    Parse with a TTP template under a deadline; returns the raw parser.result() list.
+
+    On the main thread without a memory limit the parse runs in-process under
+    SIGALRM (no subprocess round-trip). Anywhere else - thread pools, Qt
+    QThread workers, or when memory_limit_mb is given - it runs in a parsing_fire
+    ParseSandbox (the shared one unless given), which works from any thread.
+    Daemonic workers (WorkerScheduler, Pool) cannot start children and parse
+    in-process. Raises TimeoutError or parsing_fire's SandboxTimeout /
+    SandboxError, ImportError without parsing_fire, or what TTP raised.
+    """
+    sandbox_module = _sandbox_module()
+    if sandbox_module is None:
+        raise ImportError("parsing_fire is not installed")
+
+    if sandbox is None and (memory_limit_mb or not _on_main_thread()):
+        options = {'memory_limit_mb': memory_limit_mb} if memory_limit_mb else {}
+        sandbox = sandbox_module.shared_sandbox(timeout=timeout, **options)
+
+    if sandbox is None:
+        return _parse_ttp_in_process(ttp_template, cli_content, timeout)
+    return sandbox.run(sandbox_module.parse_ttp, ttp_template, cli_content, timeout=timeout)
+
+
+def validate_ttp_template(ttp_template: str, cli_content: str, timeout: int = 10,
+                          memory_limit_mb: Optional[int] = None,
+                          sandbox=None) -> Tuple[bool, List[Dict], str]:
+    """
+    Validate with timeout protection (see parse_ttp_with_deadline).
+
+    memory_limit_mb applies when the shared sandbox is first created.
+    """
+    try:
+        from ttp import ttp
+    except ImportError:
+        return False, [], "TTP library not installed"
+
+    sandbox_module = _sandbox_module()
+    if sandbox_module is None:
+        return False, [], "parsing_fire not installed"
+
+    try:
+        results = parse_ttp_with_deadline(ttp_template, cli_content, timeout,
+                                          memory_limit_mb=memory_limit_mb, sandbox=sandbox)
         if results and len(results) > 0:
             return True, results[0], ""
         return True, [], "No results parsed"
-    except TimeoutError:
+    except (TimeoutError, sandbox_module.SandboxTimeout):
         return False, [], "TTP parsing timed out"
+    except sandbox_module.SandboxError as e:
+        return False, [], f"TTP sandbox error: {str(e)[:100]}"
     except Exception as e:
-        signal.alarm(0)
         return False, [], f"TTP parse error: {str(e)[:100]}"
 
+
 def compare_results(textfsm_rows: List[Dict], ttp_results: List) -> Dict:
     """Compare TextFSM and TTP parsing results."""
     comparison = {